@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Streaming analytics over gameplay event logs
+
+Reads the JSON lines that events.py writes and computes, in one pass:
+
+* the funnel: sessions that started, performed an action, took the final
+  exam and passed it
+* drop-off: where sessions that did not pass ended, by game over or by
+  leaving
+* skill check gates: attempts and failures for each location and
+  requirement, and which skill was missing
+* random events: how often each fired and how often it ended the run
+* dwell: turns spent at each location and arrivals there
+* skill progression: each skill's average level by turn
+* exam answers: how often each topic was answered correctly
+
+Logs are streamed line by line through generators, so memory holds the
+aggregates and the state of sessions still open or left to be resumed,
+never the log itself. A run that resumes a session (a start with resumed
+true) carries on the state of that player's session that left, rather than
+entering the funnel again.
+Gzipped logs are read as they are. Given several files, such as rotated
+logs or one log per server, each file is a shard: a process pool analyzes
+the shards in parallel and the results are merged.
+
+    python analytics.py events.jsonl
+    python analytics.py logs/events-*.jsonl.gz --workers 8 --json report.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+FUNNEL = ("started", "performed an action", "took the exam", "passed the exam")
+STARTED, ACTED, TOOK_EXAM, PASSED = range(len(FUNNEL))
+
+# Turns per point of the skill progression curves
+TURN_BUCKET = 5
+
+
+def read_lines(path: str) -> Iterator[str]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        yield from f
+
+
+def parse(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Events from JSON lines, skipping lines that are not events"""
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            # e.g. a torn last line of a log still being written
+            continue
+        if isinstance(event, dict) and "event" in event:
+            yield event
+
+
+class SessionState:
+    """What the aggregates need to remember about a session until it ends"""
+    __slots__ = ("player", "stage", "location", "turns", "skills", "cause")
+
+    def __init__(self):
+        self.player: Optional[str] = None
+        self.stage = STARTED
+        self.location: Optional[str] = None
+        self.turns = 0
+        self.skills: Dict[str, int] = {}
+        # The action or random event that could end the current turn
+        self.cause: Optional[str] = None
+
+
+def gate(location: str, required: Dict[str, int]) -> str:
+    return f"{location}: " + ", ".join(f"{skill} {level}" for skill, level in sorted(required.items()))
+
+
+class Aggregates:
+    """Incremental aggregates over a stream of events; shards merge with +="""
+
+    def __init__(self, turn_bucket: int = TURN_BUCKET):
+        self.turn_bucket = turn_bucket
+        self.events = 0
+        self.funnel = [0] * len(FUNNEL)
+        self.outcomes: Counter = Counter()
+        self.dropoff: Dict[str, Counter] = {}
+        self.checks: Counter = Counter()
+        self.failed_checks: Counter = Counter()
+        self.missing: Counter = Counter()
+        self.fired: Counter = Counter()
+        self.deaths: Counter = Counter()
+        self.dwell: Counter = Counter()
+        self.arrivals: Counter = Counter()
+        # Per turn bucket: turns counted, and per skill the levels gained so far
+        self.turns: List[int] = []
+        self.gains: Dict[str, List[int]] = {}
+        self.answers: Counter = Counter()
+        self.correct: Counter = Counter()
+        self.open: Dict[Any, SessionState] = {}
+        # By player, sessions that left and may be resumed by a later run
+        self.left: Dict[str, SessionState] = {}
+        self.resumed = 0
+
+    def reach(self, state: SessionState, stage: int) -> None:
+        if stage > state.stage:
+            for reached in range(state.stage + 1, stage + 1):
+                self.funnel[reached] += 1
+            state.stage = stage
+
+    def add(self, event: Dict[str, Any]) -> None:
+        self.events += 1
+        kind = event["event"]
+        session = event.get("session")
+        state = self.open.get(session)
+        if state is None:
+            state = self.open[session] = self.begin(event)
+
+        if kind == "move":
+            location = event.get("location")
+            self.dwell[location] += 1
+            if location != state.location:
+                self.arrivals[location] += 1
+            state.location = location
+            state.cause = None
+            bucket = state.turns // self.turn_bucket
+            state.turns += 1
+            if bucket == len(self.turns):
+                self.turns.append(0)
+            self.turns[bucket] += 1
+            for skill, level in state.skills.items():
+                gains = self.gains.setdefault(skill, [])
+                if bucket >= len(gains):
+                    gains.extend([0] * (bucket + 1 - len(gains)))
+                gains[bucket] += level - 1
+        elif kind == "check":
+            key = gate(event.get("location"), event.get("required") or {})
+            self.checks[key] += 1
+            if not event.get("passed"):
+                self.failed_checks[key] += 1
+                self.missing[event.get("missing")] += 1
+        elif kind == "action":
+            state.cause = event.get("action")
+            self.reach(state, ACTED)
+        elif kind == "event":
+            state.cause = f"{event.get('action')}: {event.get('message')}"
+            self.fired[state.cause] += 1
+        elif kind == "effect":
+            if event.get("effect") == "skill":
+                state.skills[event.get("skill")] = event.get("level", 1)
+        elif kind == "answer":
+            self.answers[event.get("topic")] += 1
+            self.correct[event.get("topic")] += bool(event.get("correct"))
+        elif kind == "exam":
+            self.reach(state, PASSED if event.get("passed") else TOOK_EXAM)
+        elif kind == "start":
+            state.player = event.get("player")
+            state.location = event.get("location")
+        elif kind == "end":
+            outcome = event.get("outcome")
+            self.outcomes[outcome] += 1
+            if outcome != "passed":
+                self.dropoff.setdefault(state.location, Counter())[outcome] += 1
+            if outcome == "game_over":
+                self.deaths[state.cause] += 1
+            elif outcome == "left" and state.player is not None:
+                self.left[state.player] = state
+            del self.open[session]
+
+    def begin(self, event: Dict[str, Any]) -> SessionState:
+        """State for a run seen for the first time: a new session, or a resumed one carrying on"""
+        if event["event"] == "start" and event.get("resumed"):
+            self.resumed += 1
+            state = self.left.pop(event.get("player"), None)
+            if state is None:
+                # The session started before this log or shard
+                return SessionState()
+            # Leaving was not where this session dropped off after all
+            self.outcomes["left"] -= 1
+            dropoff = self.dropoff[state.location]
+            dropoff["left"] -= 1
+            if not +dropoff:
+                del self.dropoff[state.location]
+            state.cause = None
+            return state
+        self.funnel[STARTED] += 1
+        return SessionState()
+
+    def __iadd__(self, other: "Aggregates") -> "Aggregates":
+        """Merge another shard's aggregates; sessions still open in either stay unmerged"""
+        self.events += other.events
+        self.funnel = [a + b for a, b in zip(self.funnel, other.funnel)]
+        for name in ("outcomes", "checks", "failed_checks", "missing", "fired", "deaths",
+                     "dwell", "arrivals", "answers", "correct"):
+            getattr(self, name).update(getattr(other, name))
+        for location, outcomes in other.dropoff.items():
+            self.dropoff.setdefault(location, Counter()).update(outcomes)
+        self.turns = add_lists(self.turns, other.turns)
+        for skill, gains in other.gains.items():
+            self.gains[skill] = add_lists(self.gains.get(skill, []), gains)
+        self.open.update(other.open)
+        self.left.update(other.left)
+        self.resumed += other.resumed
+        return self
+
+    def curves(self) -> Dict[str, List[float]]:
+        """Average level of each skill at each turn bucket"""
+        curves = {}
+        for skill, gains in sorted(self.gains.items()):
+            gains = gains + [0] * (len(self.turns) - len(gains))
+            curves[skill] = [round(1 + gained / turns, 2) for gained, turns in zip(gains, self.turns)]
+        return curves
+
+    def report(self) -> Dict[str, Any]:
+        """Everything computed, as JSON-ready data"""
+        return {
+            "events": self.events,
+            "sessions": self.funnel[STARTED],
+            "open_sessions": len(self.open),
+            "resumed_sessions": self.resumed,
+            "funnel": dict(zip(FUNNEL, self.funnel)),
+            "outcomes": dict(self.outcomes),
+            "dropoff": {location: dict(outcomes) for location, outcomes in
+                        sorted(self.dropoff.items(), key=lambda item: -sum(item[1].values()))},
+            "skill_checks": {key: {"attempts": attempts, "failed": self.failed_checks[key],
+                                   "fail_rate": round(self.failed_checks[key] / attempts, 4)}
+                             for key, attempts in sorted(self.checks.items(),
+                                                         key=lambda item: -self.failed_checks[item[0]])},
+            "missing_skills": dict(self.missing.most_common()),
+            "random_events": {cause: {"fired": fired, "deaths": self.deaths[cause],
+                                      "death_rate": round(self.deaths[cause] / fired, 4)}
+                              for cause, fired in self.fired.most_common()},
+            "deaths": {str(cause): count for cause, count in self.deaths.most_common()},
+            "dwell": {location: {"turns": turns, "arrivals": self.arrivals[location]}
+                      for location, turns in self.dwell.most_common()},
+            "turn_bucket": self.turn_bucket,
+            "skill_progression": self.curves(),
+            "exam_answers": {topic: {"answered": answered, "correct": self.correct[topic]}
+                             for topic, answered in self.answers.most_common()},
+        }
+
+
+def add_lists(a: List[int], b: List[int]) -> List[int]:
+    if len(a) < len(b):
+        a, b = b, a
+    return [x + y for x, y in zip(a, b + [0] * (len(a) - len(b)))]
+
+
+def analyze_file(path: str, turn_bucket: int = TURN_BUCKET) -> Aggregates:
+    aggregates = Aggregates(turn_bucket)
+    for event in parse(read_lines(path)):
+        aggregates.add(event)
+    return aggregates
+
+
+def _analyze_shard(args) -> Aggregates:
+    return analyze_file(*args)
+
+
+def analyze(paths: List[str], workers: int = 1, turn_bucket: int = TURN_BUCKET) -> Aggregates:
+    """Analyze log files, one shard per file, across a process pool when workers > 1"""
+    total = Aggregates(turn_bucket)
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(min(workers, len(paths))) as pool:
+            for aggregates in pool.map(_analyze_shard, [(path, turn_bucket) for path in paths]):
+                total += aggregates
+    else:
+        for path in paths:
+            total += analyze_file(path, turn_bucket)
+    return total
+
+
+def print_report(report: Dict[str, Any], top: int) -> None:
+    print(f"{report['events']:,} events from {report['sessions']:,} sessions "
+          f"({report['open_sessions']:,} still open at the end of the log, "
+          f"{report['resumed_sessions']:,} resumed after leaving)")
+
+    print("\nFunnel")
+    sessions = max(report["sessions"], 1)
+    for stage, count in report["funnel"].items():
+        print(f"  {stage:24} {count:10,}  {count / sessions:7.1%}")
+
+    print("\nWhere sessions ended without passing")
+    for location, outcomes in list(report["dropoff"].items())[:top]:
+        detail = ", ".join(f"{outcome} {count:,}" for outcome, count in sorted(outcomes.items()))
+        print(f"  {location}: {detail}")
+
+    print("\nSkill check gates by failures")
+    for key, check in list(report["skill_checks"].items())[:top]:
+        print(f"  {key:48} {check['failed']:8,} of {check['attempts']:8,} failed ({check['fail_rate']:.1%})")
+
+    print("\nRandom events")
+    for cause, event in list(report["random_events"].items())[:top]:
+        print(f"  {cause}\n    fired {event['fired']:,} times, ended the run {event['deaths']:,} times "
+              f"({event['death_rate']:.1%})")
+
+    print("\nDwell")
+    for location, dwell in list(report["dwell"].items())[:top]:
+        print(f"  {location:32} {dwell['turns']:10,} turns over {dwell['arrivals']:8,} arrivals")
+
+    print(f"\nAverage skill level by turn (every {report['turn_bucket']} turns)")
+    for skill, curve in report["skill_progression"].items():
+        print(f"  {skill:12} " + " ".join(f"{level:5.1f}" for level in curve[:top]))
+
+    print("\nExam answers")
+    for topic, answers in list(report["exam_answers"].items())[:top]:
+        print(f"  {topic:24} {answers['correct']:8,} of {answers['answered']:8,} correct")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute funnels and drop-off from gameplay event logs")
+    parser.add_argument("paths", nargs="+", help="event logs (JSON lines, optionally gzipped); each is a shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes to analyze shards in")
+    parser.add_argument("--turn-bucket", type=int, default=TURN_BUCKET, help="turns per skill progression point")
+    parser.add_argument("--top", type=int, default=10, help="rows to show per table")
+    parser.add_argument("--json", metavar="PATH", help="write the full report as JSON ('-' for stdout)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = analyze(args.paths, args.workers, args.turn_bucket).report()
+    elapsed = time.perf_counter() - start
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    print_report(report, args.top)
+    print(f"\nAnalyzed {report['events']:,} events in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,33 @@
 #!/usr/bin/env python3
 """
 AWS Adventure Game - A text-based adventure game for the AWS Community Game Challenge
+
+    python aws_adventure_game.py                          # play in the terminal
+    python aws_adventure_game.py --turbo commands.txt     # play a command stream
+    echo "ann 2 1 1 3" | python aws_adventure_game.py --turbo
 """
 
+import argparse
 import os
+import re
 import sys
 import time
 import random
-import json
-from typing import Dict, List, Any, Tuple
+import struct
+from array import array
+from functools import lru_cache
+from typing import (TYPE_CHECKING, Callable, Generator, IO, Iterator, List, Any, NamedTuple, Optional, Tuple,
+                    Union)
+
+import solver
+from events import EventLog, new_session_id
+from question_bank import QuestionBank, load_question_bank
+from world import (CERTIFICATE, DAMAGE, DEFAULT_WORLD, EFFECTS, FINAL_EXAM, HEAL, INVENTORY, SCORE, SKILL, STATUS,
+                   Effect, Location, Option, World, load_world)
+
+if TYPE_CHECKING:
+    from leaderboard import Leaderboard
+    from session_store import SessionStore
 
 # ANSI color codes for terminal output
 class Colors:
@@ -22,165 +41,426 @@ class Colors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
 
+class Renderer:
+    """Collect a screen's worth of output and write it to the terminal at once"""
+    CLEAR = '\033[2J\033[H'
+    # Color and style codes only, so a screen clear survives with color off
+    ANSI_PATTERN = re.compile(r'\033\[[0-9;]*m')
+    
+    def __init__(self, stream=None, color: Optional[bool] = None, clear: Optional[bool] = None):
+        self.stream = stream if stream is not None else sys.stdout
+        is_tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.color = is_tty and "NO_COLOR" not in os.environ if color is None else color
+        self.clear_enabled = is_tty if clear is None else clear
+        self.buffer = []
+    
+    def write(self, text: str = "") -> None:
+        """Queue a line of output"""
+        self.buffer.append(text)
+        self.buffer.append("\n")
+    
+    def clear(self) -> None:
+        """Queue a screen clear, using ANSI sequences instead of a shell command"""
+        if self.clear_enabled:
+            self.buffer.append(self.CLEAR)
+    
+    def flush(self) -> None:
+        """Write everything queued so far in a single call"""
+        if not self.buffer:
+            return
+        frame = "".join(self.buffer)
+        self.buffer.clear()
+        if not self.color:
+            frame = self.ANSI_PATTERN.sub("", frame)
+        self.stream.write(frame)
+        self.stream.flush()
+
+class BatchRenderer(Renderer):
+    """Renderer for scripted runs that holds screens back and writes them in batches"""
+    
+    def __init__(self, stream=None, color: Optional[bool] = None, clear: bool = False, batch_size: int = 8192):
+        super().__init__(stream, color, clear)
+        # Queued pieces of output (about two per line) that make up a batch
+        self.batch_size = batch_size
+    
+    def flush(self) -> None:
+        """Write queued output once a batch has built up"""
+        if len(self.buffer) >= self.batch_size:
+            super().flush()
+    
+    def close(self) -> None:
+        """Write whatever is still queued"""
+        super().flush()
+    
+    def __enter__(self) -> "BatchRenderer":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        # Queued output is written even if a session raised
+        self.close()
+
+# Read size for command streams
+COMMAND_BUFFER = 1 << 16
+
+def read_sessions(stream: IO[str]) -> Iterator[List[str]]:
+    """Answers from a command stream, one session per line separated by whitespace
+
+    Blank lines are skipped; each session starts with the player's name.
+    """
+    for line in stream:
+        answers = line.split()
+        if answers:
+            yield answers
+
+class Input(NamedTuple):
+    """Request for a line of input; pause prompts only wait for Enter
+
+    choices is the number of options offered for a numbered choice, and 0
+    for free text such as the player's name.
+    """
+    prompt: str
+    pause: bool = False
+    choices: int = 0
+
+class Delay(NamedTuple):
+    """Request to wait before the game carries on"""
+    seconds: float
+
+Request = Union[Input, Delay]
+
+# A running session yields requests to its driver and receives the answers.
+# Its return value is the id of the next location, or None once it ends.
+Session = Generator[Request, Optional[str], Optional[str]]
+
+class GameOver(Exception):
+    """Raised when the player's session ends"""
+
 class Player:
-    def __init__(self, name: str):
+    """Per-session player state, kept compact so one process can host many players
+
+    Skill levels live in an array indexed by world skill id, and the
+    inventory is an array of item counts indexed by world item id. The
+    mutable state packs into a fixed-size record with snapshot() and
+    restore(). While a session store is attached, every change is also
+    passed to journal(opcode, index, value).
+    """
+    __slots__ = ("name", "renderer", "world", "skills", "inventory", "health", "score", "location",
+                 "journal")
+    
+    def __init__(self, name: str, renderer: Optional[Renderer] = None, world: Optional[World] = None):
         self.name = name
-        self.inventory = []
-        self.skills = {
-            "compute": 1,
-            "storage": 1,
-            "networking": 1,
-            "security": 1,
-            "serverless": 1
-        }
+        self.renderer = renderer if renderer is not None else Renderer()
+        self.world = world if world is not None else load_world()
+        self.inventory = array("I", bytes(4 * len(self.world.items)))
+        self.skills = array("i", [1] * len(self.world.skills))
         self.health = 100
         self.score = 0
-        self.current_location = "cloud_academy"
+        self.location = self.world.start
+        self.journal: Optional[Callable[[int, int, int], None]] = None
+    
+    @property
+    def current_location(self) -> str:
+        """Key of the player's current location"""
+        return self.world.keys[self.location]
+    
+    @current_location.setter
+    def current_location(self, key: str) -> None:
+        self.location = self.world.location_id(key)
+    
+    def move_to(self, location_id: int) -> None:
+        """Record the player's arrival at a location"""
+        self.location = location_id
+        if self.journal is not None:
+            self.journal(MOVE, 0, location_id)
+    
+    def skill_level(self, skill: str) -> int:
+        """Return the level of a skill by name, or 0 for unknown skills"""
+        skill_id = self.world.skill_ids.get(skill)
+        return 0 if skill_id is None else self.skills[skill_id]
+    
+    def items(self) -> List[str]:
+        """Return the inventory as a list of item names"""
+        return [item for item, count in zip(self.world.items, self.inventory) for _ in range(count)]
     
     def add_to_inventory(self, item: str) -> None:
         """Add an item to the player's inventory"""
-        self.inventory.append(item)
-        print(f"{Colors.GREEN}Added {item} to your inventory!{Colors.ENDC}")
+        item_id = self.world.item_ids.get(item)
+        if item_id is None:
+            self.renderer.write(f"{Colors.RED}Invalid item: {item}{Colors.ENDC}")
+            return
+        self.inventory[item_id] += 1
+        if self.journal is not None:
+            self.journal(INVENTORY, item_id, 1)
+        self.renderer.write(f"{Colors.GREEN}Added {item} to your inventory!{Colors.ENDC}")
     
     def improve_skill(self, skill: str, amount: int = 1) -> None:
         """Improve a player's skill"""
-        if skill in self.skills:
-            self.skills[skill] += amount
-            print(f"{Colors.BLUE}Your {skill} skill increased to {self.skills[skill]}!{Colors.ENDC}")
+        skill_id = self.world.skill_ids.get(skill)
+        if skill_id is not None:
+            self.skills[skill_id] += amount
+            if self.journal is not None:
+                self.journal(SKILL, skill_id, amount)
+            self.renderer.write(f"{Colors.BLUE}Your {skill} skill increased to {self.skills[skill_id]}!{Colors.ENDC}")
         else:
-            print(f"{Colors.RED}Invalid skill: {skill}{Colors.ENDC}")
+            self.renderer.write(f"{Colors.RED}Invalid skill: {skill}{Colors.ENDC}")
     
     def take_damage(self, amount: int) -> None:
         """Player takes damage"""
         self.health -= amount
-        print(f"{Colors.RED}You took {amount} damage! Health: {self.health}/100{Colors.ENDC}")
+        if self.journal is not None:
+            self.journal(DAMAGE, 0, amount)
+        self.renderer.write(f"{Colors.RED}You took {amount} damage! Health: {self.health}/100{Colors.ENDC}")
         if self.health <= 0:
             self.game_over("You ran out of health!")
     
     def heal(self, amount: int) -> None:
         """Player heals"""
         self.health = min(100, self.health + amount)
-        print(f"{Colors.GREEN}You healed {amount} points! Health: {self.health}/100{Colors.ENDC}")
+        if self.journal is not None:
+            self.journal(HEAL, 0, amount)
+        self.renderer.write(f"{Colors.GREEN}You healed {amount} points! Health: {self.health}/100{Colors.ENDC}")
     
     def add_score(self, points: int) -> None:
         """Add points to player's score"""
         self.score += points
-        print(f"{Colors.YELLOW}You gained {points} points! Score: {self.score}{Colors.ENDC}")
+        if self.journal is not None:
+            self.journal(SCORE, 0, points)
+        self.renderer.write(f"{Colors.YELLOW}You gained {points} points! Score: {self.score}{Colors.ENDC}")
     
     def game_over(self, reason: str) -> None:
         """End the game"""
-        print(f"\n{Colors.RED}{Colors.BOLD}GAME OVER: {reason}{Colors.ENDC}")
-        print(f"\n{Colors.YELLOW}Final Score: {self.score}{Colors.ENDC}")
-        print(f"\nThanks for playing, {self.name}!")
-        sys.exit(0)
+        self.renderer.write(f"\n{Colors.RED}{Colors.BOLD}GAME OVER: {reason}{Colors.ENDC}")
+        self.renderer.write(f"\n{Colors.YELLOW}Final Score: {self.score}{Colors.ENDC}")
+        self.renderer.write(f"\nThanks for playing, {self.name}!")
+        raise GameOver(reason)
     
     def show_status(self) -> None:
         """Display player status"""
-        print(f"\n{Colors.BOLD}=== {self.name}'s Status ==={Colors.ENDC}")
-        print(f"Health: {self.health}/100")
-        print(f"Score: {self.score}")
-        print(f"Location: {self.current_location}")
-        print("\nSkills:")
-        for skill, level in self.skills.items():
-            print(f"  {skill.capitalize()}: {level}")
-        print("\nInventory:")
-        if self.inventory:
-            for item in self.inventory:
-                print(f"  - {item}")
+        self.renderer.write(f"\n{Colors.BOLD}=== {self.name}'s Status ==={Colors.ENDC}")
+        self.renderer.write(f"Health: {self.health}/100")
+        self.renderer.write(f"Score: {self.score}")
+        self.renderer.write(f"Location: {self.current_location}")
+        self.renderer.write("\nSkills:")
+        for skill, level in zip(self.world.skills, self.skills):
+            self.renderer.write(f"  {skill.capitalize()}: {level}")
+        self.renderer.write("\nInventory:")
+        items = self.items()
+        if items:
+            for item in items:
+                self.renderer.write(f"  - {item}")
         else:
-            print("  (empty)")
-        print("")
+            self.renderer.write("  (empty)")
+        self.renderer.write("")
+    
+    @property
+    def snapshot_format(self) -> struct.Struct:
+        """Record layout for this player's world"""
+        return snapshot_format(len(self.world.skills), len(self.world.items))
+    
+    def snapshot(self) -> bytes:
+        """Pack health, score, location, skills and inventory into a fixed-size record"""
+        return self.snapshot_format.pack(self.health, self.score, self.location, *self.skills, *self.inventory)
+    
+    def restore(self, data: bytes) -> None:
+        """Load state saved by snapshot() for the same world"""
+        fields = self.snapshot_format.unpack(data)
+        skill_end = 3 + len(self.skills)
+        self.health, self.score, self.location = fields[:3]
+        self.skills = array("i", fields[3:skill_end])
+        self.inventory = array("I", fields[skill_end:])
+
+@lru_cache(maxsize=None)
+def snapshot_format(skill_count: int, item_count: int) -> struct.Struct:
+    """Player record: health, score and location, then skill levels and item counts"""
+    return struct.Struct(f"<iii{skill_count}i{item_count}I")
+
+# Journal opcode for moves, after the world effect opcodes
+MOVE = len(EFFECTS)
+
+# Player methods for each world effect opcode (world.EFFECTS order)
+EFFECT_HANDLERS = (Player.add_score, Player.add_to_inventory, Player.improve_skill,
+                   Player.take_damage, Player.heal)
 
 class Game:
-    def __init__(self):
+    # Final exam settings
+    exam_questions = 5
+    pass_percent = 70
+    question_points = 10
+    pass_points = 50
+    # Favour exam topics named after the skills the player trained most
+    weight_exam_by_skills = False
+    # Let the player ask for the next step towards the final exam; None offers
+    # hints only on worlds whose hint table builds in a moment
+    show_hints: Optional[bool] = None
+    
+    def __init__(self, renderer: Optional[Renderer] = None, world: Optional[World] = None,
+                 store: Optional["SessionStore"] = None, seed: Optional[int] = None,
+                 question_bank: Optional[QuestionBank] = None, leaderboard: Optional["Leaderboard"] = None,
+                 events: Optional[EventLog] = None):
+        self.renderer = renderer if renderer is not None else Renderer()
         self.player = None
-        self.locations = self.load_game_data()
+        self.world = world if world is not None else self.load_game_data()
+        self.store = store
+        self.question_bank = question_bank
+        self.leaderboard = leaderboard
+        self.events = events
+        # Each session draws its random events from its own generator, so a
+        # seed and the player's inputs replay a session exactly
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self.rng = random.Random(self.seed)
+        # Tells this run's events apart from other runs with the same seed
+        self.session_id = new_session_id()
+        self.location_id = self.world.start
+        if self.show_hints is None:
+            self.show_hints = solver.hints_by_default(self.world)
         
-    def load_game_data(self) -> Dict:
-        """Load game data from a file or use default data"""
-        # In a real game, we might load this from a JSON file
-        return {
-            "cloud_academy": {
-                "name": "AWS Cloud Academy",
-                "description": "The starting point of your AWS adventure. Here you can learn the basics of AWS services.",
-                "options": [
-                    {"text": "Take the EC2 course", "destination": "ec2_lab", "skill_gain": {"compute": 1}},
-                    {"text": "Learn about S3", "destination": "s3_lab", "skill_gain": {"storage": 1}},
-                    {"text": "Study networking", "destination": "vpc_lab", "skill_gain": {"networking": 1}},
-                    {"text": "Check your status", "action": "status"}
-                ]
-            },
-            "ec2_lab": {
-                "name": "EC2 Laboratory",
-                "description": "You're in a virtual lab environment learning about EC2 instances. The terminal shows various instance types.",
-                "options": [
-                    {"text": "Launch a t2.micro instance", "action": "ec2_launch", "skill_check": {"compute": 2}},
-                    {"text": "Configure security groups", "action": "security_group", "skill_check": {"security": 2}},
-                    {"text": "Return to Cloud Academy", "destination": "cloud_academy"},
-                    {"text": "Check your status", "action": "status"}
-                ]
-            },
-            "s3_lab": {
-                "name": "S3 Storage Workshop",
-                "description": "You're surrounded by virtual storage buckets. A console displays S3 commands and best practices.",
-                "options": [
-                    {"text": "Create a new bucket", "action": "create_bucket", "skill_check": {"storage": 2}},
-                    {"text": "Configure bucket policies", "action": "bucket_policy", "skill_check": {"security": 2}},
-                    {"text": "Return to Cloud Academy", "destination": "cloud_academy"},
-                    {"text": "Check your status", "action": "status"}
-                ]
-            },
-            "vpc_lab": {
-                "name": "VPC Networking Center",
-                "description": "A complex diagram of network connections is displayed on a large screen. Subnets, route tables, and gateways are highlighted.",
-                "options": [
-                    {"text": "Design a multi-AZ architecture", "action": "multi_az", "skill_check": {"networking": 2}},
-                    {"text": "Configure a NAT Gateway", "action": "nat_gateway", "skill_check": {"networking": 3}},
-                    {"text": "Return to Cloud Academy", "destination": "cloud_academy"},
-                    {"text": "Check your status", "action": "status"}
-                ]
-            },
-            "lambda_workshop": {
-                "name": "Serverless Workshop",
-                "description": "A futuristic room with floating code snippets and event-driven architectures visualized in 3D.",
-                "options": [
-                    {"text": "Create a Lambda function", "action": "create_lambda", "skill_check": {"serverless": 2}},
-                    {"text": "Set up API Gateway", "action": "api_gateway", "skill_check": {"networking": 2, "serverless": 1}},
-                    {"text": "Return to Cloud Academy", "destination": "cloud_academy"},
-                    {"text": "Check your status", "action": "status"}
-                ]
-            },
-            "final_challenge": {
-                "name": "AWS Certification Exam",
-                "description": "You've reached the final challenge! Put your AWS knowledge to the test in this certification exam.",
-                "options": [
-                    {"text": "Take the exam", "action": "final_exam"},
-                    {"text": "Return to Cloud Academy to study more", "destination": "cloud_academy"},
-                    {"text": "Check your status", "action": "status"}
-                ]
-            }
-        }
+    def load_game_data(self, path: str = DEFAULT_WORLD) -> World:
+        """Load game data from a world file, compiled and cached by world.load_world"""
+        return load_world(path)
+    
+    def load_question_bank(self) -> QuestionBank:
+        """Open the exam's question bank the first time it is needed"""
+        if self.question_bank is None:
+            self.question_bank = load_question_bank()
+        return self.question_bank
     
     def start(self) -> None:
         """Start the game"""
+        self.run(self.session())
+    
+    def run(self, session: Session) -> None:
+        """Drive a session from the terminal, blocking on input and delays"""
+        try:
+            request = next(session)
+            while True:
+                if isinstance(request, Delay):
+                    time.sleep(request.seconds)
+                    request = session.send(None)
+                else:
+                    request = session.send(input(request.prompt))
+        except StopIteration:
+            pass
+    
+    def run_commands(self, session: Session, commands: Iterator[str]) -> bool:
+        """Drive a session from a stream of answers without ever waiting.
+        
+        Delays are skipped and pause prompts answered at once, so only real
+        prompts take an answer; each is echoed after its prompt, as in a
+        terminal. Returns False if the commands ran out before the session
+        ended.
+        """
+        try:
+            request = next(session)
+            while True:
+                if isinstance(request, Delay) or request.pause:
+                    request = session.send(None)
+                    continue
+                answer = next(commands, None)
+                if answer is None:
+                    session.close()
+                    return False
+                self.renderer.write(request.prompt + answer)
+                request = session.send(answer)
+        except StopIteration:
+            return True
+    
+    def session(self) -> Session:
+        """Play a whole session, from asking the player's name to the end"""
         self.clear_screen()
         self.print_title()
-        print(f"{Colors.CYAN}Welcome to the AWS Adventure Game!{Colors.ENDC}")
-        print("In this game, you'll navigate the AWS Cloud, learn new skills,")
-        print("and face challenges to become an AWS expert.\n")
+        self.renderer.write(f"{Colors.CYAN}Welcome to the AWS Adventure Game!{Colors.ENDC}")
+        self.renderer.write("In this game, you'll navigate the AWS Cloud, learn new skills,")
+        self.renderer.write("and face challenges to become an AWS expert.\n")
         
-        name = input("Enter your name: ")
-        self.player = Player(name)
+        name = yield from self.prompt("Enter your name: ")
+        self.player = Player(name, self.renderer, self.world)
+        
+        # Start at the Cloud Academy, or where a saved session left off
+        location_id = self.world.start
+        resumed = self.resume_player()
+        if resumed:
+            location_id = self.player.location
+            self.renderer.write(f"\nWelcome back, {name}! Your AWS adventure continues...\n")
+        else:
+            self.renderer.write(f"\nWelcome, {name}! Your AWS adventure begins now...\n")
+        if self.events is not None:
+            self.events.emit(self.session_id, "start", player=name, resumed=resumed,
+                             location=self.world.keys[location_id], seed=self.seed)
+        yield from self.delay(1)
         
-        print(f"\nWelcome, {name}! Your AWS adventure begins now...\n")
-        time.sleep(1)
+        return (yield from self.play(location_id))
+    
+    def resume_player(self) -> bool:
+        """Attach the player to the session store; True if a saved session was restored"""
+        if self.store is None:
+            return False
+        try:
+            return self.store.attach(self.player)
+        except ValueError as e:
+            # SessionStoreError, e.g. the same name already playing
+            self.renderer.write(f"{Colors.RED}{e}; this session will not be saved.{Colors.ENDC}")
+            return False
+    
+    def play(self, location_id: Optional[int]) -> Session:
+        """Step through locations until a step returns no next location.
         
-        # Start at the Cloud Academy
-        self.navigate_to("cloud_academy")
+        Each step renders one screen, handles one choice and returns the id of
+        the next location, so the stack depth stays constant however long the
+        session runs. Input and delays are yielded to whichever driver runs
+        the session.
+        """
+        finished = False
+        try:
+            while location_id is not None:
+                location_id = yield from self.navigate_to(location_id)
+            finished = True
+        except GameOver as e:
+            finished = True
+            self.record_result(passed=False)
+            self.emit_end("game_over", reason=str(e))
+        finally:
+            if not finished:
+                self.emit_end("left")
+            self.renderer.flush()
+            if self.store is not None:
+                # A session that stops early, e.g. on disconnect, can be resumed
+                if finished:
+                    self.store.end(self.player)
+                else:
+                    self.store.detach(self.player)
+        return None
+    
+    def record_result(self, passed: bool) -> None:
+        """Enter a finished session on the leaderboard and show the player's rank"""
+        if self.leaderboard is None:
+            return
+        rank = self.leaderboard.record(self.player.name, self.player.score, passed)
+        self.renderer.write(f"{Colors.CYAN}Leaderboard: your best score ranks #{rank} of {len(self.leaderboard)}.{Colors.ENDC}")
+    
+    def emit_end(self, outcome: str, **fields: Any) -> None:
+        """Log how the session ended"""
+        if self.events is not None and self.player is not None:
+            self.events.emit(self.session_id, "end", outcome=outcome, score=self.player.score,
+                             health=self.player.health, **fields)
     
     def clear_screen(self) -> None:
         """Clear the terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.renderer.clear()
+    
+    def prompt(self, text: str, pause: bool = False, choices: int = 0) -> Generator[Request, Optional[str], str]:
+        """Flush the pending screen and ask the driver for a line of input"""
+        self.renderer.flush()
+        answer = yield Input(text, pause, choices)
+        return answer if answer is not None else ""
+    
+    def pause(self) -> Generator[Request, Optional[str], str]:
+        """Wait for the player to press Enter"""
+        return (yield from self.prompt("\nPress Enter to continue...", pause=True))
+    
+    def delay(self, seconds: float) -> Generator[Request, Optional[str], None]:
+        """Flush the pending screen and ask the driver to wait"""
+        self.renderer.flush()
+        yield Delay(seconds)
     
     def print_title(self) -> None:
         """Print the game title"""
@@ -192,250 +472,252 @@ class Game:
    ██║  ██║╚███╔███╔╝███████║    ██║  ██║██████╔╝ ╚████╔╝ ███████╗██║ ╚████║   ██║   ╚██████╔╝██║  ██║███████╗
    ╚═╝  ╚═╝ ╚══╝╚══╝ ╚══════╝    ╚═╝  ╚═╝╚═════╝   ╚═══╝  ╚══════╝╚═╝  ╚═══╝   ╚═╝    ╚═════╝ ╚═╝  ╚═╝╚══════╝
         """
-        print(f"{Colors.YELLOW}{title}{Colors.ENDC}")
+        self.renderer.write(f"{Colors.YELLOW}{title}{Colors.ENDC}")
     
-    def navigate_to(self, location_key: str) -> None:
-        """Navigate to a new location"""
-        if location_key in self.locations:
-            location = self.locations[location_key]
-            self.player.current_location = location_key
+    def navigate_to(self, location_id: int) -> Session:
+        """Navigate to a new location and return the id of the next one"""
+        if 0 <= location_id < len(self.world.locations):
+            location = self.world.locations[location_id]
+            self.location_id = location_id
+            self.player.move_to(location_id)
+            if self.events is not None:
+                self.events.emit(self.session_id, "move", location=location.key)
             
             self.clear_screen()
-            print(f"\n{Colors.BOLD}{Colors.CYAN}=== {location['name']} ==={Colors.ENDC}")
-            print(f"{Colors.CYAN}{location['description']}{Colors.ENDC}\n")
+            self.renderer.write(f"\n{Colors.BOLD}{Colors.CYAN}=== {location.name} ==={Colors.ENDC}")
+            self.renderer.write(f"{Colors.CYAN}{location.description}{Colors.ENDC}\n")
             
-            self.show_options(location)
+            return (yield from self.show_options(location))
         else:
-            print(f"{Colors.RED}Error: Location '{location_key}' not found!{Colors.ENDC}")
+            self.renderer.write(f"{Colors.RED}Error: Location {location_id} not found!{Colors.ENDC}")
+            return None
     
-    def show_options(self, location: Dict) -> None:
-        """Show available options at the current location"""
-        print(f"{Colors.BOLD}What would you like to do?{Colors.ENDC}")
+    def show_options(self, location: Location) -> Session:
+        """Show available options at the current location and return the next location"""
+        self.renderer.write(f"{Colors.BOLD}What would you like to do?{Colors.ENDC}")
         
-        for i, option in enumerate(location["options"], 1):
-            print(f"{i}. {option['text']}")
+        for i, option in enumerate(location.options, 1):
+            self.renderer.write(f"{i}. {option.text}")
+        if self.show_hints:
+            self.renderer.write(f"{Colors.BLUE}(Enter h for a hint){Colors.ENDC}")
         
-        choice = self.get_valid_input(len(location["options"]))
-        self.process_choice(location["options"][choice - 1])
+        choice = yield from self.get_valid_input(len(location.options), self.show_hints)
+        return (yield from self.process_choice(location.options[choice - 1]))
     
-    def get_valid_input(self, max_value: int) -> int:
-        """Get valid numerical input from the user"""
+    def get_valid_input(self, max_value: int, hints: bool = False) -> Generator[Request, Optional[str], int]:
+        """Get valid numerical input from the user, showing a hint when asked"""
         while True:
             try:
-                choice = int(input("\nEnter your choice (1-" + str(max_value) + "): "))
+                answer = yield from self.prompt("\nEnter your choice (1-" + str(max_value) + "): ", choices=max_value)
+                if hints and answer.strip().lower() == "h":
+                    self.show_hint()
+                    continue
+                choice = int(answer)
                 if 1 <= choice <= max_value:
                     return choice
                 else:
-                    print(f"{Colors.RED}Please enter a number between 1 and {max_value}.{Colors.ENDC}")
+                    self.renderer.write(f"{Colors.RED}Please enter a number between 1 and {max_value}.{Colors.ENDC}")
             except ValueError:
-                print(f"{Colors.RED}Please enter a valid number.{Colors.ENDC}")
+                self.renderer.write(f"{Colors.RED}Please enter a valid number.{Colors.ENDC}")
+    
+    def show_hint(self) -> None:
+        """Name the option that starts the shortest route to the final exam from here"""
+        # Looked up in the world's hint table, built on first use unless cached
+        hint = solver.lookup(solver.hint_table(self.world), self.location_id, self.player.skills)
+        if hint is None:
+            self.renderer.write(f"{Colors.YELLOW}No route to the final exam starts here with your current skills.{Colors.ENDC}")
+        else:
+            choice = hint.option - self.world.option_start[self.location_id] + 1
+            steps = "choice" if hint.steps == 1 else "choices"
+            self.renderer.write(f"{Colors.BLUE}Hint: choose {choice}. The final exam is {hint.steps} {steps} away.{Colors.ENDC}")
     
-    def process_choice(self, option: Dict) -> None:
-        """Process the player's choice"""
+    def process_choice(self, option: Option) -> Session:
+        """Process the player's choice and return the next location"""
         # Check if this option requires a skill check
-        if "skill_check" in option:
-            if not self.skill_check(option["skill_check"]):
-                # Failed the skill check
-                return
+        if option.skill_check:
+            if not (yield from self.skill_check(option.skill_check)):
+                # Failed the skill check, stay where we are
+                return self.location_id
         
         # Apply skill gains if any
-        if "skill_gain" in option:
-            for skill, amount in option["skill_gain"].items():
-                self.player.improve_skill(skill, amount)
+        for skill_id, amount in option.skill_gain:
+            self.player.improve_skill(self.world.skills[skill_id], amount)
+            if self.events is not None:
+                self.events.emit(self.session_id, "effect", effect="skill", value=amount,
+                                 skill=self.world.skills[skill_id], level=self.player.skills[skill_id])
         
-        # Process the action or destination
-        if "destination" in option:
-            self.navigate_to(option["destination"])
-        elif "action" in option:
-            self.perform_action(option["action"])
-        else:
-            print(f"{Colors.RED}Error: Invalid option configuration!{Colors.ENDC}")
+        # Process the action or destination; the world compiler guarantees one of them
+        if option.destination >= 0:
+            return option.destination
+        return (yield from self.perform_action(option.action))
     
-    def skill_check(self, required_skills: Dict) -> bool:
+    def skill_check(self, required_skills: Tuple[Tuple[int, int], ...]) -> Generator[Request, Optional[str], bool]:
         """Check if the player has the required skills"""
-        for skill, level in required_skills.items():
-            if self.player.skills.get(skill, 0) < level:
-                print(f"\n{Colors.RED}You need {skill.capitalize()} level {level} to do this, but your level is {self.player.skills.get(skill, 0)}.{Colors.ENDC}")
-                print(f"{Colors.YELLOW}Hint: Try improving your {skill} skill first!{Colors.ENDC}")
-                input("\nPress Enter to continue...")
-                self.navigate_to(self.player.current_location)
+        skills = self.player.skills
+        if self.events is not None:
+            missing = next((self.world.skills[skill_id] for skill_id, level in required_skills
+                            if skills[skill_id] < level), None)
+            self.events.emit(self.session_id, "check", location=self.world.keys[self.location_id],
+                             required={self.world.skills[skill_id]: level for skill_id, level in required_skills},
+                             passed=missing is None, missing=missing)
+        for skill_id, level in required_skills:
+            if skills[skill_id] < level:
+                skill = self.world.skills[skill_id]
+                self.renderer.write(f"\n{Colors.RED}You need {skill.capitalize()} level {level} to do this, but your level is {skills[skill_id]}.{Colors.ENDC}")
+                self.renderer.write(f"{Colors.YELLOW}Hint: Try improving your {skill} skill first!{Colors.ENDC}")
+                yield from self.pause()
                 return False
         return True
     
-    def perform_action(self, action: str) -> None:
-        """Perform a specific game action"""
-        if action == "status":
-            self.player.show_status()
-            input("\nPress Enter to continue...")
-            self.navigate_to(self.player.current_location)
-        
-        elif action == "ec2_launch":
-            print(f"\n{Colors.GREEN}You successfully launched an EC2 instance!{Colors.ENDC}")
-            print("The instance is now running and accessible.")
-            self.player.add_to_inventory("EC2 Instance Key")
-            self.player.add_score(10)
-            self.player.improve_skill("compute")
-            
-            # Random event
-            if random.random() < 0.3:
-                print(f"\n{Colors.RED}Oh no! You forgot to set a proper security group and your instance was compromised!{Colors.ENDC}")
-                self.player.take_damage(20)
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("lambda_workshop")  # Progress to next area
-        
-        elif action == "security_group":
-            print(f"\n{Colors.GREEN}You configured secure and efficient security groups!{Colors.ENDC}")
-            print("Your instances are now protected from unauthorized access.")
-            self.player.add_score(15)
-            self.player.improve_skill("security", 2)
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("lambda_workshop")  # Progress to next area
-        
-        elif action == "create_bucket":
-            print(f"\n{Colors.GREEN}You created an S3 bucket with proper configurations!{Colors.ENDC}")
-            print("The bucket is ready to store your application data securely.")
-            self.player.add_to_inventory("S3 Access Key")
-            self.player.add_score(10)
-            self.player.improve_skill("storage")
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("lambda_workshop")  # Progress to next area
+    def perform_action(self, action_id: int) -> Session:
+        """Perform a specific game action and return the next location"""
+        if not 0 <= action_id < len(self.world.actions):
+            self.renderer.write(f"{Colors.RED}Error: Unknown action {action_id}!{Colors.ENDC}")
+            yield from self.pause()
+            return self.location_id
         
-        elif action == "bucket_policy":
-            print(f"\n{Colors.GREEN}You implemented a secure bucket policy!{Colors.ENDC}")
-            print("Your data is now protected with proper access controls.")
-            self.player.add_score(15)
-            self.player.improve_skill("security")
-            self.player.improve_skill("storage")
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("lambda_workshop")  # Progress to next area
-        
-        elif action == "multi_az":
-            print(f"\n{Colors.GREEN}You designed a resilient multi-AZ architecture!{Colors.ENDC}")
-            print("Your application can now withstand AZ failures.")
-            self.player.add_score(20)
-            self.player.improve_skill("networking", 2)
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("lambda_workshop")  # Progress to next area
-        
-        elif action == "nat_gateway":
-            print(f"\n{Colors.GREEN}You successfully configured a NAT Gateway!{Colors.ENDC}")
-            print("Your private instances can now access the internet securely.")
-            self.player.add_score(25)
-            self.player.improve_skill("networking", 2)
-            self.player.improve_skill("security")
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("lambda_workshop")  # Progress to next area
+        action = self.world.actions[action_id]
+        if action.kind == STATUS:
+            self.player.show_status()
+            yield from self.pause()
+            return self.location_id
         
-        elif action == "create_lambda":
-            print(f"\n{Colors.GREEN}You created a Lambda function that processes data automatically!{Colors.ENDC}")
-            print("Your serverless application is now running efficiently.")
-            self.player.add_to_inventory("Lambda Function URL")
-            self.player.add_score(20)
-            self.player.improve_skill("serverless", 2)
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("final_challenge")  # Progress to final challenge
+        if action.kind == FINAL_EXAM:
+            return (yield from self.run_final_exam())
         
-        elif action == "api_gateway":
-            print(f"\n{Colors.GREEN}You set up an API Gateway to expose your Lambda functions!{Colors.ENDC}")
-            print("Your serverless API is now accessible to clients.")
-            self.player.add_score(25)
-            self.player.improve_skill("networking")
-            self.player.improve_skill("serverless", 2)
-            
-            input("\nPress Enter to continue...")
-            self.navigate_to("final_challenge")  # Progress to final challenge
+        if self.events is not None:
+            self.events.emit(self.session_id, "action", location=self.world.keys[self.location_id], action=action.name)
+        self.renderer.write(f"\n{Colors.GREEN}{action.success}{Colors.ENDC}")
+        if action.details:
+            self.renderer.write(action.details)
+        self.apply_effects(action.effects)
         
-        elif action == "final_exam":
-            self.run_final_exam()
+        # Random events
+        for event in action.events:
+            if self.rng.random() < event.chance:
+                if self.events is not None:
+                    self.events.emit(self.session_id, "event", action=action.name, message=event.message)
+                self.renderer.write(f"\n{Colors.RED}{event.message}{Colors.ENDC}")
+                self.apply_effects(event.effects)
         
+        yield from self.pause()
+        return action.destination if action.destination >= 0 else self.location_id
+    
+    def apply_effects(self, effects: Tuple[Effect, ...]) -> None:
+        """Apply precompiled action effects to the player"""
+        player = self.player
+        for opcode, args in effects:
+            if self.events is not None:
+                # Logged first, since fatal damage ends the session
+                self.emit_effect(opcode, args)
+            EFFECT_HANDLERS[opcode](player, *args)
+    
+    def emit_effect(self, opcode: int, args: tuple) -> None:
+        """Log an effect about to be applied; skill gains carry the level they lead to"""
+        if opcode == SKILL:
+            skill, amount = args
+            self.events.emit(self.session_id, "effect", effect="skill", value=amount, skill=skill,
+                             level=self.player.skill_level(skill) + amount)
         else:
-            print(f"{Colors.RED}Error: Unknown action '{action}'!{Colors.ENDC}")
-            input("\nPress Enter to continue...")
-            self.navigate_to(self.player.current_location)
+            self.events.emit(self.session_id, "effect", effect=EFFECTS[opcode], value=args[0])
     
-    def run_final_exam(self) -> None:
-        """Run the final certification exam"""
+    def run_final_exam(self) -> Session:
+        """Run the final certification exam and return the next location"""
         self.clear_screen()
-        print(f"\n{Colors.BOLD}{Colors.CYAN}=== AWS Certification Exam ==={Colors.ENDC}")
-        print(f"{Colors.CYAN}This is your final challenge! Answer these AWS questions correctly to complete your journey.{Colors.ENDC}\n")
+        self.renderer.write(f"\n{Colors.BOLD}{Colors.CYAN}=== AWS Certification Exam ==={Colors.ENDC}")
+        self.renderer.write(f"{Colors.CYAN}This is your final challenge! Answer these AWS questions correctly to complete your journey.{Colors.ENDC}\n")
         
-        questions = [
-            {
-                "question": "Which AWS service is used for storing objects?",
-                "options": ["EC2", "S3", "RDS", "Lambda"],
-                "correct": 1  # 0-indexed, so 1 means "S3"
-            },
-            {
-                "question": "Which AWS service is used for serverless computing?",
-                "options": ["EC2", "EBS", "Lambda", "RDS"],
-                "correct": 2
-            },
-            {
-                "question": "Which AWS service is used for virtual networking?",
-                "options": ["S3", "VPC", "DynamoDB", "SQS"],
-                "correct": 1
-            },
-            {
-                "question": "Which storage class in S3 is designed for long-term archival?",
-                "options": ["S3 Standard", "S3 Intelligent-Tiering", "S3 One Zone-IA", "S3 Glacier"],
-                "correct": 3
-            },
-            {
-                "question": "Which AWS service would you use to run a containerized application?",
-                "options": ["EC2", "Lambda", "ECS/EKS", "S3"],
-                "correct": 2
-            }
-        ]
+        bank = self.load_question_bank()
+        weights = bank.skill_weights(self.world.skills, self.player.skills) if self.weight_exam_by_skills else None
+        questions = bank.sample(self.exam_questions, self.rng, weights)
         
         correct_answers = 0
         
         for i, q in enumerate(questions, 1):
-            print(f"\n{Colors.BOLD}Question {i}:{Colors.ENDC} {q['question']}")
-            for j, option in enumerate(q['options']):
-                print(f"{j+1}. {option}")
+            self.renderer.write(f"\n{Colors.BOLD}Question {i}:{Colors.ENDC} {q.question}")
+            for j, option in enumerate(q.options):
+                self.renderer.write(f"{j+1}. {option}")
             
-            answer = self.get_valid_input(len(q['options'])) - 1
+            answer = (yield from self.get_valid_input(len(q.options))) - 1
             
-            if answer == q['correct']:
-                print(f"{Colors.GREEN}Correct!{Colors.ENDC}")
+            if self.events is not None:
+                self.events.emit(self.session_id, "answer", question=i, topic=q.topic, correct=answer == q.correct)
+            if answer == q.correct:
+                self.renderer.write(f"{Colors.GREEN}Correct!{Colors.ENDC}")
                 correct_answers += 1
-                self.player.add_score(10)
+                self.player.add_score(self.question_points)
             else:
-                print(f"{Colors.RED}Incorrect! The correct answer was: {q['options'][q['correct']]}{Colors.ENDC}")
+                self.renderer.write(f"{Colors.RED}Incorrect! The correct answer was: {q.options[q.correct]}{Colors.ENDC}")
             
-            time.sleep(1)
+            yield from self.delay(1)
         
         # Calculate result
-        score_percent = (correct_answers / len(questions)) * 100
+        score_percent = (correct_answers / max(len(questions), 1)) * 100
+        if self.events is not None:
+            self.events.emit(self.session_id, "exam", correct=correct_answers, questions=len(questions),
+                             passed=score_percent >= self.pass_percent)
         
         self.clear_screen()
-        print(f"\n{Colors.BOLD}{Colors.CYAN}=== Exam Results ==={Colors.ENDC}")
-        print(f"You answered {correct_answers} out of {len(questions)} questions correctly ({score_percent}%).")
+        self.renderer.write(f"\n{Colors.BOLD}{Colors.CYAN}=== Exam Results ==={Colors.ENDC}")
+        self.renderer.write(f"You answered {correct_answers} out of {len(questions)} questions correctly ({score_percent}%).")
         
-        if score_percent >= 70:
-            print(f"\n{Colors.GREEN}{Colors.BOLD}Congratulations! You passed the AWS Certification Exam!{Colors.ENDC}")
-            self.player.add_score(50)
-            self.player.add_to_inventory("AWS Certification")
+        if score_percent >= self.pass_percent:
+            self.renderer.write(f"\n{Colors.GREEN}{Colors.BOLD}Congratulations! You passed the AWS Certification Exam!{Colors.ENDC}")
+            self.player.add_score(self.pass_points)
+            self.player.add_to_inventory(CERTIFICATE)
             
-            print(f"\n{Colors.YELLOW}{Colors.BOLD}You have completed the AWS Adventure Game!{Colors.ENDC}")
-            print(f"Final Score: {self.player.score}")
-            print(f"\nThanks for playing, {self.player.name}!")
-            
-            sys.exit(0)
+            self.renderer.write(f"\n{Colors.YELLOW}{Colors.BOLD}You have completed the AWS Adventure Game!{Colors.ENDC}")
+            self.renderer.write(f"Final Score: {self.player.score}")
+            self.renderer.write(f"\nThanks for playing, {self.player.name}!")
+            self.record_result(passed=True)
+            self.emit_end("passed")
+            return None
         else:
-            print(f"\n{Colors.RED}Unfortunately, you didn't pass the exam. You need at least 70% to pass.{Colors.ENDC}")
-            print(f"{Colors.YELLOW}Don't worry, you can study more and try again!{Colors.ENDC}")
+            self.renderer.write(f"\n{Colors.RED}Unfortunately, you didn't pass the exam. You need at least {self.pass_percent}% to pass.{Colors.ENDC}")
+            self.renderer.write(f"{Colors.YELLOW}Don't worry, you can study more and try again!{Colors.ENDC}")
             
-            input("\nPress Enter to continue...")
-            self.navigate_to("cloud_academy")
+            yield from self.pause()
+            return self.world.start
+
+def play_commands(path: str, seed: Optional[int], events: Optional[EventLog]) -> None:
+    """Play sessions from a command stream ("-" for stdin) back to back until it runs out"""
+    # A session that runs out of its line's answers ends there, and the next line starts afresh
+    if path == "-":
+        stream = open(sys.stdin.fileno(), buffering=COMMAND_BUFFER, closefd=False)
+    else:
+        stream = open(path, buffering=COMMAND_BUFFER)
+    world = load_world()
+    question_bank = None
+    sessions = finished = 0
+    start = time.perf_counter()
+    with stream, BatchRenderer() as renderer:
+        for answers in read_sessions(stream):
+            game = Game(renderer, world, seed=None if seed is None else seed + sessions,
+                        question_bank=question_bank, events=events)
+            finished += game.run_commands(game.session(), iter(answers))
+            question_bank = game.question_bank
+            sessions += 1
+    elapsed = time.perf_counter() - start
+    print(f"Played {sessions:,} sessions ({finished:,} finished) in {elapsed * 1000:.2f} ms", file=sys.stderr)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play the AWS Adventure Game")
+    parser.add_argument("--turbo", nargs="?", const="-", metavar="FILE",
+                        help="play without waiting, answering prompts from FILE or stdin; "
+                             "each line may hold several answers")
+    parser.add_argument("--seed", type=int, help="seed for random events; turbo sessions count up from it")
+    parser.add_argument("--events", metavar="FILE", help="append gameplay events to this JSON lines file")
+    args = parser.parse_args()
+    
+    events = EventLog(args.events) if args.events else None
+    try:
+        if args.turbo is None:
+            Game(seed=args.seed, events=events).start()
+        else:
+            play_commands(args.turbo, args.seed, events)
+    finally:
+        if events is not None:
+            events.close()
 
 if __name__ == "__main__":
-    game = Game()
-    game.start()
+    main()
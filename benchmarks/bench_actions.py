@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark action dispatch: the compiled action table versus an if/elif chain.
+
+Generates a world with many declared actions and times a full action,
+rendering, effects, random events and the pause included, for the first
+and last action ids. Both paths do the same work; they only differ in how
+the action is found. The table path indexes the action by id, which costs
+the same for every action. The chain path compares the name against every
+action in turn like the old ``perform_action``, so its cost grows with the
+position of the action.
+
+    python benchmarks/bench_actions.py --actions 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aws_adventure_game import Game, Player, Renderer, Session  # noqa: E402
+from bench_world_load import synthetic_world  # noqa: E402
+from world import load_world  # noqa: E402
+
+
+def by_id(game: Game, names: List[str], action_id: int) -> Session:
+    """Dispatch through the compiled table"""
+    return (yield from game.perform_action(action_id))
+
+
+def by_name(game: Game, names: List[str], action_id: int) -> Session:
+    """Find the action with an ``elif action == ...`` branch per name, then perform it"""
+    action = names[action_id]
+    for candidate_id, name in enumerate(names):
+        if action == name:
+            break
+    return (yield from game.perform_action(candidate_id))
+
+
+def time_dispatch(dispatch, game: Game, names: List[str], action_id: int, calls: int) -> float:
+    """Seconds per dispatched action, answering its pause immediately"""
+    # The same random events fire on both paths
+    game.rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(calls):
+        session = dispatch(game, names, action_id)
+        next(session)
+        try:
+            session.send("")
+        except StopIteration:
+            pass
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--actions", type=int, default=10_000)
+    parser.add_argument("--locations", type=int, default=1_000)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "actions.json")
+        with open(path, "w") as f:
+            json.dump(synthetic_world(args.locations, n_actions=args.actions), f)
+        start = time.perf_counter()
+        world = load_world(path, use_cache=False)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+    names = [action.name for action in world.actions]
+    with open(os.devnull, "w") as devnull:
+        game = Game(Renderer(devnull, color=True, clear=True), world=world)
+        game.player = Player("bench", game.renderer, world)
+        # Random events deal damage; keep the player alive for every call
+        game.player.health = 10 ** 9
+        print(f"world: {args.locations:,} locations, {len(world.actions):,} actions "
+              f"(compiled in {compile_ms:.0f} ms)")
+        first, last = 2, len(world.actions) - 1
+        for label, action_id in (("first", first), ("last", last)):
+            table = time_dispatch(by_id, game, names, action_id, args.calls)
+            chain = time_dispatch(by_name, game, names, action_id, args.calls)
+            print(f"{label} action: table {table * 1e6:8.2f} us/action, chain {chain * 1e6:8.2f} us/action "
+                  f"({chain / table:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
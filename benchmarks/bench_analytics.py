@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark gameplay event logging and the streaming analytics over the logs.
+
+Plays random-choice sessions in turbo mode with and without an EventLog
+and reports steps per second for each. The log it writes is copied into
+several shards, and analytics.py runs over them in one process and in a
+process pool. Peak memory of a single-process pass is reported for one
+shard and for all of them, to show it does not grow with the log.
+
+    python benchmarks/bench_analytics.py --sessions 2000 --shards 8 --workers 4
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import chain
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from analytics import analyze  # noqa: E402
+from aws_adventure_game import BatchRenderer, Game  # noqa: E402
+from events import EventLog  # noqa: E402
+from question_bank import load_question_bank  # noqa: E402
+from world import load_world  # noqa: E402
+
+
+def play(sessions: int, choices: int, events=None) -> float:
+    """Play random-choice sessions; returns steps per second"""
+    world = load_world()
+    question_bank = load_question_bank()
+    rng = random.Random(0)
+    steps = 0
+    with open(os.devnull, "w") as devnull:
+        renderer = BatchRenderer(devnull)
+        start = time.perf_counter()
+        for seed in range(sessions):
+            game = Game(renderer, world, seed=seed, question_bank=question_bank, events=events)
+            answers = [str(rng.randint(1, 4)) for _ in range(choices)]
+            steps += len(answers)
+            game.run_commands(game.session(), chain([f"bot{seed}"], answers))
+        renderer.close()
+        elapsed = time.perf_counter() - start
+    return steps / elapsed
+
+
+def peak_memory(paths) -> float:
+    tracemalloc.start()
+    analyze(paths)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000, help="sessions per shard")
+    parser.add_argument("--choices", type=int, default=200, help="choices per session")
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = play(args.sessions, args.choices)
+        log = EventLog(os.path.join(tmp, "events-0.jsonl"))
+        logged = play(args.sessions, args.choices, log)
+        log.close()
+        print(f"no event log:    {plain:12,.0f} steps/sec")
+        print(f"with event log:  {logged:12,.0f} steps/sec ({logged / plain - 1:+.1%})")
+
+        paths = [log.path]
+        for i in range(1, args.shards):
+            paths.append(os.path.join(tmp, f"events-{i}.jsonl"))
+            shutil.copyfile(log.path, paths[-1])
+        size = sum(os.path.getsize(path) for path in paths)
+
+        start = time.perf_counter()
+        events = analyze(paths[:1]).events
+        one = time.perf_counter() - start
+        print(f"analyze 1 shard: {events / one:12,.0f} events/sec "
+              f"({events:,} events, {os.path.getsize(log.path) / 1e6:.1f} MB)")
+        start = time.perf_counter()
+        events = analyze(paths, args.workers).events
+        pooled = time.perf_counter() - start
+        print(f"analyze {args.shards} shards: {events / pooled:11,.0f} events/sec "
+              f"({events:,} events, {size / 1e6:.1f} MB, {args.workers} workers)")
+        print(f"peak memory:     {peak_memory(paths[:1]):8.2f} MB for 1 shard, "
+              f"{peak_memory(paths):.2f} MB for {args.shards}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the leaderboard: recording results, rank queries and persistence.
+
+Records results for many players into a leaderboard backed by a SQLite
+file, then times rank and top-k queries. For comparison it times rank
+queries answered by scanning every player's best score, and inserting the
+same results with one commit per result and in the leaderboard's batches.
+
+    python benchmarks/bench_leaderboard.py --results 200000 --players 50000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from leaderboard import SCHEMA, Leaderboard, Result  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, default=200_000)
+    parser.add_argument("--players", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--inserts", type=int, default=20_000,
+                        help="results to insert with a commit each, then in batches")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = [(f"player{rng.randrange(args.players)}", rng.randrange(1_000_000), rng.random() < 0.5)
+               for _ in range(args.results)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        leaderboard = Leaderboard(os.path.join(tmp, "scores.db"))
+        start = time.perf_counter()
+        for name, score, passed in results:
+            leaderboard.record(name, score, passed)
+        leaderboard.flush()
+        elapsed = time.perf_counter() - start
+        print(f"record:              {args.results / elapsed:10,.0f} results/sec "
+              f"({len(leaderboard):,} players)")
+
+        names = list(leaderboard.bests)
+        queried = [rng.choice(names) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for name in queried:
+            leaderboard.rank(name)
+        elapsed = time.perf_counter() - start
+        print(f"rank (skip list):    {elapsed / args.queries * 1e6:10.2f} us/query")
+
+        scores = [best.score for best in leaderboard.bests.values()]
+        scanned = queried[:max(1, args.queries // 100)]
+        start = time.perf_counter()
+        for name in scanned:
+            score = leaderboard.bests[name].score
+            sum(1 for other in scores if other > score)
+        elapsed = time.perf_counter() - start
+        print(f"rank (scan):         {elapsed / len(scanned) * 1e6:10.2f} us/query")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            leaderboard.top(10, start=rng.randrange(len(leaderboard)))
+        print(f"top 10 at a rank:    {(time.perf_counter() - start) * 1000:10.2f} us/query")
+        leaderboard.close()
+
+        rows = [(name, score, passed, time.time()) for name, score, passed in results[:args.inserts]]
+        db = sqlite3.connect(os.path.join(tmp, "unbatched.db"))
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        start = time.perf_counter()
+        for row in rows:
+            with db:
+                db.execute("INSERT INTO sessions (name, score, passed, finished) VALUES (?, ?, ?, ?)", row)
+        elapsed = time.perf_counter() - start
+        print(f"insert, commit each: {len(rows) / elapsed:10,.0f} results/sec")
+        db.close()
+
+        batched = Leaderboard(os.path.join(tmp, "batched.db"))
+        start = time.perf_counter()
+        for i in range(0, len(rows), batched.batch_size):
+            batched.pending.extend(Result(*row) for row in rows[i:i + batched.batch_size])
+            batched.flush()
+        elapsed = time.perf_counter() - start
+        print(f"insert, batched:     {len(rows) / elapsed:10,.0f} results/sec")
+        batched.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of instrumentation on a scripted session.
+
+Plays the same scripted session as bench_suite.py with and without
+``Metrics.instrument`` and reports steps per second for each, then prints
+the Prometheus export of the instrumented run.
+
+    python benchmarks/bench_metrics.py --steps 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aws_adventure_game import Renderer  # noqa: E402
+from bench_suite import ScriptedGame  # noqa: E402
+from metrics import Metrics  # noqa: E402
+
+
+def steps_per_sec(steps: int, devnull, metrics=None) -> float:
+    game = ScriptedGame(steps, Renderer(devnull, color=True, clear=True))
+    if metrics is not None:
+        metrics.instrument(game)
+    with mock.patch("builtins.input", game.answer), mock.patch("time.sleep"):
+        start = time.perf_counter()
+        game.start()
+        elapsed = time.perf_counter() - start
+    return steps / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=200_000)
+    parser.add_argument("--quiet", action="store_true", help="leave out the Prometheus export")
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    with open(os.devnull, "w") as devnull:
+        plain = steps_per_sec(args.steps, devnull)
+        instrumented = steps_per_sec(args.steps, devnull, metrics)
+    print(f"not instrumented: {plain:12,.0f} steps/sec")
+    print(f"instrumented:     {instrumented:12,.0f} steps/sec ({instrumented / plain - 1:+.1%})")
+    if not args.quiet:
+        print()
+        print(metrics.prometheus(), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark paged worlds: memory, cache hit rate and step time on a large world.
+
+Generates a world with worldgen.py, pages it, then takes the same random
+walk through the fully loaded world and through the paged world under
+several cache caps. For each it reports the memory held by the world after
+a shorter walk, the time per step and, for the paged world, the region
+cache hit rate.
+
+    python benchmarks/bench_paging.py --locations 200000 --steps 200000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from paging import load_paged_world, page_world  # noqa: E402
+from world import load_world  # noqa: E402
+from worldgen import generate_world  # noqa: E402
+
+
+def walk(world, steps: int, seed: int = 0) -> float:
+    """Follow random options from the start as navigate_to would; returns seconds per step"""
+    rng = random.Random(seed)
+    location_id = world.start
+    start = time.perf_counter()
+    for _ in range(steps):
+        option = rng.choice(world.locations[location_id].options)
+        if option.destination >= 0:
+            location_id = option.destination
+        elif option.action >= 0 and world.actions[option.action].destination >= 0:
+            location_id = world.actions[option.action].destination
+    return (time.perf_counter() - start) / steps
+
+
+def resident(load, steps: int) -> float:
+    """Bytes still allocated after loading a world and walking it, in MB"""
+    gc.collect()
+    tracemalloc.start()
+    world = load()
+    walk(world, steps)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, default=100_000)
+    parser.add_argument("--steps", type=int, default=100_000)
+    parser.add_argument("--memory-steps", type=int, default=10_000,
+                        help="steps to walk while tracing memory, which is slow")
+    parser.add_argument("--region-size", type=int, default=256)
+    parser.add_argument("--cache-mb", type=float, nargs="+", default=[1, 4, 16, 64],
+                        help="page cache caps to try")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "generated.json")
+        pages = os.path.join(tmp, "pages")
+        with open(path, "w") as f:
+            json.dump(generate_world(args.locations, region_size=args.region_size), f)
+        world = load_world(path)
+        regions = page_world(world, pages, args.region_size)
+        print(f"{args.locations:,} locations in {regions:,} regions; {args.steps:,} steps per walk")
+
+        step = walk(world, args.steps)
+        del world
+        memory = resident(lambda: load_world(path), args.memory_steps)
+        print(f"loaded:        {memory:8.1f} MB  {step * 1e6:8.2f} us/step")
+
+        for cache_mb in args.cache_mb:
+            cache_bytes = int(cache_mb * (1 << 20))
+            world = load_paged_world(pages, cache_bytes)
+            step = walk(world, args.steps)
+            stats = world.cache.stats()
+            world.close()
+            del world
+            memory = resident(lambda: load_paged_world(pages, cache_bytes), args.memory_steps)
+            print(f"paged {cache_mb:5g} MB: {memory:8.1f} MB  {step * 1e6:8.2f} us/step  "
+                  f"hit rate {stats['hit_rate']:.1%}, {stats['evictions']:,} evictions")
+
+if __name__ == "__main__":
+    main()
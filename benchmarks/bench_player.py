@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark player state size and snapshot/restore throughput.
+
+Compares the compact Player (slots, skill and item arrays, struct snapshot)
+with the previous dict-and-list layout snapshotted with pickle. Memory is
+traced while building many players that share one renderer and world, so
+the figures are the per-session cost of the player state itself.
+
+    python benchmarks/bench_player.py --players 100000
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aws_adventure_game import Player, Renderer  # noqa: E402
+from world import load_world  # noqa: E402
+
+
+class LegacyPlayer:
+    """Player state as it was kept before: an instance dict, a skills dict and an item list"""
+
+    def __init__(self, name: str, renderer: Renderer):
+        self.name = name
+        self.renderer = renderer
+        self.inventory = []
+        self.skills = {"compute": 1, "storage": 1, "networking": 1, "security": 1, "serverless": 1}
+        self.health = 100
+        self.score = 0
+        self.current_location = "cloud_academy"
+
+    def add_to_inventory(self, item: str) -> None:
+        self.inventory.append(item)
+        self.renderer.write(f"Added {item} to your inventory!")
+
+    def improve_skill(self, skill: str, amount: int = 1) -> None:
+        self.skills[skill] += amount
+        self.renderer.write(f"Your {skill} skill increased to {self.skills[skill]}!")
+
+    def add_score(self, points: int) -> None:
+        self.score += points
+        self.renderer.write(f"You gained {points} points! Score: {self.score}")
+
+    def snapshot(self) -> bytes:
+        return pickle.dumps((self.health, self.score, self.current_location, self.skills, self.inventory),
+                            pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, data: bytes) -> None:
+        self.health, self.score, self.current_location, self.skills, self.inventory = pickle.loads(data)
+
+
+def play_a_little(player) -> None:
+    """Give a player the state of a typical mid-game session"""
+    player.add_to_inventory("EC2 Instance Key")
+    player.add_to_inventory("S3 Access Key")
+    player.improve_skill("compute", 2)
+    player.improve_skill("security", 1)
+    player.add_score(35)
+    # Drop the queued messages so only the player state is measured
+    player.renderer.buffer.clear()
+
+
+def bytes_per_player(make, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    players = [make(f"player{i}") for i in range(count)]
+    for player in players:
+        play_a_little(player)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+
+def throughput(player, rounds: int) -> tuple:
+    """Snapshots and restores per second"""
+    snapshot, restore = player.snapshot, player.restore
+    start = time.perf_counter()
+    for _ in range(rounds):
+        data = snapshot()
+    snapshots = rounds / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        restore(data)
+    restores = rounds / (time.perf_counter() - start)
+    return len(data), snapshots, restores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=500_000)
+    args = parser.parse_args()
+
+    world = load_world()
+    with open(os.devnull, "w") as devnull:
+        renderer = Renderer(devnull)
+        variants = {
+            "before (dict/list)": lambda name: LegacyPlayer(name, renderer),
+            "after (slots/arrays)": lambda name: Player(name, renderer, world),
+        }
+        for label, make in variants.items():
+            size = bytes_per_player(make, args.players)
+            player = make("bench")
+            play_a_little(player)
+            snapshot_size, snapshots, restores = throughput(player, args.rounds)
+            print(f"{label:22} {size:8.0f} B/session  snapshot {snapshot_size:4} B  "
+                  f"{snapshots:12,.0f} snapshots/s  {restores:12,.0f} restores/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark exam question sampling from a large question bank.
+
+Generates a JSON-lines bank in a temporary directory and reports the time
+to build and reload its index, the latency of drawing an exam's questions
+(uniform and weighted by skills, with a cold and a warm question cache) and
+the memory the open bank holds. For comparison it also loads the whole bank
+into a list of dicts, as a hardcoded question list would need.
+
+    python benchmarks/bench_question_bank.py --questions 500000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from question_bank import load_question_bank  # noqa: E402
+
+SKILLS = ["compute", "storage", "networking", "security", "serverless"]
+TOPICS = SKILLS + [f"topic_{i}" for i in range(15)]
+# A small topic that most exams draw from, to show the question cache at work
+HOT_TOPIC, HOT_QUESTIONS = "core", 2000
+
+
+def write_bank(path: str, count: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(count):
+            question = {
+                "topic": HOT_TOPIC if i < HOT_QUESTIONS else rng.choice(TOPICS),
+                "question": f"Question {i}: which of these services best fits scenario {rng.getrandbits(32):08x}?",
+                "options": [f"Service {rng.randrange(1000)}" for _ in range(4)],
+                "correct": rng.randrange(4),
+            }
+            f.write(json.dumps(question) + "\n")
+
+
+def rss_kib() -> int:
+    """Current resident set size, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return 0
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:34} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def exam_latency(bank, exams: int, k: int, weights=None) -> str:
+    rng = random.Random(1)
+    samples = []
+    for _ in range(exams):
+        start = time.perf_counter()
+        bank.sample(k, rng, weights)
+        samples.append(time.perf_counter() - start)
+    p50, p99 = (q * 1e6 for q in statistics.quantiles(samples, n=100, method="inclusive")[49::49])
+    info = bank.question.cache_info()
+    hit_rate = info.hits / max(info.hits + info.misses, 1)
+    bank.question.cache_clear()
+    return f"p50 {p50:7.1f} us  p99 {p99:7.1f} us  cache hits {hit_rate:6.1%}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=500_000)
+    parser.add_argument("--exams", type=int, default=20_000)
+    parser.add_argument("--k", type=int, default=5, help="questions per exam")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.jsonl")
+        write_bank(path, args.questions)
+        print(f"bank: {args.questions:,} questions, {len(TOPICS) + 1} topics, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB of JSON lines")
+
+        timed("first open (builds index)", lambda: load_question_bank(path).close())
+        gc.collect()
+        rss_before = rss_kib()
+        tracemalloc.start()
+        bank = timed("open with cached index", lambda: load_question_bank(path))
+        traced = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{'open bank memory':34} {traced / 1024:10.0f} KiB traced, "
+              f"{(rss_kib() - rss_before):,} KiB RSS growth")
+
+        cold = load_question_bank(path, cache_size=0)
+        weights = bank.skill_weights(SKILLS, [5, 1, 3, 1, 2])
+        hot = [1 if topic == HOT_TOPIC else 0 for topic in bank.topics]
+        print(f"{'exam, uniform, no cache':34} {exam_latency(cold, args.exams, args.k)}")
+        print(f"{'exam, uniform, LRU cache':34} {exam_latency(bank, args.exams, args.k)}")
+        print(f"{'exam, skill-weighted, LRU cache':34} {exam_latency(bank, args.exams, args.k, weights)}")
+        print(f"{'exam, hot topic, no cache':34} {exam_latency(cold, args.exams, args.k, hot)}")
+        print(f"{'exam, hot topic, LRU cache':34} {exam_latency(bank, args.exams, args.k, hot)}")
+        cold.close()
+        bank.close()
+
+        gc.collect()
+        rss_before = rss_kib()
+        tracemalloc.start()
+
+        def load_all():
+            with open(path) as f:
+                return [json.loads(line) for line in f]
+        questions = timed("load everything into a list", load_all)
+        traced = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{'list of dicts memory':34} {traced / 1024:10.0f} KiB traced, "
+              f"{(rss_kib() - rss_before):,} KiB RSS growth")
+        del questions
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for drawing one game screen.
+
+Compares the old approach (``os.system('clear')`` followed by one ``print``
+per line) with the buffered ``Renderer``, which clears with ANSI sequences
+and writes the whole frame in one call. Each frame is a location header,
+description, option list and the player status screen.
+
+    python benchmarks/bench_renderer.py --frames 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aws_adventure_game import Colors, Game, Player, Renderer  # noqa: E402
+
+
+def add_items(player) -> None:
+    for item in ("EC2 Instance Key", "S3 Access Key"):
+        player.inventory[player.world.item_ids[item]] += 1
+
+
+def legacy_frame(location, player) -> None:
+    """Draw a frame the way the game did before the renderer existed"""
+    # Same fork/exec as before, with the terminal output discarded
+    os.system('clear > ' + os.devnull)
+    print(f"\n{Colors.BOLD}{Colors.CYAN}=== {location.name} ==={Colors.ENDC}")
+    print(f"{Colors.CYAN}{location.description}{Colors.ENDC}\n")
+    print(f"{Colors.BOLD}What would you like to do?{Colors.ENDC}")
+    for i, option in enumerate(location.options, 1):
+        print(f"{i}. {option.text}")
+    print(f"\n{Colors.BOLD}=== {player.name}'s Status ==={Colors.ENDC}")
+    print(f"Health: {player.health}/100")
+    print(f"Score: {player.score}")
+    print(f"Location: {player.current_location}")
+    print("\nSkills:")
+    for skill, level in zip(player.world.skills, player.skills):
+        print(f"  {skill.capitalize()}: {level}")
+    print("\nInventory:")
+    for item in player.items():
+        print(f"  - {item}")
+    print("")
+
+
+def buffered_frame(game, location) -> None:
+    """Draw the same frame through the game's renderer"""
+    renderer = game.renderer
+    game.clear_screen()
+    renderer.write(f"\n{Colors.BOLD}{Colors.CYAN}=== {location.name} ==={Colors.ENDC}")
+    renderer.write(f"{Colors.CYAN}{location.description}{Colors.ENDC}\n")
+    renderer.write(f"{Colors.BOLD}What would you like to do?{Colors.ENDC}")
+    for i, option in enumerate(location.options, 1):
+        renderer.write(f"{i}. {option.text}")
+    game.player.show_status()
+    renderer.flush()
+
+
+def measure(draw, frames: int) -> float:
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw()
+    return frames / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--legacy-frames", type=int, default=500,
+                        help="frames for the os.system path, which is far slower")
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        results = {}
+        for label, renderer in (("buffered (color)", Renderer(devnull, color=True, clear=True)),
+                                ("buffered (plain)", Renderer(devnull, color=False, clear=False))):
+            game = Game(renderer)
+            game.player = Player("bench", renderer, game.world)
+            add_items(game.player)
+            location = game.world.locations[game.world.location_id("ec2_lab")]
+            results[label] = measure(lambda: buffered_frame(game, location), args.frames)
+
+        world = Game().world
+        player = Player("bench", Renderer(devnull), world)
+        add_items(player)
+        location = world.locations[world.location_id("ec2_lab")]
+        results["legacy"] = measure(lambda: legacy_frame(location, player), args.legacy_frames)
+
+    for label, fps in results.items():
+        print(f"{label:18} {fps:12,.0f} frames/sec")
+    print(f"{'speedup':18} {results['buffered (color)'] / results['legacy']:12,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark the session store: journal write rate and resume time.
+
+Attaches many players to a store in a temporary directory and journals
+state changes round-robin across them with fsync'd group commits. It then
+abandons the store without closing it, as a crash would, and times
+reopening it (which replays the journal tail) and resuming every session.
+Resume time depends on the checkpoint interval, not on how many records
+were written.
+
+    python benchmarks/bench_session_store.py --sessions 10000 --writes 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aws_adventure_game import MOVE, Player, Renderer  # noqa: E402
+from session_store import SessionStore  # noqa: E402
+from world import SCORE, SKILL, load_world  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--writes", type=int, default=1_000_000)
+    parser.add_argument("--checkpoint-records", type=int, default=1 << 18)
+    parser.add_argument("--no-fsync", action="store_true")
+    args = parser.parse_args()
+
+    world = load_world()
+    location_count = len(world.keys)
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        renderer = Renderer(devnull)
+        store = SessionStore(tmp, world, checkpoint_records=args.checkpoint_records,
+                             fsync=not args.no_fsync)
+        players = [Player(f"player{i}", renderer, world) for i in range(args.sessions)]
+        start = time.perf_counter()
+        for player in players:
+            store.attach(player)
+        attach_elapsed = time.perf_counter() - start
+
+        journals = [player.journal for player in players]
+        start = time.perf_counter()
+        for i in range(args.writes):
+            journal = journals[i % args.sessions]
+            step = i % 3
+            if step == 0:
+                journal(SCORE, 0, 10)
+            elif step == 1:
+                journal(SKILL, i % len(world.skills), 1)
+            else:
+                journal(MOVE, 0, i % location_count)
+        store.commit()
+        write_elapsed = time.perf_counter() - start
+        tail = store.seq - store.checkpoint_seq
+        # Abandon the store without a final checkpoint, as a crash would
+        store.segment.close()
+        store.mm.close()
+        store.file.close()
+
+        start = time.perf_counter()
+        reopened = SessionStore(tmp, world, fsync=not args.no_fsync)
+        recover_elapsed = time.perf_counter() - start
+        resumed = [Player(f"player{i}", renderer, world) for i in range(args.sessions)]
+        start = time.perf_counter()
+        for player in resumed:
+            reopened.attach(player)
+        resume_elapsed = time.perf_counter() - start
+        reopened.close()
+
+    print(f"sessions:           {args.sessions:,} (attached in {attach_elapsed * 1000:.0f} ms)")
+    print(f"journal writes:     {args.writes:,} in {write_elapsed:.2f} s "
+          f"({args.writes / write_elapsed:,.0f} writes/s, fsync {'off' if args.no_fsync else 'on'})")
+    print(f"journal tail:       {tail:,} records since the last checkpoint")
+    print(f"reopen + replay:    {recover_elapsed * 1000:.1f} ms")
+    print(f"resume per session: {resume_elapsed / args.sessions * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
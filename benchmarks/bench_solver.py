@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark the route solver on generated worlds.
+
+Builds synthetic worlds (see bench_world_load.py) of increasing size, with
+enough exam locations that the exam can be reached from the start. Times a
+cold solve in its two parts: the hint table the game uses, then the
+shortest and highest-scoring routes. Then times a solve served from the
+on-disk cache.
+
+    python benchmarks/bench_solver.py --locations 1000 5000 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import solver  # noqa: E402
+from bench_world_load import synthetic_world  # noqa: E402
+from world import load_world  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, nargs="+", default=[1_000, 5_000, 10_000, 20_000])
+    parser.add_argument("--actions", type=int, default=100)
+    parser.add_argument("--exam-share", type=float, default=0.005, help="share of locations with the exam")
+    parser.add_argument("--max-steps", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.locations:
+            path = os.path.join(tmp, f"world{n}.json")
+            with open(path, "w") as f:
+                json.dump(synthetic_world(n, n_actions=args.actions, exam_share=args.exam_share), f)
+            world = load_world(path, cache_dir=tmp)
+
+            start = time.perf_counter()
+            solver.hint_table(world)
+            hints = time.perf_counter() - start
+            start = time.perf_counter()
+            solution = solver.solve(world, args.max_steps)
+            routes = time.perf_counter() - start
+            solver._hint_tables.clear()
+            solver._solutions.clear()
+            start = time.perf_counter()
+            solver.solve(world, args.max_steps)
+            cached = time.perf_counter() - start
+
+            hint_count = sum(len(location_hints) for location_hints in solution.hints)
+            print(f"{n:7,} locations: hints {hints:6.2f} s, routes {routes:6.2f} s, "
+                  f"cold {hints + routes:6.2f} s, cached {cached * 1000:7.1f} ms; {hint_count:,} hints, "
+                  f"shortest {len(solution.shortest)} choices, "
+                  f"best {solution.best_score} points in {len(solution.best)} choices")
+            if not solution.shortest:
+                print("         the exam cannot be reached; raise --exam-share")
+
+
+if __name__ == "__main__":
+    main()
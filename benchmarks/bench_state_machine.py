@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the iterative game driver with a long scripted session.
+
+The script plays the game through ``Game.play`` with canned input and output
+sent to ``os.devnull``, then reports steps per second and
+peak memory. Under the old recursive navigation a session of this length
+died with ``RecursionError`` after about a thousand moves.
+
+    python benchmarks/bench_state_machine.py --steps 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from itertools import cycle
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aws_adventure_game import Game, Player, Renderer  # noqa: E402
+
+# Choices cycled per location. They cover moves, "Check your status", failed
+# skill checks and completed actions without ever reaching the final exam.
+SCRIPT = {
+    "cloud_academy": ["1", "4", "3", "2"],
+    "ec2_lab": ["4", "2", "3"],
+    "vpc_lab": ["2", "4", "3"],
+    "s3_lab": ["3"],
+    "lambda_workshop": ["4", "3"],
+}
+
+
+class ScriptedGame(Game):
+    """Game that answers its own prompts and stops after a number of steps"""
+
+    def __init__(self, steps: int, stream):
+        super().__init__(Renderer(stream, color=True, clear=True))
+        self.steps = steps
+        self.count = 0
+        self.scripts = {key: cycle(choices) for key, choices in SCRIPT.items()}
+        self.player = Player("bench", self.renderer, self.world)
+
+    def navigate_to(self, location_key):
+        if self.count >= self.steps:
+            return None
+        self.count += 1
+        return (yield from super().navigate_to(location_key))
+
+    def answer(self, request) -> str:
+        if request.pause:
+            return ""
+        return next(self.scripts[self.player.current_location])
+
+
+def run_session(steps: int) -> float:
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        game = ScriptedGame(steps, devnull)
+        session = game.play(game.world.start)
+        start = time.perf_counter()
+        try:
+            request = next(session)
+            while True:
+                request = session.send(game.answer(request))
+        except StopIteration:
+            pass
+        elapsed = time.perf_counter() - start
+    assert game.count == steps
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    elapsed = run_session(args.steps)
+    print(f"steps:          {args.steps}")
+    print(f"elapsed:        {elapsed:.2f} s")
+    print(f"steps/sec:      {args.steps / elapsed:,.0f}")
+
+    # Second pass under tracemalloc, which is too slow to share with timing
+    tracemalloc.start()
+    run_session(args.steps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"peak traced:    {peak / 1024:,.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: startup, step throughput, render cost, exams and session memory.
+
+Plays the game through ``Game.run`` with ``input()`` answered from a script
+and ``time.sleep`` patched out, so the measured path is the one a terminal
+player takes. Each metric is the median of several runs. Results can be
+written as JSON and compared with an earlier run; a metric whose median got
+worse by more than its noise threshold is a regression and makes the script
+exit with status 1.
+
+A metric's threshold is the larger of its floor in NOISE and three times the
+spread (median absolute deviation over the median) seen in either run, so
+a noisy machine does not report its noise as regressions.
+
+    python benchmarks/bench_suite.py --json baseline.json
+    python benchmarks/bench_suite.py --compare baseline.json
+
+Metrics:
+
+* startup_ms: importing the game and constructing ``Game()`` in a fresh
+  interpreter (world and index caches warm)
+* steps_per_sec: locations visited per second, each step rendering a
+  screen, reading a choice and handling it (moves, skill checks, actions)
+* render_us_per_screen: drawing one location screen up to its prompt
+* exams_per_sec: complete runs of ``run_final_exam``
+* session_kib: traced memory per live session, each one suspended at its
+  first choice, with the world and question bank shared as in the server
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from itertools import cycle
+from typing import Callable, Dict, List, NamedTuple, Optional
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from aws_adventure_game import Delay, Game, Renderer, Session  # noqa: E402
+from bench_state_machine import SCRIPT  # noqa: E402
+from question_bank import load_question_bank  # noqa: E402
+from world import load_world  # noqa: E402
+
+# What Game.pause shows; input() gets no other sign that a prompt is a pause
+PAUSE_PROMPT = "\nPress Enter to continue..."
+
+STARTUP = """
+import os, time
+start = time.perf_counter()
+from aws_adventure_game import Game, Renderer
+Game(Renderer(open(os.devnull, "w")))
+print(time.perf_counter() - start)
+"""
+
+
+# Smallest relative change that counts as a regression, per metric. Timings
+# in a fresh interpreter vary the most; traced memory hardly at all.
+NOISE = {
+    "startup_ms": 0.15,
+    "steps_per_sec": 0.10,
+    "render_us_per_screen": 0.10,
+    "exams_per_sec": 0.10,
+    "session_kib": 0.02,
+}
+
+# How many spreads a change must exceed to count
+SPREADS = 3
+
+
+class Metric(NamedTuple):
+    value: float  # median of the runs
+    unit: str
+    better: str  # "higher" or "lower"
+    spread: float = 0.0  # median absolute deviation of the runs, relative to the median
+
+
+def summarize(samples: List[float], unit: str, better: str) -> Metric:
+    median = statistics.median(samples)
+    deviation = statistics.median(abs(sample - median) for sample in samples)
+    return Metric(median, unit, better, deviation / median if median else 0.0)
+
+
+def repeat(measure: Callable[[], float], runs: int, unit: str, better: str) -> Metric:
+    return summarize([measure() for _ in range(runs)], unit, better)
+
+
+class ScriptedGame(Game):
+    """Game whose input() answers come from SCRIPT, stopping after a number of steps"""
+
+    def __init__(self, steps: int, renderer: Renderer):
+        super().__init__(renderer, seed=0)
+        self.steps = steps
+        self.count = 0
+        self.scripts = {key: cycle(choices) for key, choices in SCRIPT.items()}
+
+    def navigate_to(self, location_id):
+        if self.count >= self.steps:
+            return None
+        if self.count == 0:
+            # Random events deal damage; keep the player alive for every step
+            self.player.health = 10 ** 9
+        self.count += 1
+        return (yield from super().navigate_to(location_id))
+
+    def answer(self, prompt: str = "") -> str:
+        if self.player is None:
+            return "bench"
+        if prompt == PAUSE_PROMPT:
+            return ""
+        return next(self.scripts[self.player.current_location])
+
+
+def start_session(game: Game, name: str = "bench") -> Session:
+    """Start a session and run it up to its first choice prompt"""
+    session = game.session()
+    next(session)
+    request = session.send(name)
+    while isinstance(request, Delay):
+        request = session.send(None)
+    return session
+
+
+def measure_startup(runs: int) -> Metric:
+    command = [sys.executable, "-c", STARTUP]
+    # The first run warms the world and question bank caches
+    subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+    return repeat(lambda: float(subprocess.run(command, cwd=ROOT, check=True, capture_output=True,
+                                               text=True).stdout) * 1000, runs, "ms", "lower")
+
+
+def measure_steps(steps: int, devnull) -> float:
+    game = ScriptedGame(steps, Renderer(devnull, color=True, clear=True))
+    with mock.patch("builtins.input", game.answer), mock.patch("time.sleep"):
+        start = time.perf_counter()
+        game.start()
+        elapsed = time.perf_counter() - start
+    assert game.count == steps, f"session ended after {game.count} steps"
+    return steps / elapsed
+
+
+def measure_render(screens: int, devnull) -> float:
+    game = Game(Renderer(devnull, color=True, clear=True), seed=0)
+    start_session(game)
+    location_ids = cycle(range(len(game.world.locations)))
+    start = time.perf_counter()
+    for _ in range(screens):
+        # Drawing the screen ends with the flush before its choice prompt
+        screen = game.navigate_to(next(location_ids))
+        next(screen)
+        screen.close()
+    elapsed = time.perf_counter() - start
+    return elapsed / screens * 1e6
+
+
+def measure_exams(exams: int, devnull) -> float:
+    game = Game(Renderer(devnull, color=True, clear=True), seed=0)
+    start_session(game)
+    answers = cycle("1234")
+    start = time.perf_counter()
+    for _ in range(exams):
+        exam = game.run_final_exam()
+        try:
+            request = next(exam)
+            while True:
+                request = exam.send(None if isinstance(request, Delay) else next(answers))
+        except StopIteration:
+            pass
+    elapsed = time.perf_counter() - start
+    return exams / elapsed
+
+
+def measure_sessions(count: int, devnull) -> float:
+    world, question_bank = load_world(), load_question_bank()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    sessions = []
+    for i in range(count):
+        game = Game(Renderer(devnull, color=True, clear=True), world, seed=i, question_bank=question_bank)
+        sessions.append(start_session(game, f"player{i}"))
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for session in sessions:
+        session.close()
+    return (after - before) / count / 1024
+
+
+def run(args) -> Dict[str, Metric]:
+    metrics = {"startup_ms": measure_startup(args.repeat)}
+    with open(os.devnull, "w") as devnull:
+        metrics["steps_per_sec"] = repeat(lambda: measure_steps(args.steps, devnull),
+                                          args.repeat, "steps/s", "higher")
+        metrics["render_us_per_screen"] = repeat(lambda: measure_render(args.screens, devnull),
+                                                 args.repeat, "us", "lower")
+        metrics["exams_per_sec"] = repeat(lambda: measure_exams(args.exams, devnull),
+                                          args.repeat, "exams/s", "higher")
+        metrics["session_kib"] = repeat(lambda: measure_sessions(args.sessions, devnull),
+                                        args.repeat, "KiB", "lower")
+    return metrics
+
+
+def compare(metrics: Dict[str, Metric], baseline: dict, threshold: Optional[float] = None) -> list:
+    """Print each metric's median against the baseline and return the names that regressed
+
+    threshold, when given, replaces the per-metric floors in NOISE.
+    """
+    regressions = []
+    for name, metric in metrics.items():
+        old = baseline["metrics"].get(name)
+        if old is None or not old["value"]:
+            print(f"{name:22} {metric.value:14,.2f} {metric.unit:8} (no baseline)")
+            continue
+        change = (metric.value - old["value"]) / old["value"]
+        worse = -change if metric.better == "higher" else change
+        floor = NOISE.get(name, 0.10) if threshold is None else threshold
+        # Baselines written before spreads were kept have none
+        limit = max(floor, SPREADS * max(metric.spread, old.get("spread", 0.0)))
+        flag = "  REGRESSION" if worse > limit else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:22} {metric.value:14,.2f} {metric.unit:8} {change:+8.1%} vs {old['value']:,.2f}"
+              f" (noise {limit:.0%}){flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=200_000)
+    parser.add_argument("--screens", type=int, default=50_000)
+    parser.add_argument("--exams", type=int, default=10_000)
+    parser.add_argument("--sessions", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs per metric; the median is reported and compared (default 5)")
+    parser.add_argument("--json", metavar="PATH", help="write the results to a JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare with results written by --json")
+    parser.add_argument("--threshold", type=float,
+                        help="relative change that counts as a regression for every metric, "
+                             "instead of each metric's own noise floor")
+    args = parser.parse_args()
+
+    metrics = run(args)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(metrics, json.load(f), args.threshold)
+    else:
+        for name, metric in metrics.items():
+            print(f"{name:22} {metric.value:14,.2f} {metric.unit:8} (spread {metric.spread:.1%})")
+
+    if args.json:
+        results = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "metrics": {name: metric._asdict() for name, metric in metrics.items()},
+        }
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than their noise: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark turbo mode on scripted playthroughs from start to certification.
+
+Builds the command stream for a playthrough that follows the solver's
+shortest route to the final exam, repeats it for many sessions and plays
+them back to back through ``Game.run_commands``, as
+``aws_adventure_game.py --turbo`` does. Output goes to ``os.devnull`` in
+batches. Exams always pass here, since the scripted answers cannot know
+which questions will be drawn. For comparison it reports how long the
+interactive driver would spend sleeping and how many pause prompts it
+would wait on for the same playthrough.
+
+    python benchmarks/bench_turbo.py --sessions 20000
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from bisect import bisect_right
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import solver  # noqa: E402
+from aws_adventure_game import BatchRenderer, Delay, Game, read_sessions  # noqa: E402
+from question_bank import load_question_bank  # noqa: E402
+from world import load_world  # noqa: E402
+
+
+class CertifiedGame(Game):
+    """Game whose exam passes whatever the answers"""
+    pass_percent = 0
+
+
+def playthrough(world) -> str:
+    """The command line for one session: name, route choices and exam answers"""
+    choices = []
+    for option_id in solver.solve(world).shortest:
+        location_id = bisect_right(world.option_start, option_id) - 1
+        choices.append(str(option_id - world.option_start[location_id] + 1))
+    return " ".join(["bench", *choices, *["1"] * Game.exam_questions])
+
+
+def waits(game: Game, commands) -> tuple:
+    """Seconds of delays and number of pauses the interactive driver would wait on"""
+    seconds, pauses = 0.0, 0
+    session = game.session()
+    try:
+        request = next(session)
+        while True:
+            if isinstance(request, Delay):
+                seconds += request.seconds
+                request = session.send(None)
+            elif request.pause:
+                pauses += 1
+                request = session.send("")
+            else:
+                request = session.send(next(commands))
+    except StopIteration:
+        pass
+    return seconds, pauses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20_000)
+    args = parser.parse_args()
+
+    world = load_world()
+    question_bank = load_question_bank()
+    line = playthrough(world)
+    script = (line + "\n") * args.sessions
+    print(f"playthrough: {line}")
+
+    with open(os.devnull, "w") as devnull:
+        renderer = BatchRenderer(devnull)
+        seconds, pauses = waits(CertifiedGame(renderer, world, seed=0, question_bank=question_bank),
+                                iter(line.split()))
+        sessions = finished = 0
+        start = time.perf_counter()
+        for answers in read_sessions(io.StringIO(script)):
+            game = CertifiedGame(renderer, world, seed=sessions, question_bank=question_bank)
+            finished += game.run_commands(game.session(), iter(answers))
+            sessions += 1
+        renderer.close()
+        elapsed = time.perf_counter() - start
+
+    print(f"turbo:       {elapsed / sessions * 1e6:10.1f} us/playthrough "
+          f"({sessions / elapsed:,.0f} playthroughs/sec, {finished:,} of {sessions:,} finished)")
+    print(f"interactive: {seconds:10.1f} s of delays and {pauses} pause prompts per playthrough")
+
+
+if __name__ == "__main__":
+    main()
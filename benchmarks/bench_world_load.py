@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark world startup: parsing and compiling JSON versus the cached form.
+
+Generates a synthetic world with the same schema as worlds/aws_academy.json
+in a temporary directory, then times a compile from JSON, the first load
+(which also writes the cache) and a cached load.
+
+    python benchmarks/bench_world_load.py --locations 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from world import load_world  # noqa: E402
+
+SKILLS = ["compute", "storage", "networking", "security", "serverless"]
+
+
+def synthetic_world(n_locations: int, seed: int = 0, n_actions: int = 1, exam_share: float = 0.001) -> dict:
+    rng = random.Random(seed)
+    keys = [f"loc_{i}" for i in range(n_locations)]
+    actions = {
+        f"action_{i}": {
+            "success": f"Action {i} succeeded!",
+            "effects": [["score", rng.randint(5, 20)], ["skill", rng.choice(SKILLS), 1]],
+            "events": [{"chance": 0.3, "message": f"Action {i} backfired!", "effects": [["damage", 20]]}],
+            "destination": rng.choice(keys),
+        }
+        for i in range(n_actions)
+    }
+    names = list(actions)
+    locations = {}
+    for key in keys:
+        options = []
+        for j in range(4):
+            option = {"text": f"Option {j} of {key}"}
+            if j == 3:
+                # A few locations hold the final exam, so the world can be finished
+                option["action"] = "final_exam" if key == keys[-1] or rng.random() < exam_share else "status"
+            elif rng.random() < 0.5:
+                option["destination"] = rng.choice(keys)
+                option["skill_gain"] = {rng.choice(SKILLS): 1}
+            else:
+                option["action"] = rng.choice(names)
+                option["skill_check"] = {rng.choice(SKILLS): rng.randint(1, 5)}
+            options.append(option)
+        locations[key] = {"name": key.title(), "description": f"Description of {key}.", "options": options}
+    return {"start": keys[0], "skills": SKILLS, "locations": locations, "actions": actions}
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:28} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.json")
+        with open(path, "w") as f:
+            json.dump(synthetic_world(args.locations), f)
+        print(f"world: {args.locations:,} locations, {os.path.getsize(path) / 1e6:.1f} MB of JSON")
+
+        timed("parse + compile (no cache)", lambda: load_world(path, use_cache=False))
+        timed("first load (writes cache)", lambda: load_world(path))
+        world = timed("cached load", lambda: load_world(path))
+        print(f"options: {len(world.options):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Structured gameplay events, written as JSON lines
+
+A Game given an EventLog records what happens in each session, one JSON
+object per line. Every event has the time, the session id (new_session_id,
+unique per run even when runs share a seed) and its kind, plus fields for
+that kind:
+
+    start   player, resumed, location, seed
+    move    location                        every turn, including turns that stay put
+    check   location, required {skill: level}, passed, missing (the first skill short)
+    action  location, action
+    event   action, message                 a random event firing
+    effect  effect, value, plus skill and level for skill gains
+    answer  question (1-based), topic, correct
+    exam    correct, questions, passed
+    end     outcome ("passed", "game_over" or "left"), score, health, plus reason
+
+A player who leaves and later resumes from a session store plays a new run
+whose start has resumed true; analytics.py joins it to the run that left.
+
+Events are buffered and written in batches, like leaderboard results, so a
+busy server makes one write per batch rather than one per event. A
+session's events keep their order; sessions running together interleave.
+analytics.py streams these logs into funnels, drop-off points and skill
+progression curves.
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable, List, Optional
+
+
+def new_session_id() -> str:
+    """A random id for one run of a session"""
+    return os.urandom(8).hex()
+
+
+class EventLog:
+    """Append gameplay events to a JSON lines file in batches"""
+
+    def __init__(self, path: str, batch_size: int = 1024, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.file = open(path, "a", encoding="utf-8", buffering=1 << 16)
+        self.pending: List[str] = []
+        # Set by the server to write batches on another thread, in order
+        self.writer: Optional[Callable[..., Any]] = None
+        self.last_flush = time.monotonic()
+        self.encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def emit(self, session: str, kind: str, **fields: Any) -> None:
+        """Queue one event; the batch is written once it is full or old enough"""
+        self.pending.append(self.encode({"t": round(time.time(), 3), "session": session, "event": kind, **fields}))
+        if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every queued event"""
+        pending, self.pending = self.pending, []
+        if pending:
+            if self.writer is None:
+                self.write_lines(pending)
+            else:
+                self.writer(self.write_lines, pending)
+        self.last_flush = time.monotonic()
+
+    def write_lines(self, lines: List[str]) -> None:
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Load generator for the AWS Adventure Game server
+
+Opens N concurrent connections, plays scripted random sessions against the
+server and reports step latency percentiles. A step is the time from sending
+an answer to receiving the next prompt. Sessions that end (exam passed, out of
+health) reconnect until each client has made its share of steps.
+
+    python game_server.py --delay-scale 0 &
+    python game_loadgen.py --sessions 2000 --steps 200
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import time
+from typing import List, Optional
+
+CHOICE_PATTERN = re.compile(rb"\(1-(\d+)\): $")
+PROMPT_ENDINGS = (b"Enter your name: ", b"continue...", b"): ")
+
+
+async def read_prompt(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Read server output up to the next prompt, or None if the session ended"""
+    data = b""
+    while not data.endswith(PROMPT_ENDINGS):
+        chunk = await reader.read(65536)
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+async def run_client(host: str, port: int, steps: int, seed: int,
+                     latencies: List[float]) -> int:
+    """Play random sessions until `steps` answers have been sent"""
+    rng = random.Random(seed)
+    sessions = 0
+    while steps > 0:
+        reader, writer = await asyncio.open_connection(host, port)
+        sessions += 1
+        try:
+            prompt = await read_prompt(reader)
+            while prompt is not None and steps > 0:
+                match = CHOICE_PATTERN.search(prompt)
+                if match:
+                    answer = str(rng.randint(1, int(match.group(1))))
+                elif prompt.endswith(b"Enter your name: "):
+                    answer = f"bot{seed}"
+                else:
+                    answer = ""
+                start = time.perf_counter()
+                writer.write(answer.encode() + b"\r\n")
+                await writer.drain()
+                prompt = await read_prompt(reader)
+                latencies.append(time.perf_counter() - start)
+                steps -= 1
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    return sessions
+
+
+async def run_load(host: str, port: int, clients: int, steps: int, seed: int) -> None:
+    latencies: List[float] = []
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*(
+        run_client(host, port, steps, seed + i, latencies) for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"clients:     {clients}")
+    print(f"sessions:    {sum(sessions)}")
+    print(f"steps:       {len(latencies)} in {elapsed:.2f} s ({len(latencies) / elapsed:,.0f}/s)")
+    print(f"p50 latency: {cuts[49] * 1000:.2f} ms")
+    print(f"p99 latency: {cuts[98] * 1000:.2f} ms")
+    print(f"max latency: {max(latencies) * 1000:.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate load against the game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--sessions", type=int, default=100, help="concurrent clients")
+    parser.add_argument("--steps", type=int, default=100, help="steps per client")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run_load(args.host, args.port, args.sessions, args.steps, args.seed))
+
+
+if __name__ == "__main__":
+    main()
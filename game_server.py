@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+AWS Adventure Game server - hosts many players over TCP in a single process
+
+Each connection gets its own Game and Player. Sessions are driven by one
+asyncio event loop: input is awaited from the socket, delays use
+asyncio.sleep, and a session that ends or disconnects only closes its own
+connection. Connect with any line-based client, e.g. ``telnet localhost 8023``
+or ``nc localhost 8023``.
+
+With ``--store DIR`` player state is journaled to a SessionStore, so a
+player who disconnects, or a server that restarts, picks up where the
+session left off when the same name logs in again.
+
+With ``--metrics-port PORT`` sessions are instrumented (see metrics.py) and
+the counters and latency histograms are served over HTTP, in Prometheus
+text format at ``/metrics`` and as JSON at ``/metrics.json``.
+
+With ``--leaderboard FILE`` finished sessions are ranked on a leaderboard
+saved to a SQLite file, which ``leaderboard.py`` can show.
+
+With ``--events FILE`` sessions log their moves, checks, rewards and exam
+answers as JSON lines (see events.py) for ``analytics.py``.
+
+With ``--world DIR`` the server plays a world paged by paging.py: regions
+load as players reach them and the least recently used are evicted under
+``--page-cache-mb``. The metrics then include the page cache hit rate.
+
+Players can ask for hints on small worlds, and on paged worlds saved with
+a hint table (``paging.py --hints``). ``--hints`` offers them on any fully
+loaded world and ``--no-hints`` on none; either way the hint table is built
+or loaded before the server starts listening, never while a session waits
+for it.
+
+Journal commits, leaderboard inserts and event log writes run on a single
+writer thread, in the order they were queued, so an fsync or a SQLite
+transaction never stalls the event loop.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import solver
+from aws_adventure_game import Delay, Game, Renderer
+from events import EventLog
+from leaderboard import Leaderboard
+from metrics import Metrics
+from paging import load_paged_world
+from question_bank import load_question_bank
+from session_store import SessionStore
+from world import DEFAULT_WORLD, World, load_world
+
+logger = logging.getLogger("aws_adventure_game.server")
+
+
+class ConnectionStream:
+    """File-like adapter that lets a Renderer write to an asyncio transport"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+
+    def write(self, text: str) -> None:
+        # Telnet clients expect CRLF line endings
+        self.writer.write(text.replace("\n", "\r\n").encode("utf-8"))
+
+    def flush(self) -> None:
+        # The event loop sends buffered data; run_session awaits drain()
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class GameServer:
+    """Accept connections and run one game session per connection"""
+
+    def __init__(self, color: bool = True, clear: bool = True,
+                 delay_scale: float = 1.0, idle_timeout: Optional[float] = 600.0,
+                 store: Optional[SessionStore] = None, metrics: Optional[Metrics] = None,
+                 leaderboard: Optional[Leaderboard] = None, world: Optional[World] = None,
+                 events: Optional[EventLog] = None, hints: Optional[bool] = None):
+        self.color = color
+        self.clear = clear
+        self.delay_scale = delay_scale
+        self.idle_timeout = idle_timeout or None
+        self.store = store
+        self.metrics = metrics
+        self.leaderboard = leaderboard
+        self.events = events
+        # Sessions share one compiled world and one question bank
+        if world is None:
+            world = store.world if store is not None else load_world()
+        self.world = world
+        self.question_bank = load_question_bank()
+        # The hint table is built here, before serving, so no session solves
+        # the world on the event loop
+        self.hints = solver.hints_by_default(world) if hints is None else hints
+        if self.hints:
+            solver.hint_table(world)
+        self.active_sessions = 0
+        self.completed_sessions = 0
+        # One thread keeps the writes of each file in order
+        self.write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer")
+        for target in (store, leaderboard, events):
+            if target is not None:
+                target.writer = self.submit_write
+
+    def submit_write(self, function, *args) -> None:
+        """Queue a blocking write for the writer thread"""
+        self.write_pool.submit(function, *args).add_done_callback(log_write_error)
+
+    def stop_writer(self) -> None:
+        """Finish the queued writes; later writes happen inline"""
+        self.write_pool.shutdown(wait=True)
+        for target in (self.store, self.leaderboard, self.events):
+            if target is not None:
+                target.writer = None
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """Run a session for a new connection and tear it down afterwards"""
+        peer = writer.get_extra_info("peername")
+        self.active_sessions += 1
+        try:
+            await self.run_session(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            logger.debug("Connection from %s dropped", peer)
+        except asyncio.TimeoutError:
+            logger.debug("Connection from %s timed out", peer)
+        except Exception:
+            # A broken session must never take the server down with it
+            logger.exception("Session for %s failed", peer)
+        finally:
+            self.active_sessions -= 1
+            self.completed_sessions += 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def run_session(self, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter) -> None:
+        """Drive one game session, awaiting input and delays"""
+        renderer = Renderer(ConnectionStream(writer), color=self.color, clear=self.clear)
+        game = Game(renderer, self.world, self.store, question_bank=self.question_bank,
+                    leaderboard=self.leaderboard, events=self.events)
+        game.show_hints = self.hints
+        if self.metrics is not None:
+            self.metrics.instrument(game)
+        session = game.session()
+        try:
+            request = next(session)
+            while True:
+                if isinstance(request, Delay):
+                    await writer.drain()
+                    if self.delay_scale > 0:
+                        await asyncio.sleep(request.seconds * self.delay_scale)
+                    request = session.send(None)
+                    continue
+
+                writer.write(request.prompt.replace("\n", "\r\n").encode("utf-8"))
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                if not line:
+                    # Client went away
+                    return
+                request = session.send(line.decode("utf-8", errors="replace").rstrip("\r\n"))
+        except StopIteration:
+            await writer.drain()
+        finally:
+            session.close()
+
+    async def serve(self, host: str, port: int, backlog: int = 4096,
+                    metrics_port: Optional[int] = None) -> None:
+        """Listen for connections until cancelled"""
+        # asyncio's default backlog of 100 drops connections when thousands
+        # of clients arrive at once
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=backlog)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        logger.info("AWS Adventure Game server listening on %s", addresses)
+        if self.metrics is not None and metrics_port is not None:
+            metrics_server = await asyncio.start_server(self.serve_metrics, host, metrics_port)
+            addresses = ", ".join(str(sock.getsockname()) for sock in metrics_server.sockets)
+            logger.info("Metrics served on %s", addresses)
+        # Background tasks that write buffered state in batches
+        tasks = []
+        if self.store is not None:
+            tasks.append(asyncio.ensure_future(self.commit_journal()))
+        if self.leaderboard is not None:
+            tasks.append(asyncio.ensure_future(self.flush_leaderboard()))
+        if self.events is not None:
+            tasks.append(asyncio.ensure_future(self.flush_events()))
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def serve_metrics(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """Answer one HTTP request for the metrics, then close the connection"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            # Skip the headers
+            while (await asyncio.wait_for(reader.readline(), 10)).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) > 1 else ""
+            if path == "/metrics":
+                status, content_type = "200 OK", "text/plain; version=0.0.4"
+                body = self.metrics.prometheus().encode("utf-8")
+            elif path == "/metrics.json":
+                status, content_type = "200 OK", "application/json"
+                body = json.dumps(self.metrics.snapshot()).encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def commit_journal(self) -> None:
+        """Group-commit journal records that idle sessions left in the buffer"""
+        while True:
+            await asyncio.sleep(self.store.commit_interval)
+            self.store.commit()
+
+    async def flush_leaderboard(self) -> None:
+        """Save leaderboard results that arrived since the last batch"""
+        while True:
+            await asyncio.sleep(self.leaderboard.flush_interval)
+            self.leaderboard.flush()
+
+    async def flush_events(self) -> None:
+        """Write gameplay events that idle sessions left in the buffer"""
+        while True:
+            await asyncio.sleep(self.events.flush_interval)
+            self.events.flush()
+
+
+def log_write_error(future: Future) -> None:
+    if future.exception() is not None:
+        logger.error("Background write failed", exc_info=future.exception())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Host AWS Adventure Game sessions over TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--no-color", action="store_true", help="strip ANSI colors")
+    parser.add_argument("--no-clear", action="store_true", help="never clear the client screen")
+    parser.add_argument("--delay-scale", type=float, default=1.0,
+                        help="multiplier for in-game delays; 0 skips them")
+    parser.add_argument("--idle-timeout", type=float, default=600.0,
+                        help="seconds to wait for input before dropping a client")
+    parser.add_argument("--backlog", type=int, default=4096, help="listen queue length")
+    parser.add_argument("--store", metavar="DIR", help="save sessions in this directory so players can resume")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="instrument sessions and serve metrics over HTTP on this port")
+    parser.add_argument("--leaderboard", metavar="FILE", help="rank finished sessions in this SQLite file")
+    parser.add_argument("--events", metavar="FILE", help="append gameplay events to this JSON lines file")
+    parser.add_argument("--world", default=DEFAULT_WORLD,
+                        help="world JSON file, or a directory of pages written by paging.py")
+    parser.add_argument("--page-cache-mb", type=float, default=64.0,
+                        help="memory cap for the loaded regions of a paged world")
+    hints = parser.add_mutually_exclusive_group()
+    hints.add_argument("--hints", action="store_true", default=None,
+                       help="offer hints on any world, building the hint table at startup")
+    hints.add_argument("--no-hints", dest="hints", action="store_false",
+                       help=f"never offer hints (the default over {solver.AUTO_HINT_LOCATIONS:,} locations, "
+                            "and for paged worlds saved without a hint table)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    if os.path.isdir(args.world):
+        world = load_paged_world(args.world, int(args.page_cache_mb * (1 << 20)))
+        page_cache = world.cache
+        if args.hints and not solver.hints_by_default(world):
+            parser.error(f"{args.world} has no hint table; write the pages with paging.py --hints")
+    else:
+        world, page_cache = load_world(args.world), None
+    store = SessionStore(args.store, world) if args.store else None
+    leaderboard = Leaderboard(args.leaderboard) if args.leaderboard else None
+    events = EventLog(args.events) if args.events else None
+    server = GameServer(color=not args.no_color, clear=not args.no_clear,
+                        delay_scale=args.delay_scale, idle_timeout=args.idle_timeout, store=store,
+                        metrics=Metrics(page_cache) if args.metrics_port is not None else None,
+                        leaderboard=leaderboard, world=world, events=events, hints=args.hints)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.backlog, args.metrics_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop_writer()
+        if store is not None:
+            store.close()
+        if leaderboard is not None:
+            leaderboard.close()
+        if events is not None:
+            events.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Leaderboard of finished AWS Adventure Game sessions
+
+Every session that ends, by passing the final exam or by a game over, is
+recorded with the player's name and final score. In memory the leaderboard
+keeps:
+
+* each player's best result, ordered in an indexable skip list, so a
+  player's rank and any page of the standings take O(log n) time
+* the best individual runs, in a bounded min-heap
+
+Results are also written to a SQLite file. Writes are buffered and inserted
+with one transaction per batch, so sessions that finish together share a
+single commit rather than each waiting on the disk.
+
+    python leaderboard.py scores.db --top 10     # show the standings
+    python leaderboard.py scores.db --player ann # show one player's rank
+"""
+
+import argparse
+import heapq
+import random
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    finished REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_name ON sessions (name, score);
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (score);
+"""
+
+# Enough levels for billions of entries at a promotion chance of 1/2
+MAX_LEVEL = 32
+
+
+class Result(NamedTuple):
+    name: str
+    score: int
+    passed: bool
+    finished: float  # Unix time
+
+
+class Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Optional[tuple], height: int):
+        self.key = key
+        self.next: List[Optional["Node"]] = [None] * height
+        # Positions from this node to the next one at each level
+        self.width = [1] * height
+
+
+class RankIndex:
+    """Sorted keys in an indexable skip list
+
+    Each link records how many positions it skips, so finding a key's
+    position or the key at a position walks O(log n) links, like an
+    insertion or removal.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.head = Node(None, MAX_LEVEL)
+        # Levels above this hold no nodes yet
+        self.level = 1
+        self.size = 0
+        self.rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def find(self, key: tuple) -> Tuple[List[Node], List[int]]:
+        """The last node before key at each level, and the positions of those nodes"""
+        update: List[Node] = [self.head] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node, position = self.head, 0
+        for level in reversed(range(self.level)):
+            following = node.next[level]
+            while following is not None and following.key < key:
+                position += node.width[level]
+                node, following = following, following.next[level]
+            update[level], positions[level] = node, position
+        return update, positions
+
+    def insert(self, key: tuple) -> None:
+        update, positions = self.find(key)
+        height = 1
+        while height < MAX_LEVEL and self.rng.random() < 0.5:
+            height += 1
+        if height > self.level:
+            for level in range(self.level, height):
+                # The head's new links span the whole list
+                self.head.width[level] = self.size + 1
+            self.level = height
+        node = Node(key, height)
+        position = positions[0] + 1
+        for level in range(self.level):
+            previous = update[level]
+            if level < height:
+                # The link from previous now ends one position further on
+                node.next[level] = previous.next[level]
+                node.width[level] = positions[level] + previous.width[level] + 1 - position
+                previous.next[level] = node
+                previous.width[level] = position - positions[level]
+            else:
+                previous.width[level] += 1
+        self.size += 1
+
+    def remove(self, key: tuple) -> None:
+        update, _ = self.find(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for level in range(self.level):
+            previous = update[level]
+            if previous.next[level] is node:
+                previous.width[level] += node.width[level] - 1
+                previous.next[level] = node.next[level]
+            else:
+                previous.width[level] -= 1
+        self.size -= 1
+
+    def position(self, key: tuple) -> int:
+        """1-based position of a key that is in the index"""
+        _, positions = self.find(key)
+        return positions[0] + 1
+
+    def items(self, start: int = 0) -> Iterator[tuple]:
+        """Keys in order from the 0-based position start"""
+        node, position = self.head, 0
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and position + node.width[level] <= start:
+                position += node.width[level]
+                node = node.next[level]
+        node = node.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
+def rank_key(result: Result) -> tuple:
+    # Higher scores first; ties go to the earlier result, then by name
+    return (-result.score, result.finished, result.name)
+
+
+class Leaderboard:
+    """Per-player bests and top runs, persisted to SQLite in batches"""
+
+    def __init__(self, path: Optional[str] = None, top_runs: int = 100,
+                 batch_size: int = 512, flush_interval: float = 1.0):
+        self.path = path
+        self.top_size = top_runs
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.bests: Dict[str, Result] = {}
+        self.index = RankIndex()
+        # Min-heap of (score, -finished, result), the weakest kept run on top
+        self.runs: List[tuple] = []
+        self.pending: List[Result] = []
+        # Set by the server to insert batches on another thread, in order
+        self.writer: Optional[Callable[..., Any]] = None
+        self.last_flush = time.monotonic()
+        self.db = None
+        if path is not None:
+            # Only one thread uses the connection at a time: the writer's,
+            # or the caller's when there is no writer
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+            self.load()
+
+    def __len__(self) -> int:
+        """Number of players on the leaderboard"""
+        return len(self.bests)
+
+    def load(self) -> None:
+        """Rebuild the in-memory standings from the database"""
+        # Each player's best row; among equal scores the earliest, as in add_best
+        for name, score, passed, finished in self.db.execute(
+                "SELECT name, score, passed, finished FROM ("
+                "  SELECT *, ROW_NUMBER() OVER (PARTITION BY name ORDER BY score DESC, finished) AS n"
+                "  FROM sessions) WHERE n = 1"):
+            self.add_best(Result(name, score, bool(passed), finished))
+        for name, score, passed, finished in self.db.execute(
+                "SELECT name, score, passed, finished FROM sessions ORDER BY score DESC, finished LIMIT ?",
+                (self.top_size,)):
+            self.add_run(Result(name, score, bool(passed), finished))
+
+    def add_best(self, result: Result) -> None:
+        best = self.bests.get(result.name)
+        if best is not None:
+            if best.score >= result.score:
+                return
+            self.index.remove(rank_key(best))
+        self.bests[result.name] = result
+        self.index.insert(rank_key(result))
+
+    def add_run(self, result: Result) -> None:
+        entry = (result.score, -result.finished, result)
+        if len(self.runs) < self.top_size:
+            heapq.heappush(self.runs, entry)
+        elif entry[:2] > self.runs[0][:2]:
+            heapq.heapreplace(self.runs, entry)
+
+    def record(self, name: str, score: int, passed: bool) -> int:
+        """Add a finished session and return the player's rank"""
+        result = Result(name, score, passed, time.time())
+        self.add_best(result)
+        self.add_run(result)
+        self.pending.append(result)
+        if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+        return self.rank(name)
+
+    def rank(self, name: str) -> Optional[int]:
+        """A player's 1-based rank by best score, or None for unknown players"""
+        best = self.bests.get(name)
+        return None if best is None else self.index.position(rank_key(best))
+
+    def top(self, k: int = 10, start: int = 0) -> List[Result]:
+        """Players' best results from rank start + 1, best first"""
+        results = []
+        for _, _, name in self.index.items(start):
+            if len(results) >= k:
+                break
+            results.append(self.bests[name])
+        return results
+
+    def top_runs(self, k: int = 10) -> List[Result]:
+        """The best individual runs, best first"""
+        return [result for _, _, result in heapq.nlargest(k, self.runs, key=lambda entry: entry[:2])]
+
+    def flush(self) -> None:
+        """Insert every buffered result in a single transaction"""
+        pending, self.pending = self.pending, []
+        if pending and self.db is not None:
+            if self.writer is None:
+                self.insert(pending)
+            else:
+                self.writer(self.insert, pending)
+        self.last_flush = time.monotonic()
+
+    def insert(self, results: List[Result]) -> None:
+        with self.db:
+            self.db.executemany("INSERT INTO sessions (name, score, passed, finished) VALUES (?, ?, ?, ?)",
+                                results)
+
+    def close(self) -> None:
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the standings saved in a leaderboard database")
+    parser.add_argument("path", help="SQLite leaderboard file")
+    parser.add_argument("--top", type=int, default=10, help="players to list")
+    parser.add_argument("--player", help="show this player's rank")
+    args = parser.parse_args()
+
+    leaderboard = Leaderboard(args.path)
+    try:
+        if args.player is not None:
+            rank = leaderboard.rank(args.player)
+            if rank is None:
+                print(f"{args.player} has not finished a game")
+            else:
+                best = leaderboard.bests[args.player]
+                print(f"{args.player}: rank {rank:,} of {len(leaderboard):,} with {best.score:,} points")
+            return
+        for rank, result in enumerate(leaderboard.top(args.top), 1):
+            outcome = "passed" if result.passed else "game over"
+            print(f"{rank:5}. {result.name:32} {result.score:8,}  {outcome}")
+    finally:
+        leaderboard.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Opt-in instrumentation for AWS Adventure Game sessions
+
+A Metrics object counts location visits, actions, skill checks (and which
+skill each failed one was missing) and final exam results, and keeps a
+latency histogram for each instrumented Game method:
+
+    metrics = Metrics()
+    game = Game()
+    metrics.instrument(game)
+    ...
+    print(metrics.prometheus())          # Prometheus text format
+    json.dumps(metrics.snapshot())       # or a JSON snapshot
+
+Instrumenting a game shadows its methods with wrappers on that instance
+only, so a game that is not instrumented runs the plain methods and pays
+nothing. Latencies count the time spent inside a method, not the time its
+session waits for input or delays.
+
+Events are counted in a shard owned by the thread that records them, so
+recording never takes a lock; exports add the shards up. Given the region
+cache of a paged world, exports also report its hits, misses and size.
+"""
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from aws_adventure_game import Game, Session
+    from paging import RegionCache
+
+# Histogram bucket upper bounds in seconds, as Prometheus "le" labels
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+           1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+# The Game methods that get a latency histogram
+CALLS = ("navigate_to", "process_choice", "skill_check", "perform_action", "run_final_exam")
+
+PREFIX = "aws_game"
+
+
+class Histogram:
+    """Observation counts per bucket, plus their sum"""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        # One count per bound, and one for observations above them all
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+    def add(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+
+    def cumulative(self) -> List[int]:
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class Shard:
+    """Everything one thread has recorded"""
+
+    def __init__(self):
+        self.visits: Dict[str, int] = {}
+        self.actions: Dict[str, int] = {}
+        self.checks = 0
+        self.failed_checks: Dict[str, int] = {}
+        self.exams = 0
+        self.exams_passed = 0
+        self.latency = {call: Histogram() for call in CALLS}
+
+    def add(self, other: "Shard") -> None:
+        for mine, theirs in ((self.visits, other.visits), (self.actions, other.actions),
+                             (self.failed_checks, other.failed_checks)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        self.checks += other.checks
+        self.exams += other.exams
+        self.exams_passed += other.exams_passed
+        for call, histogram in other.latency.items():
+            self.latency[call].add(histogram)
+
+
+def bump(counts: Dict[str, int], key: str) -> None:
+    counts[key] = counts.get(key, 0) + 1
+
+
+def timed(session: "Session", histogram: Histogram) -> "Session":
+    """Pass a session through, observing the time spent running it"""
+    elapsed = 0.0
+    start = perf_counter()
+    try:
+        request = session.send(None)
+        while True:
+            elapsed += perf_counter() - start
+            # None while suspended, so waiting is never counted
+            start = None
+            answer = yield request
+            start = perf_counter()
+            request = session.send(answer)
+    except StopIteration as e:
+        return e.value
+    finally:
+        # Also reached on GameOver, or when the driver closes the session
+        if start is not None:
+            elapsed += perf_counter() - start
+        histogram.observe(elapsed)
+        session.close()
+
+
+class Metrics:
+    """Counters and latency histograms shared by any number of games"""
+
+    def __init__(self, page_cache: Optional["RegionCache"] = None):
+        self.local = threading.local()
+        self.shards: List[Shard] = []
+        self.lock = threading.Lock()
+        # A paged world's region cache, reported alongside the game counters
+        self.page_cache = page_cache
+
+    def shard(self) -> Shard:
+        """This thread's shard, created on its first event"""
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = Shard()
+            with self.lock:
+                self.shards.append(shard)
+            return shard
+
+    def instrument(self, game: "Game") -> None:
+        """Record this game's visits, actions, checks, exams and call latencies"""
+        world = game.world
+        navigate_to, process_choice = game.navigate_to, game.process_choice
+        skill_check, perform_action, run_final_exam = game.skill_check, game.perform_action, game.run_final_exam
+
+        def instrumented_navigate_to(location_id):
+            shard = self.shard()
+            if 0 <= location_id < len(world.keys):
+                bump(shard.visits, world.keys[location_id])
+            return (yield from timed(navigate_to(location_id), shard.latency["navigate_to"]))
+
+        def instrumented_process_choice(option):
+            return (yield from timed(process_choice(option), self.shard().latency["process_choice"]))
+
+        def instrumented_skill_check(required_skills):
+            shard = self.shard()
+            shard.checks += 1
+            # The first skill short of its level is the one the check reports
+            skills = game.player.skills
+            for skill_id, level in required_skills:
+                if skills[skill_id] < level:
+                    bump(shard.failed_checks, world.skills[skill_id])
+                    break
+            return (yield from timed(skill_check(required_skills), shard.latency["skill_check"]))
+
+        def instrumented_perform_action(action_id):
+            shard = self.shard()
+            if 0 <= action_id < len(world.actions):
+                bump(shard.actions, world.actions[action_id].name)
+            return (yield from timed(perform_action(action_id), shard.latency["perform_action"]))
+
+        def instrumented_run_final_exam():
+            shard = self.shard()
+            shard.exams += 1
+            next_location = yield from timed(run_final_exam(), shard.latency["run_final_exam"])
+            # Passing ends the game; failing sends the player back
+            if next_location is None:
+                shard.exams_passed += 1
+            return next_location
+
+        game.navigate_to = instrumented_navigate_to
+        game.process_choice = instrumented_process_choice
+        game.skill_check = instrumented_skill_check
+        game.perform_action = instrumented_perform_action
+        game.run_final_exam = instrumented_run_final_exam
+
+    def total(self) -> Shard:
+        """Every thread's shard added up"""
+        total = Shard()
+        with self.lock:
+            shards = list(self.shards)
+        for shard in shards:
+            total.add(shard)
+        return total
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything recorded so far, as JSON-ready data"""
+        total = self.total()
+        bounds = [str(bound) for bound in BUCKETS] + ["+Inf"]
+        snapshot = {
+            "visits": dict(sorted(total.visits.items())),
+            "actions": dict(sorted(total.actions.items())),
+            "skill_checks": total.checks,
+            "failed_checks": dict(sorted(total.failed_checks.items())),
+            "exams": {
+                "taken": total.exams,
+                "passed": total.exams_passed,
+                "pass_rate": total.exams_passed / total.exams if total.exams else None,
+            },
+            "latency": {
+                call: {
+                    "count": sum(histogram.counts),
+                    "sum": histogram.sum,
+                    "buckets": dict(zip(bounds, histogram.cumulative())),
+                }
+                for call, histogram in total.latency.items()
+            },
+        }
+        if self.page_cache is not None:
+            snapshot["page_cache"] = self.page_cache.stats()
+        return snapshot
+
+    def prometheus(self) -> str:
+        """Everything recorded so far, in the Prometheus text exposition format"""
+        total = self.total()
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: List[Tuple[str, Any]]) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{labels} {value}")
+
+        family("location_visits_total", "counter", "Visits to each location",
+               [(f'{{location="{escape(key)}"}}', count) for key, count in sorted(total.visits.items())])
+        family("actions_total", "counter", "Actions performed, by action",
+               [(f'{{action="{escape(name)}"}}', count) for name, count in sorted(total.actions.items())])
+        family("skill_checks_total", "counter", "Skill checks made", [("", total.checks)])
+        family("skill_check_failures_total", "counter", "Failed skill checks, by the skill that was short",
+               [(f'{{skill="{escape(skill)}"}}', count) for skill, count in sorted(total.failed_checks.items())])
+        family("exams_total", "counter", "Final exams taken", [("", total.exams)])
+        family("exams_passed_total", "counter", "Final exams passed", [("", total.exams_passed)])
+        family("exam_pass_ratio", "gauge", "Share of final exams passed",
+               [("", total.exams_passed / total.exams if total.exams else 0)])
+
+        samples = []
+        bounds = [repr(bound) for bound in BUCKETS] + ["+Inf"]
+        for call, histogram in total.latency.items():
+            for bound, count in zip(bounds, histogram.cumulative()):
+                samples.append((f'_bucket{{call="{call}",le="{bound}"}}', count))
+            samples.append((f'_sum{{call="{call}"}}', repr(histogram.sum)))
+            samples.append((f'_count{{call="{call}"}}', sum(histogram.counts)))
+        family("call_seconds", "histogram", "Time spent inside game methods, excluding input and delays",
+               samples)
+
+        if self.page_cache is not None:
+            stats = self.page_cache.stats()
+            family("page_cache_hits_total", "counter", "Region lookups served from memory", [("", stats["hits"])])
+            family("page_cache_misses_total", "counter", "Regions read from disk", [("", stats["misses"])])
+            family("page_cache_evictions_total", "counter", "Regions evicted to stay under the cap",
+                   [("", stats["evictions"])])
+            family("page_cache_bytes", "gauge", "Estimated size of the loaded regions", [("", stats["bytes"])])
+            family("page_cache_hit_ratio", "gauge", "Share of region lookups served from memory",
+                   [("", stats["hit_rate"] or 0)])
+        return "\n".join(lines) + "\n"
+
+
+def escape(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
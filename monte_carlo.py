@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo simulator for AWS Adventure Game balance analysis
+
+Plays millions of headless sessions at once. Instead of one Player per run,
+skills, health, score and location are NumPy arrays with one entry per run,
+and every step advances all unfinished runs together. Choices come from a
+configurable policy; the certification exam is modelled as a binomial draw
+per run with a configurable chance of answering each question correctly.
+
+Requires NumPy, which the game itself does not need:
+
+    pip install numpy
+    python monte_carlo.py --runs 10000000 --policy informed
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from world import (DAMAGE, DEFAULT_WORLD, FINAL_EXAM, HEAL, INVENTORY, SCORE, SKILL, STATUS as STATUS_ACTION,
+                   World, load_world)
+
+# Option kinds
+MOVE, ACTION, STATUS, EXAM = range(4)
+
+# Run outcomes
+PASSED, DIED, TIMED_OUT = range(3)
+OUTCOMES = ("passed", "died", "timed_out")
+
+Policy = Union[str, Dict[str, List[float]]]
+
+# Most (skill code, location, option slot) cells StateTables will build
+MAX_STATE_CELLS = 4_000_000
+
+
+class WorldModel:
+    """Flat option tables for a world, ready for vectorized simulation"""
+
+    def __init__(self, world: World):
+        if np is None:
+            raise ImportError("monte_carlo requires NumPy: pip install numpy")
+
+        self.location_keys = [location.key for location in world.locations]
+        self.start = world.start
+        n_skills = len(world.skills)
+
+        n_locations = len(self.location_keys)
+        max_options = max(len(location.options) for location in world.locations)
+        self.option_ids = np.full((n_locations, max_options), -1, dtype=np.int32)
+        self.option_counts = np.zeros(n_locations, dtype=np.int32)
+
+        labels, kinds, checks, deltas, scores, destinations, events = ([] for _ in range(7))
+        for loc, location in enumerate(world.locations):
+            self.option_counts[loc] = len(location.options)
+            for slot, option in enumerate(location.options):
+                self.option_ids[loc, slot] = len(labels)
+                labels.append(f"{location.key}: {option.text}")
+                check = [0] * n_skills
+                delta = [0] * n_skills
+                for skill_id, level in option.skill_check:
+                    check[skill_id] = level
+                for skill_id, amount in option.skill_gain:
+                    delta[skill_id] += amount
+                score, destination, option_events = 0, -1, []
+
+                action = world.actions[option.action] if option.destination < 0 else None
+                if action is None:
+                    kind, destination = MOVE, option.destination
+                elif action.kind == FINAL_EXAM:
+                    kind = EXAM
+                elif action.kind == STATUS_ACTION:
+                    # Checking status uses a turn and changes nothing
+                    kind = STATUS
+                else:
+                    kind, destination = ACTION, action.destination
+                    score = self.add_effects(action.name, action.effects, delta, world)
+                    option_events = [(event.chance, self.event_effects(action.name, event.effects))
+                                     for event in action.events]
+
+                kinds.append(kind)
+                checks.append(check)
+                deltas.append(delta)
+                scores.append(score)
+                destinations.append(destination)
+                events.append(option_events)
+
+        self.option_labels = labels
+        self.kind = np.array(kinds, dtype=np.int8)
+        self.check = np.array(checks, dtype=np.int16)
+        self.delta = np.array(deltas, dtype=np.int16)
+        self.score = np.array(scores, dtype=np.int32)
+        self.destination = np.array(destinations, dtype=np.int32)
+
+        # Random events per option, padded: the chance of each event and its
+        # effects in order, with opcode -1 for padding
+        max_events = max(map(len, events), default=0)
+        max_effects = max((len(effects) for option_events in events for _, effects in option_events), default=0)
+        self.event_chance = np.zeros((len(labels), max_events), dtype=np.float64)
+        self.event_opcode = np.full((len(labels), max_events, max_effects), -1, dtype=np.int8)
+        self.event_value = np.zeros((len(labels), max_events, max_effects), dtype=np.int32)
+        for option_id, option_events in enumerate(events):
+            for k, (chance, effects) in enumerate(option_events):
+                self.event_chance[option_id, k] = chance
+                for f, (opcode, value) in enumerate(effects):
+                    self.event_opcode[option_id, k, f] = opcode
+                    self.event_value[option_id, k, f] = value
+        self.event_harmful = (self.event_opcode == DAMAGE).any(axis=2)
+
+    @staticmethod
+    def add_effects(name: str, effects, delta: List[int], world: World) -> int:
+        """Fold an action's effects into a skill delta and return its points"""
+        score = 0
+        for opcode, args in effects:
+            if opcode == SCORE:
+                score += args[0]
+            elif opcode == SKILL:
+                delta[world.skills.index(args[0])] += args[1]
+            elif opcode != INVENTORY:
+                raise ValueError(f"Action '{name}': effect {opcode} is not supported by the simulator")
+        return score
+
+    @staticmethod
+    def event_effects(name: str, effects) -> List[Tuple[int, int]]:
+        """A random event's effects as (opcode, value) pairs, leaving out items"""
+        pairs = []
+        for opcode, args in effects:
+            if opcode in (SCORE, DAMAGE, HEAL):
+                pairs.append((opcode, args[0]))
+            elif opcode != INVENTORY:
+                # Skill levels are part of the tabulated state, so they cannot change at random
+                raise ValueError(f"Action '{name}': event effect {opcode} is not supported by the simulator")
+        return pairs
+
+    def policy_weights(self, policy: Policy) -> np.ndarray:
+        """Per-location option weights (padded with zeros) for a policy"""
+        valid = self.option_ids >= 0
+        weights = valid.astype(np.float64)
+        if isinstance(policy, dict):
+            for key, row in policy.items():
+                loc = self.location_keys.index(key)
+                if len(row) != self.option_counts[loc]:
+                    raise ValueError(f"Policy for '{key}' needs {self.option_counts[loc]} weights")
+                weights[loc, :len(row)] = row
+        elif policy in ("no_status", "informed"):
+            weights[valid & (self.kind[self.option_ids] == STATUS)] = 0.0
+        elif policy != "uniform":
+            raise ValueError(f"Unknown policy '{policy}'")
+        if (weights.sum(axis=1) <= 0).any():
+            raise ValueError("Every location needs at least one option with positive weight")
+        return weights
+
+
+class SimulationResult:
+    """Aggregated outcomes of a batch of simulated runs"""
+
+    def __init__(self, model: WorldModel):
+        n_locations = len(model.location_keys)
+        n_options = len(model.option_labels)
+        self.model = model
+        self.runs = 0
+        self.outcomes = np.zeros(len(OUTCOMES), dtype=np.int64)
+        self.score_counts = np.zeros(1, dtype=np.int64)
+        self.health_counts = np.zeros(1, dtype=np.int64)
+        self.health_offset = 0
+        self.total_steps = 0
+        self.exam_attempts = 0
+        self.exam_passes = 0
+        self.damage_events = 0
+        self.visits = np.zeros(n_locations, dtype=np.int64)
+        self.transitions = np.zeros((n_locations, n_locations), dtype=np.int64)
+        self.choices = np.zeros(n_options, dtype=np.int64)
+        self.failed_checks = np.zeros(n_options, dtype=np.int64)
+
+    def add_finished(self, outcome: int, score: np.ndarray, health: np.ndarray, steps: int) -> None:
+        """Fold a group of finished runs into the histograms"""
+        if score.size == 0:
+            return
+        self.runs += score.size
+        self.outcomes[outcome] += score.size
+        self.total_steps += steps
+        self.score_counts = _add_counts(self.score_counts, score)
+        # Health can go below zero, so it is stored with an offset
+        low = min(int(health.min()), -self.health_offset)
+        if low < -self.health_offset:
+            shift = -low - self.health_offset
+            self.health_counts = np.concatenate([np.zeros(shift, dtype=np.int64), self.health_counts])
+            self.health_offset = -low
+        self.health_counts = _add_counts(self.health_counts, health + self.health_offset)
+
+    def merge(self, other: "SimulationResult") -> None:
+        """Add the results of another batch over the same world"""
+        self.runs += other.runs
+        self.outcomes += other.outcomes
+        self.total_steps += other.total_steps
+        self.exam_attempts += other.exam_attempts
+        self.exam_passes += other.exam_passes
+        self.damage_events += other.damage_events
+        self.visits += other.visits
+        self.transitions += other.transitions
+        self.choices += other.choices
+        self.failed_checks += other.failed_checks
+        self.score_counts = _add_counts_arrays(self.score_counts, other.score_counts)
+        offset = max(self.health_offset, other.health_offset)
+        self.health_counts = _add_counts_arrays(
+            np.concatenate([np.zeros(offset - self.health_offset, dtype=np.int64), self.health_counts]),
+            np.concatenate([np.zeros(offset - other.health_offset, dtype=np.int64), other.health_counts]))
+        self.health_offset = offset
+
+    @property
+    def pass_rate(self) -> float:
+        return self.outcomes[PASSED] / self.runs if self.runs else 0.0
+
+    def score_percentiles(self, percentiles=(5, 25, 50, 75, 95)) -> Dict[int, int]:
+        cumulative = np.cumsum(self.score_counts)
+        return {p: int(np.searchsorted(cumulative, cumulative[-1] * p / 100)) for p in percentiles}
+
+    def to_dict(self) -> Dict:
+        """Summary suitable for JSON output"""
+        model = self.model
+        return {
+            "runs": self.runs,
+            "outcomes": {name: int(count) for name, count in zip(OUTCOMES, self.outcomes)},
+            "pass_rate": self.pass_rate,
+            "exam_attempts": self.exam_attempts,
+            "exam_pass_rate": self.exam_passes / self.exam_attempts if self.exam_attempts else 0.0,
+            "damage_events": self.damage_events,
+            "mean_steps": self.total_steps / self.runs if self.runs else 0.0,
+            "score_histogram": {str(s): int(c) for s, c in enumerate(self.score_counts) if c},
+            "health_histogram": {str(h - self.health_offset): int(c)
+                                 for h, c in enumerate(self.health_counts) if c},
+            "location_visits": dict(zip(model.location_keys, map(int, self.visits))),
+            "transitions": {f"{model.location_keys[a]} -> {model.location_keys[b]}": int(self.transitions[a, b])
+                            for a, b in zip(*np.nonzero(self.transitions))},
+            "choices": dict(zip(model.option_labels, map(int, self.choices))),
+            "failed_checks": {label: int(count) for label, count
+                              in zip(model.option_labels, self.failed_checks) if count},
+        }
+
+    def report(self, bins: int = 20, width: int = 40) -> str:
+        """Human-readable summary with text histograms"""
+        lines = [f"Runs: {self.runs:,}"]
+        for name, count in zip(OUTCOMES, self.outcomes):
+            lines.append(f"  {name:10} {count:>12,} ({count / max(self.runs, 1):6.1%})")
+        lines.append(f"Exam pass rate per attempt: {self.exam_passes / max(self.exam_attempts, 1):.1%}"
+                     f" ({self.exam_attempts:,} attempts)")
+        lines.append(f"Damage events: {self.damage_events:,}")
+        lines.append(f"Mean steps per run: {self.total_steps / max(self.runs, 1):.1f}")
+        lines.append("Score percentiles: " + ", ".join(
+            f"p{p}={s}" for p, s in self.score_percentiles().items()))
+
+        lines.append("\nFinal score histogram:")
+        lines.extend(_text_histogram(self.score_counts, 0, bins, width))
+        lines.append("\nFinal health histogram:")
+        lines.extend(_text_histogram(self.health_counts, -self.health_offset, bins, width))
+
+        lines.append("\nLocation visits:")
+        for key, count in zip(self.model.location_keys, self.visits):
+            lines.append(f"  {key:18} {count:>14,}")
+        lines.append("\nMost frequent moves:")
+        order = np.argsort(self.transitions, axis=None)[::-1][:10]
+        for flat in order:
+            a, b = divmod(int(flat), len(self.model.location_keys))
+            if self.transitions[a, b]:
+                lines.append(f"  {self.model.location_keys[a]} -> {self.model.location_keys[b]}:"
+                             f" {self.transitions[a, b]:,}")
+        lines.append("\nFailed skill checks:")
+        for label, count in zip(self.model.option_labels, self.failed_checks):
+            if count:
+                lines.append(f"  {label}: {count:,}")
+        return "\n".join(lines)
+
+
+def _add_counts(counts: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Add a bincount of non-negative values to a growable count array"""
+    added = np.bincount(values, minlength=counts.size)
+    if added.size > counts.size:
+        added[:counts.size] += counts
+        return added
+    return counts + added
+
+
+def _add_counts_arrays(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.size < b.size:
+        a, b = b, a
+    result = a.copy()
+    result[:b.size] += b
+    return result
+
+
+def _text_histogram(counts: np.ndarray, first: int, bins: int, width: int) -> List[str]:
+    nonzero = np.nonzero(counts)[0]
+    if nonzero.size == 0:
+        return ["  (no runs)"]
+    low, high = int(nonzero[0]), int(nonzero[-1]) + 1
+    size = max(1, -(-(high - low) // bins))
+    buckets = [(start, int(counts[start:start + size].sum())) for start in range(low, high, size)]
+    peak = max(count for _, count in buckets)
+    return [f"  {start + first:>6}..{start + first + size - 1:<6} {'#' * round(width * count / peak):<{width}} {count:,}"
+            for start, count in buckets]
+
+
+class StateTables:
+    """Per-state lookup tables that turn a simulation step into array gathers.
+
+    Skills only matter up to the highest level any skill check asks for, so
+    each run's skills are capped there and packed with its location into a
+    single state. The outcome of picking each option slot from each state
+    (check passed, next state, points, damage event) is precomputed here, as
+    flat per-cell arrays indexed by ``state * max_options + slot``. Runs are
+    tracked by the offset of their state's row so a step needs no
+    multiplication, and finished runs park in a final row that never changes.
+    """
+
+    def __init__(self, model: WorldModel, weights: np.ndarray, informed: bool):
+        n_locations, max_options = model.option_ids.shape
+        self.n_locations = n_locations
+        self.max_options = max_options
+
+        caps = np.maximum(model.check.max(axis=0), 1).astype(np.int64)
+        radix = np.cumprod(np.concatenate([[1], caps[:-1]]))
+        n_codes = int(np.prod(caps))
+        n_states = n_codes * n_locations
+        if n_states * max_options > MAX_STATE_CELLS:
+            raise ValueError(f"World has {n_codes:,} skill-level combinations at each of {n_locations:,} "
+                             f"locations, too many to tabulate: the simulator handles up to "
+                             f"{MAX_STATE_CELLS:,} (combination, location, option) cells")
+        codes = np.arange(n_codes)
+        levels = (codes[:, None] // radix) % caps + 1
+
+        # Check results and capped skills after each option, per skill code
+        ok = (levels[:, None, :] >= model.check[None, :, :]).all(axis=2)
+        raised = np.minimum(levels[:, None, :] + model.delta[None, :, :], caps)
+        next_code = np.where(ok, ((raised - 1) * radix).sum(axis=2), codes[:, None])
+
+        # Expand to (code, location) states and the location's option slots
+        options = np.where(model.option_ids >= 0, model.option_ids, 0)
+        state_code = np.repeat(codes, n_locations)
+        state_loc = np.tile(np.arange(n_locations), n_codes)
+        self.state_loc = state_loc
+        self.option = options[state_loc]
+        self.option_count = model.option_counts[state_loc]
+        self.ok = ok[state_code[:, None], self.option]
+        destination = model.destination[self.option]
+        self.next_loc = np.where(self.ok & (destination >= 0), destination, state_loc[:, None])
+        next_state = next_code[state_code[:, None], self.option] * n_locations + self.next_loc
+
+        w = weights[state_loc]
+        if informed:
+            feasible = w * self.ok
+            has_choice = feasible.sum(axis=1) > 0
+            w = np.where(has_choice[:, None], feasible, w)
+        prob, alias = _alias_tables(w)
+
+        # Flat per-cell tables plus one retired row at the end
+        self.start_row = model.start * max_options
+        self.retired_row = n_states * max_options
+        rows = np.arange(n_states + 1)[:, None] * max_options
+        slots = np.arange(max_options)[None, :]
+
+        def cells(values, retired):
+            return np.concatenate([values, np.full((1, max_options), retired, dtype=values.dtype)]).ravel()
+
+        self.threshold = cells(((slots + prob) / max_options).astype(np.float32), 2.0)
+        self.alias_cell = cells(rows[:-1] + alias, self.retired_row)
+        self.next_row = cells(next_state * max_options, self.retired_row)
+        self.exam_loc = cells(self.next_loc, 0)
+        self.option_cell = cells(self.option, 0)
+        self.score = cells(np.where(self.ok, model.score[self.option], 0).astype(np.int32), 0)
+        self.risky = cells(self.ok & (model.event_chance.sum(axis=1) > 0)[self.option], False)
+        self.exam = cells(self.ok & (model.kind[self.option] == EXAM), False)
+        self.special = self.risky | self.exam
+
+    def fold_counts(self, result: SimulationResult, cell_counts: np.ndarray) -> None:
+        """Add per-(state, slot) pick counts to the result's choice and move tables"""
+        n_locations = self.n_locations
+        counts = cell_counts[:self.retired_row].reshape(self.option.shape)
+        valid = np.arange(self.max_options)[None, :] < self.option_count[:, None]
+        counts = np.where(valid, counts, 0)
+        result.choices += np.bincount(self.option.ravel(), counts.ravel(),
+                                      minlength=result.choices.size).astype(np.int64)
+        failed = np.where(self.ok, 0, counts)
+        result.failed_checks += np.bincount(self.option.ravel(), failed.ravel(),
+                                            minlength=result.failed_checks.size).astype(np.int64)
+        origin = np.broadcast_to(self.state_loc[:, None], counts.shape)
+        moved = origin != self.next_loc
+        pairs = origin[moved] * n_locations + self.next_loc[moved]
+        transitions = np.bincount(pairs, counts[moved], minlength=n_locations * n_locations)
+        transitions = transitions.astype(np.int64).reshape(n_locations, n_locations)
+        result.transitions += transitions
+        result.visits += transitions.sum(axis=0)
+
+
+def _alias_tables(weights: np.ndarray):
+    """Walker alias tables, one row per state, for O(1) weighted choices
+
+    Built for all rows at once: each round pairs, in every row, the smallest
+    unassigned slot below the average with the largest slot above it. A row
+    has at most k - 1 slots to assign, so k - 1 rounds finish every row.
+    """
+    n_rows, k = weights.shape
+    p = weights / weights.sum(axis=1, keepdims=True) * k
+    prob = np.ones((n_rows, k), dtype=np.float64)
+    alias = np.tile(np.arange(k, dtype=np.int64), (n_rows, 1))
+    assigned = np.zeros((n_rows, k), dtype=bool)
+    rows = np.arange(n_rows)
+    for _ in range(k - 1):
+        small = np.where(assigned | (p >= 1.0), np.inf, p).argmin(axis=1)
+        large = np.where(assigned | (p < 1.0), -np.inf, p).argmax(axis=1)
+        pairing = ~assigned[rows, small] & (p[rows, small] < 1.0) & ~assigned[rows, large] & (p[rows, large] >= 1.0)
+        r, s, l = rows[pairing], small[pairing], large[pairing]
+        if r.size == 0:
+            break
+        prob[r, s] = p[r, s]
+        alias[r, s] = l
+        assigned[r, s] = True
+        p[r, l] -= 1.0 - p[r, s]
+    return prob, alias
+
+
+def simulate(runs: int, policy: Policy = "informed", exam_accuracy: float = 0.7,
+             exam_questions: int = 5, pass_percent: float = 70, max_steps: int = 100,
+             seed: Optional[int] = None, chunk_size: int = 1_000_000,
+             model: Optional[WorldModel] = None, workers: int = 1) -> SimulationResult:
+    """Simulate `runs` playthroughs and return the aggregated results.
+
+    Policies: "uniform" picks any option, "no_status" never checks status and
+    "informed" only picks options whose skill check passes. A dict mapping
+    location keys to per-option weights gives a fixed custom policy. With
+    `workers` > 1 the runs are split across processes with independent seeds.
+    """
+    if model is None:
+        model = WorldModel(load_world())
+    if workers > 1:
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        shares = [runs // workers + (i < runs % workers) for i in range(workers)]
+        args = [(share, policy, exam_accuracy, exam_questions, pass_percent, max_steps,
+                 child, chunk_size, model) for share, child in zip(shares, seeds)]
+        result = SimulationResult(model)
+        with ProcessPoolExecutor(workers) as pool:
+            for partial in pool.map(_simulate_share, args):
+                result.merge(partial)
+        return result
+
+    rng = np.random.default_rng(seed)
+    tables = StateTables(model, model.policy_weights(policy), policy == "informed")
+    result = SimulationResult(model)
+    pass_correct = int(np.ceil(pass_percent * exam_questions / 100))
+    cell_counts = np.zeros(tables.threshold.size, dtype=np.int64)
+
+    for offset in range(0, runs, chunk_size):
+        n = min(chunk_size, runs - offset)
+        _simulate_chunk(model, tables, result, cell_counts, rng, n, exam_accuracy,
+                        exam_questions, pass_correct, max_steps)
+    tables.fold_counts(result, cell_counts)
+    return result
+
+
+def _simulate_share(args) -> SimulationResult:
+    return simulate(*args)
+
+
+def _simulate_chunk(model, tables, result, cell_counts, rng, n, exam_accuracy,
+                    exam_questions, pass_correct, max_steps) -> None:
+    max_options = tables.max_options
+    retired_row = tables.retired_row
+    start_shift = model.start * max_options
+
+    row = np.full(n, tables.start_row, dtype=np.int64)
+    health = np.full(n, 100, dtype=np.int32)
+    score = np.zeros(n, dtype=np.int32)
+    result.visits[model.start] += n
+    retired = 0
+
+    for step in range(1, max_steps + 1):
+        # Pick an option for every run with one alias-table draw. Choices,
+        # failed checks and moves are all recovered afterwards from how often
+        # each cell was picked.
+        u = rng.random(row.size, dtype=np.float32)
+        cell = row + np.minimum((u * max_options).astype(np.int64), max_options - 1)
+        cell = np.where(u < tables.threshold[cell], cell, tables.alias_cell[cell])
+        cell_counts += np.bincount(cell, minlength=cell_counts.size)
+
+        # Skill checks, rewards and moves; a failed check leaves the run in place
+        next_row = tables.next_row[cell]
+        score += tables.score[cell]
+        finished = 0
+
+        special = np.flatnonzero(tables.special[cell])
+        if special.size:
+            special_cells = cell[special]
+
+            # Random events such as the compromised EC2 instance, each drawn
+            # in turn and its effects applied in order; fatal damage ends the
+            # run before anything after it
+            risky = special[tables.risky[special_cells]]
+            if risky.size:
+                options = tables.option_cell[cell[risky]]
+                alive = np.ones(risky.size, dtype=bool)
+                for k in range(model.event_chance.shape[1]):
+                    fired = alive & (rng.random(risky.size) < model.event_chance[options, k])
+                    result.damage_events += int((fired & model.event_harmful[options, k]).sum())
+                    for f in range(model.event_opcode.shape[2]):
+                        opcode = model.event_opcode[options, k, f]
+                        value = np.where(fired, model.event_value[options, k, f], 0)
+                        score[risky] += np.where(opcode == SCORE, value, 0)
+                        run_health = health[risky]
+                        run_health = np.where(opcode == HEAL, np.minimum(run_health + value, 100), run_health)
+                        run_health -= np.where(opcode == DAMAGE, value, 0)
+                        health[risky] = run_health
+                        dead = fired & (opcode == DAMAGE) & (run_health <= 0)
+                        if dead.any():
+                            died = risky[dead]
+                            result.add_finished(DIED, score[died], health[died], step * died.size)
+                            next_row[died] = retired_row
+                            finished += died.size
+                            alive &= ~dead
+                            fired &= ~dead
+
+            # The exam: a binomial number of correct answers per attempt
+            exam = special[tables.exam[special_cells]]
+            if exam.size:
+                correct = rng.binomial(exam_questions, exam_accuracy, size=exam.size)
+                exam_passed = correct >= pass_correct
+                score[exam] += 10 * correct + 50 * exam_passed
+                result.exam_attempts += exam.size
+                result.exam_passes += int(exam_passed.sum())
+
+                passed = exam[exam_passed]
+                result.add_finished(PASSED, score[passed], health[passed], step * passed.size)
+                next_row[passed] = retired_row
+                finished += passed.size
+
+                # A failed exam sends the player back to the start
+                failed = exam[~exam_passed]
+                exam_loc = tables.exam_loc[cell[failed]]
+                next_row[failed] += start_shift - exam_loc * max_options
+                np.add.at(result.transitions, (exam_loc, model.start), 1)
+                result.visits[model.start] += failed.size
+
+        row = next_row
+        retired += finished
+        if step == max_steps:
+            live = row != retired_row
+            result.add_finished(TIMED_OUT, score[live], health[live], step * int(live.sum()))
+        elif retired * 4 > row.size:
+            # Drop finished runs once they make up a quarter of the arrays
+            live = row != retired_row
+            row, health, score = row[live], health[live], score[live]
+            retired = 0
+            if row.size == 0:
+                break
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate many AWS Adventure Game playthroughs")
+    parser.add_argument("--world", default=DEFAULT_WORLD, help="world JSON file")
+    parser.add_argument("--runs", type=int, default=1_000_000)
+    parser.add_argument("--policy", default="informed",
+                        help="uniform, no_status, informed, or a JSON file of per-location weights")
+    parser.add_argument("--exam-accuracy", type=float, default=0.7,
+                        help="chance of answering each exam question correctly")
+    parser.add_argument("--max-steps", type=int, default=100)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=1, help="processes to split the runs across")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    policy: Policy = args.policy
+    if args.policy.endswith(".json"):
+        with open(args.policy) as f:
+            policy = json.load(f)
+
+    start = time.perf_counter()
+    try:
+        model = WorldModel(load_world(args.world))
+        result = simulate(args.runs, policy, args.exam_accuracy, max_steps=args.max_steps,
+                          seed=args.seed, chunk_size=args.chunk_size, model=model, workers=args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+
+    print(result.report())
+    print(f"\nSimulated {result.runs:,} runs in {elapsed:.2f} s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result.to_dict(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Paged worlds: regions of locations loaded on demand under a memory cap
+
+A compiled world keeps every location's text and option tables in memory.
+Paging splits a world into regions of consecutive location ids and writes
+each region as one blob in a data file, next to a small index. A
+PagedWorld keeps only the index in memory: skills, actions, items and the
+offset of each location's options. The first time the game visits a
+location in a region, the region's tables are read from the mmap'd data
+file. A loaded region keeps them packed, as a World does, and builds a
+location's row each time it is asked for. Loaded regions sit in an LRU
+cache, and the least recently used ones are evicted once the bytes they
+hold pass the cap.
+
+A PagedWorld can stand in for a World: Game and the session store only
+use what both provide. The solver reads every option, which would load
+every region, so a paged world only offers hints from a table saved with
+its pages by --hints.
+
+    python paging.py worlds/generated.json worlds/generated  # write pages
+    python game_server.py --world worlds/generated           # play them
+"""
+
+import argparse
+import marshal
+import mmap
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from world import TABLES, Location, Option, RowTables, World, WorldError, WorldIndex, _Rows, load_world
+
+# Bump when the page layout changes so stale pages are rejected
+PAGING_VERSION = 3
+
+INDEX_FILE = "index.dat"
+DATA_FILE = "regions.dat"
+KEYS_FILE = "keys.dat"
+
+DEFAULT_REGION_SIZE = 256
+DEFAULT_CACHE_BYTES = 64 << 20
+
+# Per-option tables stored with each region; option_start stays global
+REGION_TABLES = [name for name in TABLES if name != "option_start"]
+
+
+def page_world(world: World, directory: str, region_size: int = DEFAULT_REGION_SIZE) -> int:
+    """Write a compiled world as pages; returns the number of regions"""
+    os.makedirs(directory, exist_ok=True)
+    location_count = len(world.keys)
+    offsets = array("Q", [0])
+    data_path = os.path.join(directory, DATA_FILE)
+    with open(data_path + ".tmp", "wb") as f:
+        for first in range(0, location_count, region_size):
+            end = min(first + region_size, location_count)
+            first_option, end_option = world.option_start[first], world.option_start[end]
+            tables = {name: getattr(world, name)[first_option:end_option]
+                      for name in ("option_destination", "option_action")}
+            # Skill checks and gains are rebased to start at the region's first
+            for start_table, pair_tables in (("check_start", ("check_skill", "check_level")),
+                                             ("gain_start", ("gain_skill", "gain_amount"))):
+                starts = getattr(world, start_table)[first_option:end_option + 1]
+                base = starts[0]
+                tables[start_table] = array("i", [start - base for start in starts])
+                for name in pair_tables:
+                    tables[name] = getattr(world, name)[base:starts[-1]]
+            f.write(marshal.dumps((
+                world.keys[first:end], world.names[first:end], world.descriptions[first:end],
+                world.option_text[first_option:end_option],
+                {name: table.tobytes() for name, table in tables.items()},
+            )))
+            offsets.append(f.tell())
+    # Location keys on their own, so looking one up reads no regions
+    with open(os.path.join(directory, KEYS_FILE) + ".tmp", "wb") as f:
+        marshal.dump(list(world.keys), f)
+    index = (PAGING_VERSION, world.content_hash, world.skills, world.raw_actions, world.declared_items,
+             world.start, region_size, location_count, world.option_start.tobytes(), offsets.tobytes())
+    with open(os.path.join(directory, INDEX_FILE) + ".tmp", "wb") as f:
+        marshal.dump(index, f)
+    # The index names the data file's layout, so it replaces last
+    os.replace(data_path + ".tmp", data_path)
+    os.replace(os.path.join(directory, KEYS_FILE) + ".tmp", os.path.join(directory, KEYS_FILE))
+    os.replace(os.path.join(directory, INDEX_FILE) + ".tmp", os.path.join(directory, INDEX_FILE))
+    return len(offsets) - 1
+
+
+class Region(RowTables):
+    """One region's text and tables, read from its blob; rows are built on access
+
+    Local indexes count from the region's first location and option.
+    """
+
+    def __init__(self, first: int, option_start: array, blob: bytes):
+        self.keys, self.names, self.descriptions, self.option_text, raw_tables = marshal.loads(blob)
+        for name in REGION_TABLES:
+            table = array(TABLES[name])
+            table.frombytes(raw_tables[name])
+            setattr(self, name, table)
+        self.first = first
+        self.option_base = option_start[first]
+        # The region's slice of the world's option_start, rebased like its other tables
+        self.option_start = array("i", [start - self.option_base
+                                        for start in option_start[first:first + len(self.keys) + 1]])
+        self.size = footprint(self)
+
+
+def footprint(region: Region) -> int:
+    """Bytes held by a region's text and tables, for the cache cap"""
+    size = sys.getsizeof(region)
+    for rows in (region.keys, region.names, region.descriptions, region.option_text):
+        size += sys.getsizeof(rows) + sum(map(sys.getsizeof, rows))
+    for name in TABLES:
+        size += sys.getsizeof(getattr(region, name))
+    return size
+
+
+class RegionCache:
+    """Loaded regions in least recently used order, under a size cap"""
+
+    def __init__(self, load, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.load = load
+        self.max_bytes = max_bytes
+        self.regions: "OrderedDict[int, Region]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, region_id: int) -> Region:
+        region = self.regions.get(region_id)
+        if region is not None:
+            self.hits += 1
+            self.regions.move_to_end(region_id)
+            return region
+        self.misses += 1
+        region = self.regions[region_id] = self.load(region_id)
+        self.bytes += region.size
+        # Always keep the region just loaded, however small the cap
+        while self.bytes > self.max_bytes and len(self.regions) > 1:
+            _, evicted = self.regions.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+        return region
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "regions": len(self.regions),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class PagedWorld(WorldIndex):
+    """A world whose locations are read region by region as they are visited"""
+
+    def __init__(self, directory: str, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE), "rb") as f:
+            version, *index = marshal.load(f)
+        if version != PAGING_VERSION:
+            raise WorldError(f"{directory}: pages were written by another version")
+        (content_hash, skills, actions, declared_items, start, self.region_size,
+         location_count, option_start, offsets) = index
+        # Derives the same items as World, so player snapshots agree
+        super().__init__(skills, actions, declared_items, start, content_hash)
+        # Results derived from the world, such as solver tables, are cached with the pages
+        self.cache_dir = directory
+        self.option_start = array("i")
+        self.option_start.frombytes(option_start)
+        self.offsets = array("Q")
+        self.offsets.frombytes(offsets)
+
+        self.file = open(os.path.join(directory, DATA_FILE), "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.cache = RegionCache(self.load_region, cache_bytes)
+        self.ids: Optional[Dict[str, int]] = None
+
+        self.keys: Sequence[str] = _Rows(location_count, lambda i: self.text("keys", i))
+        self.names: Sequence[str] = _Rows(location_count, lambda i: self.text("names", i))
+        self.descriptions: Sequence[str] = _Rows(location_count, lambda i: self.text("descriptions", i))
+        self.locations: Sequence[Location] = _Rows(location_count, self.location)
+        self.options: Sequence[Option] = _Rows(self.option_start[-1], self.option)
+        self.option_text: Sequence[str] = _Rows(self.option_start[-1], self.text_of_option)
+
+    def load_region(self, region_id: int) -> Region:
+        blob = self.mm[self.offsets[region_id]:self.offsets[region_id + 1]]
+        return Region(region_id * self.region_size, self.option_start, blob)
+
+    def region(self, location_id: int) -> Region:
+        return self.cache.get(location_id // self.region_size)
+
+    def option_region(self, option_id: int) -> Region:
+        return self.region(bisect_right(self.option_start, option_id) - 1)
+
+    def location(self, location_id: int) -> Location:
+        region = self.region(location_id)
+        return region.build_location(location_id - region.first)
+
+    def text(self, rows: str, location_id: int) -> str:
+        region = self.region(location_id)
+        return getattr(region, rows)[location_id - region.first]
+
+    def option(self, option_id: int) -> Option:
+        region = self.option_region(option_id)
+        return region.option(option_id - region.option_base)
+
+    def text_of_option(self, option_id: int) -> str:
+        region = self.option_region(option_id)
+        return region.option_text[option_id - region.option_base]
+
+    def location_id(self, key: str) -> int:
+        """Look up a location id by key; the first lookup reads the keys file"""
+        if self.ids is None:
+            with open(os.path.join(self.directory, KEYS_FILE), "rb") as f:
+                self.ids = {key: i for i, key in enumerate(marshal.load(f))}
+        try:
+            return self.ids[key]
+        except KeyError:
+            raise WorldError(f"Unknown location '{key}'") from None
+
+    def close(self) -> None:
+        self.mm.close()
+        self.file.close()
+
+
+def load_paged_world(directory: str, cache_bytes: int = DEFAULT_CACHE_BYTES) -> PagedWorld:
+    return PagedWorld(directory, cache_bytes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Split a world into pages that load region by region")
+    parser.add_argument("world", help="world JSON file")
+    parser.add_argument("directory", help="directory to write the pages to")
+    parser.add_argument("--region-size", type=int, default=DEFAULT_REGION_SIZE, help="locations per region")
+    parser.add_argument("--hints", action="store_true",
+                        help="also build the hint table and save it with the pages, so players can ask for hints")
+    args = parser.parse_args()
+
+    world = load_world(args.world)
+    regions = page_world(world, args.directory, args.region_size)
+    print(f"Paged {len(world.keys):,} locations into {regions:,} regions of up to {args.region_size}")
+    if args.hints:
+        # Imported here so paging needs nothing else
+        import solver
+        start = time.perf_counter()
+        solver.hint_table(world, cache_dir=args.directory)
+        print(f"Saved the hint table with the pages in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Question banks for the AWS Adventure Game's final exam
+
+A bank is a JSON-lines file with one question per line:
+
+    {"topic": "storage", "question": "...", "options": ["...", ...], "correct": 1}
+
+Opening a bank builds (or reads back) an index holding the byte offset of
+every question, grouped by topic. The bank file itself is mmap'd and only
+the questions that get asked are parsed, so drawing k questions costs O(k)
+however large the bank is, and a bank of millions of questions needs a few
+bytes of memory per question. Recently asked questions stay parsed in an
+LRU cache.
+
+The index is cached next to the bank, keyed by the bank's size and
+modification time, so editing the bank rebuilds it automatically. It also
+keeps a hash of the bank's contents, which recordings use to tell which
+bank they were played against.
+"""
+
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import random
+from array import array
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from world import CACHE_DIR_NAME, save_cache
+
+DEFAULT_BANK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worlds", "aws_academy_questions.jsonl")
+
+# Bump when the index layout changes so stale indexes are rebuilt
+INDEX_VERSION = 2
+
+QUESTION_CACHE_SIZE = 4096
+
+
+class QuestionBankError(ValueError):
+    """Raised for a question bank that cannot be read or indexed"""
+
+
+class Question(NamedTuple):
+    topic: str
+    question: str
+    options: Sequence[str]
+    correct: int
+
+
+class QuestionBank:
+    """An indexed, mmap'd question bank"""
+
+    def __init__(self, path: str, topics: Sequence[str], offsets: List[array],
+                 cache_size: int = QUESTION_CACHE_SIZE, content_hash: str = ""):
+        self.path = path
+        self.content_hash = content_hash
+        self.topics = tuple(topics)
+        self.topic_ids = {topic: i for i, topic in enumerate(self.topics)}
+        self.offsets = offsets
+        self.counts = [len(topic_offsets) for topic_offsets in offsets]
+        self.file = open(path, "rb")
+        # mmap refuses empty files, and an empty bank has nothing to read
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if len(self) else b""
+        self.question = lru_cache(maxsize=cache_size)(self.read_question)
+
+    def __len__(self) -> int:
+        return sum(self.counts)
+
+    def read_question(self, topic_id: int, index: int) -> Question:
+        """Parse one question; use QuestionBank.question for the cached copy"""
+        start = self.offsets[topic_id][index]
+        end = self.mm.find(b"\n", start)
+        raw = json.loads(self.mm[start:end if end >= 0 else len(self.mm)])
+        return Question(self.topics[topic_id], raw["question"], tuple(raw["options"]), raw["correct"])
+
+    def sample(self, k: int, rng: random.Random,
+               weights: Optional[Sequence[float]] = None) -> List[Question]:
+        """Draw k different questions, choosing each one's topic by weight
+
+        Weights are per topic, in the order of QuestionBank.topics; by
+        default topics are weighted by how many questions they hold, which
+        makes every question equally likely.
+
+        Each topic is drawn without replacement: its weight shrinks with the
+        questions it has left, reaching zero once it is exhausted, and a
+        partial Fisher-Yates shuffle picks among the questions not yet drawn.
+        """
+        if weights is None:
+            weights = self.counts
+        # Each question's share of its topic's weight; empty topics never draw
+        shares = [weight / count if count and weight > 0 else 0.0 for weight, count in zip(weights, self.counts)]
+        remaining = list(self.counts)
+        k = min(k, sum(count for share, count in zip(shares, remaining) if share))
+        # Per topic, the positions swapped so far by the shuffle
+        swapped: Dict[int, Dict[int, int]] = {}
+        topic_ids = range(len(self.topics))
+        questions = []
+        for _ in range(k):
+            cum_weights = list(accumulate(share * left for share, left in zip(shares, remaining)))
+            topic_id = rng.choices(topic_ids, cum_weights=cum_weights)[0]
+            moved = swapped.setdefault(topic_id, {})
+            left = remaining[topic_id] = remaining[topic_id] - 1
+            pick = rng.randrange(left + 1)
+            index = moved.get(pick, pick)
+            moved[pick] = moved.get(left, left)
+            questions.append(self.question(topic_id, index))
+        return questions
+
+    def skill_weights(self, skills: Sequence[str], levels: Sequence[int]) -> List[float]:
+        """Topic weights that favour the skills a player has trained most
+
+        Topics named after a skill are weighted by the player's level in it
+        times the topic's size; other topics keep their size as weight.
+        """
+        level_by_topic = dict(zip(skills, levels))
+        return [count * max(level_by_topic.get(topic, 1), 0)
+                for topic, count in zip(self.topics, self.counts)]
+
+    def close(self) -> None:
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.file.close()
+
+
+def build_index(path: str, typecode: str = "Q") -> tuple:
+    """Scan a bank once and return its topics, per-topic offsets and content hash"""
+    topic_ids: Dict[str, int] = {}
+    offsets: List[array] = []
+    errors: List[str] = []
+    offset = 0
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for line_number, line in enumerate(f, 1):
+            digest.update(line)
+            if line.strip():
+                try:
+                    raw = json.loads(line)
+                    topic = raw["topic"]
+                    if not 0 <= raw["correct"] < len(raw["options"]) or not raw["question"]:
+                        raise ValueError("'correct' must index one of the options")
+                except (ValueError, KeyError, TypeError) as e:
+                    errors.append(f"line {line_number}: {e}")
+                else:
+                    if topic not in topic_ids:
+                        topic_ids[topic] = len(offsets)
+                        offsets.append(array(typecode))
+                    offsets[topic_ids[topic]].append(offset)
+            offset += len(line)
+    if errors:
+        raise QuestionBankError(f"Invalid question bank {path}:\n  " + "\n  ".join(errors[:20]))
+    return list(topic_ids), offsets, digest.hexdigest()
+
+
+def load_question_bank(path: str = DEFAULT_BANK, cache_dir: Optional[str] = None,
+                       use_cache: bool = True, cache_size: int = QUESTION_CACHE_SIZE) -> QuestionBank:
+    """Open a question bank, reusing its cached index when the bank is unchanged"""
+    stat = os.stat(path)
+    # Four-byte offsets halve the index for banks under 4 GiB
+    typecode = "I" if stat.st_size < 1 << 32 else "Q"
+    stamp = (INDEX_VERSION, stat.st_size, stat.st_mtime_ns, typecode)
+    index_path = None
+    if use_cache:
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+        index_path = os.path.join(cache_dir, os.path.basename(path) + ".idx")
+        try:
+            with open(index_path, "rb") as f:
+                cached_stamp, topics, raw_offsets, content_hash = marshal.load(f)
+            if tuple(cached_stamp) == stamp:
+                offsets = []
+                for raw in raw_offsets:
+                    offsets.append(array(typecode))
+                    offsets[-1].frombytes(raw)
+                return QuestionBank(path, topics, offsets, cache_size, content_hash)
+        except (OSError, ValueError, EOFError, TypeError):
+            pass
+
+    topics, offsets, content_hash = build_index(path, typecode)
+    if index_path is not None:
+        save_cache(index_path, marshal.dumps((stamp, topics, [topic_offsets.tobytes() for topic_offsets in offsets],
+                                              content_hash)))
+    return QuestionBank(path, topics, offsets, cache_size, content_hash)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Deterministic record and replay of AWS Adventure Game sessions
+
+A session is fully determined by its random seed and the player's answers,
+so a recording is one JSON line holding the seed, the inputs (pause prompts
+are left out, since their answers are ignored), the final score, health
+and inventory, and the content hashes of the world and question bank it
+was played against. Verifying refuses recordings made against other data,
+since their sessions would legitimately end differently. Replaying runs the game headless at full speed: output is
+discarded, delays are skipped and pauses are answered immediately. Batches
+of recordings are verified across a process pool.
+
+    python replay.py record sessions.jsonl          # play in the terminal and record
+    python replay.py generate 100000 sessions.jsonl # record scripted random sessions
+    python replay.py verify sessions.jsonl --workers 8
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from aws_adventure_game import Delay, Game, Input, Renderer, Session
+from question_bank import QuestionBank, load_question_bank
+from world import World, load_world
+
+
+class ReplayError(ValueError):
+    """Raised for recordings that cannot be verified against the loaded data"""
+
+
+class Recording(NamedTuple):
+    """A session's seed, its inputs in order, how it ended and the data it was played against"""
+    seed: int
+    inputs: List[str]
+    score: int
+    health: int
+    items: List[str]
+    world_hash: str = ""
+    bank_hash: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Recording":
+        # Recordings from before the hashes were kept have neither
+        return cls(data["seed"], data["inputs"], data["score"], data["health"], data["items"],
+                   data.get("world_hash", ""), data.get("bank_hash", ""))
+
+    def outcome(self) -> Tuple[int, int, List[str]]:
+        return self.score, self.health, self.items
+
+
+class HeadlessRenderer(Renderer):
+    """Renderer that drops output as it is written, for sessions nobody watches"""
+
+    def __init__(self):
+        # Nothing reaches the stream, since flush() does nothing
+        super().__init__(sys.stdout, color=False, clear=False)
+
+    def write(self, text: str = "") -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+def record(session: Session, inputs: List[str]) -> Session:
+    """Pass a session through to its driver, appending each non-pause answer to `inputs`"""
+    try:
+        request = next(session)
+        while True:
+            answer = yield request
+            if isinstance(request, Input) and not request.pause:
+                inputs.append(answer if answer is not None else "")
+            request = session.send(answer)
+    except StopIteration as e:
+        return e.value
+    finally:
+        session.close()
+
+
+def finish(game: Game, inputs: List[str]) -> Recording:
+    player = game.player
+    return Recording(game.seed, inputs, player.score, player.health, player.items(),
+                     game.world.content_hash, game.load_question_bank().content_hash)
+
+
+def headless_game(seed: int, world: Optional[World], question_bank: Optional[QuestionBank]) -> Game:
+    return Game(HeadlessRenderer(), world, seed=seed, question_bank=question_bank)
+
+
+def replay(recording: Recording, world: Optional[World] = None,
+           question_bank: Optional[QuestionBank] = None) -> Recording:
+    """Play a recording back at full speed and return the recording it produces"""
+    game = headless_game(recording.seed, world, question_bank)
+    answers = iter(recording.inputs)
+    inputs: List[str] = []
+    session = record(game.session(), inputs)
+    try:
+        request = next(session)
+        while True:
+            if isinstance(request, Delay):
+                request = session.send(None)
+            elif request.pause:
+                request = session.send("")
+            else:
+                answer = next(answers, None)
+                if answer is None:
+                    # The recorded player stopped here
+                    break
+                request = session.send(answer)
+    except StopIteration:
+        pass
+    finally:
+        session.close()
+    return finish(game, inputs)
+
+
+def generate(seed: int, max_inputs: int = 200, world: Optional[World] = None,
+             question_bank: Optional[QuestionBank] = None) -> Recording:
+    """Record a session played by choosing options at random"""
+    chooser = random.Random(seed)
+    game = headless_game(seed, world, question_bank)
+    inputs: List[str] = []
+    session = record(game.session(), inputs)
+    try:
+        request = next(session)
+        while True:
+            if isinstance(request, Delay):
+                request = session.send(None)
+            elif request.pause:
+                request = session.send("")
+            elif len(inputs) >= max_inputs:
+                # Stop where a replay runs out of inputs: at the next real prompt
+                break
+            elif request.choices:
+                request = session.send(str(chooser.randint(1, request.choices)))
+            else:
+                # The only free-text prompt asks for the player's name
+                request = session.send(f"bot{seed}")
+    except StopIteration:
+        pass
+    finally:
+        session.close()
+    return finish(game, inputs)
+
+
+def read_recordings(path: str) -> Iterator[Recording]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield Recording.from_dict(json.loads(line))
+
+
+def check_data(recordings: List[Recording], world: World, question_bank: QuestionBank) -> None:
+    """Raise ReplayError unless every recording was played against this world and question bank"""
+    expected = (world.content_hash, question_bank.content_hash)
+    for i, recording in enumerate(recordings):
+        if (recording.world_hash, recording.bank_hash) != expected:
+            raise ReplayError(f"Recording {i + 1} was made against a different world or question bank")
+
+
+def verify(recordings: List[Recording], world: Optional[World] = None) -> Tuple[int, int, List[int]]:
+    """Replay recordings; return the number replayed, the inputs sent and the failing indexes"""
+    if world is None:
+        world = load_world()
+    question_bank = load_question_bank()
+    check_data(recordings, world, question_bank)
+    failures, inputs = [], 0
+    for i, recording in enumerate(recordings):
+        inputs += len(recording.inputs)
+        if replay(recording, world, question_bank).outcome() != recording.outcome():
+            failures.append(i)
+    return len(recordings), inputs, failures
+
+
+def _verify_share(args) -> Tuple[int, int, List[int]]:
+    offset, recordings = args
+    count, inputs, failures = verify(recordings)
+    return count, inputs, [offset + i for i in failures]
+
+
+def verify_file(path: str, workers: int = 1, batch_size: int = 2000) -> Tuple[int, int, List[int]]:
+    """Verify every recording in a file, in batches spread across `workers` processes"""
+    recordings = list(read_recordings(path))
+    if workers <= 1:
+        return verify(recordings)
+    # Checked here too, so a mismatch is reported before any batch is replayed
+    check_data(recordings, load_world(), load_question_bank())
+    batches = [(i, recordings[i:i + batch_size]) for i in range(0, len(recordings), batch_size)]
+    count, inputs, failures = 0, 0, []
+    with ProcessPoolExecutor(workers) as pool:
+        for batch_count, batch_inputs, batch_failures in pool.map(_verify_share, batches):
+            count += batch_count
+            inputs += batch_inputs
+            failures.extend(batch_failures)
+    return count, inputs, failures
+
+
+def to_line(recording: Recording) -> str:
+    return json.dumps(recording.to_dict(), separators=(",", ":")) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record and replay AWS Adventure Game sessions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    play = commands.add_parser("record", help="play in the terminal and append the session to a file")
+    play.add_argument("path")
+    play.add_argument("--seed", type=int)
+    bots = commands.add_parser("generate", help="append sessions played with random choices")
+    bots.add_argument("count", type=int)
+    bots.add_argument("path")
+    bots.add_argument("--seed", type=int, default=0, help="seed of the first session")
+    bots.add_argument("--max-inputs", type=int, default=200)
+    check = commands.add_parser("verify", help="replay sessions and check how each one ended")
+    check.add_argument("path")
+    check.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    check.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        game = Game(seed=args.seed)
+        inputs: List[str] = []
+        try:
+            game.run(record(game.session(), inputs))
+        except (EOFError, KeyboardInterrupt):
+            pass
+        if game.player is not None:
+            with open(args.path, "a") as f:
+                f.write(to_line(finish(game, inputs)))
+    elif args.command == "generate":
+        world, question_bank = load_world(), load_question_bank()
+        start = time.perf_counter()
+        with open(args.path, "a") as f:
+            for seed in range(args.seed, args.seed + args.count):
+                recording = generate(seed, args.max_inputs, world, question_bank)
+                f.write(to_line(recording))
+        print(f"Recorded {args.count:,} sessions in {time.perf_counter() - start:.2f} s")
+    else:
+        start = time.perf_counter()
+        try:
+            count, inputs, failures = verify_file(args.path, args.workers, args.batch_size)
+        except ReplayError as e:
+            sys.exit(f"{args.path}: {e}")
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {count:,} sessions ({inputs:,} inputs) in {elapsed:.2f} s: "
+              f"{count / elapsed:,.0f} sessions/s, {inputs / elapsed:,.0f} inputs/s")
+        if failures:
+            print(f"{len(failures)} sessions ended differently, first at line {failures[0] + 1}")
+            sys.exit(1)
+        print("All sessions ended as recorded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Persistent player sessions: an append-only journal plus mmap'd snapshots
+
+Every change to an attached player's state (score, items, skills, damage,
+healing and moves) is appended to a journal as a fixed-size record. Records
+are buffered and written with one write and one fsync per group commit, so
+thousands of sessions can share a single journal file.
+
+Each session also owns a fixed-size slot in an mmap'd snapshot file. At a
+checkpoint the changed sessions are written into their slots and the
+journal starts a new segment, after which the old segments are deleted.
+Opening the store therefore replays only the records written since the last
+checkpoint, and resuming a session is a single slot read, however long the
+store has been running.
+
+    python session_store.py sessions/     # list the sessions in a store
+"""
+
+import argparse
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from aws_adventure_game import MOVE, Player, snapshot_format
+from world import DAMAGE, HEAL, INVENTORY, SCORE, SKILL, World, load_world
+
+# Journal opcodes: the world effect opcodes and MOVE as Player.journal
+# passes them, then session ends
+END = MOVE + 1
+
+# Journal record: session id, opcode, skill or item id, amount or location id
+RECORD = struct.Struct("<IBHi")
+
+MAGIC = b"AWSSESS1"
+# Snapshot file header: magic, world content hash, slot size, slots in use,
+# sequence number of the last checkpoint
+HEADER = struct.Struct("<8s64sIIQ")
+HEADER_SIZE = mmap.PAGESIZE
+# Each slot: sequence number of the last record it includes, in-use flag,
+# player name, then the player's snapshot record
+SLOT = struct.Struct("<QB32s")
+SEQ = struct.Struct("<Q")
+IN_USE = SEQ.size
+NAME_SIZE = 32
+# Bytes of the hash that ends names longer than NAME_SIZE, written as hex
+NAME_HASH_SIZE = 8
+INITIAL_SLOTS = 1024
+
+
+class SessionStoreError(ValueError):
+    """Raised when a store cannot be opened or a session cannot be attached"""
+
+
+def encode_name(name: str) -> bytes:
+    """Player names are stored as at most NAME_SIZE bytes of UTF-8
+
+    A longer name keeps as much of its start as fits before a hash of the
+    whole name, so long names that share a prefix stay separate sessions.
+    """
+    raw = name.encode("utf-8")
+    if len(raw) <= NAME_SIZE:
+        return raw
+    digest = hashlib.blake2b(raw, digest_size=NAME_HASH_SIZE).hexdigest().encode("ascii")
+    prefix = raw[:NAME_SIZE - len(digest) - 1].decode("utf-8", errors="ignore").encode("utf-8")
+    return prefix + b"~" + digest
+
+
+def decode_name(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", errors="ignore")
+
+
+class SessionStore:
+    """Journal and snapshot files for the sessions of one world"""
+
+    def __init__(self, path: str, world: World, commit_interval: float = 0.005,
+                 commit_records: int = 8192, checkpoint_records: int = 1 << 18,
+                 fsync: bool = True):
+        self.path = path
+        self.world = world
+        self.commit_interval = commit_interval
+        self.commit_bytes = commit_records * RECORD.size
+        self.checkpoint_records = checkpoint_records
+        self.fsync = fsync
+        # Set by the server to run journal writes on another thread, in the
+        # order they were submitted; None writes inline
+        self.writer: Optional[Callable[..., Any]] = None
+        self.format = snapshot_format(len(world.skills), len(world.items))
+        self.slot_size = SLOT.size + self.format.size
+
+        self.buffer = bytearray()
+        self.last_commit = time.monotonic()
+        self.seq = 0
+        self.checkpoint_seq = 0
+        self.segment = None
+        self.players: Dict[int, Player] = {}
+        self.dirty = set()
+        self.names: Dict[str, int] = {}
+        self.free: List[int] = []
+        self.slot_count = 0
+
+        os.makedirs(path, exist_ok=True)
+        self.open_snapshots()
+        self.recover()
+
+    # Snapshot file
+
+    def open_snapshots(self) -> None:
+        path = os.path.join(self.path, "snapshots.dat")
+        world_hash = self.world.content_hash.encode("ascii")
+        self.file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        if os.fstat(self.file.fileno()).st_size < HEADER_SIZE:
+            self.file.truncate(HEADER_SIZE + INITIAL_SLOTS * self.slot_size)
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            HEADER.pack_into(self.mm, 0, MAGIC, world_hash, self.slot_size, 0, 0)
+            self.mm.flush()
+        else:
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+        magic, stored_hash, slot_size, self.slot_count, self.checkpoint_seq = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise SessionStoreError(f"{path} is not a session store")
+        if stored_hash.rstrip(b"\0") != world_hash or slot_size != self.slot_size:
+            raise SessionStoreError(f"{path} was written for a different world")
+        self.capacity = (len(self.mm) - HEADER_SIZE) // self.slot_size
+
+    def write_header(self) -> None:
+        HEADER.pack_into(self.mm, 0, MAGIC, self.world.content_hash.encode("ascii"),
+                         self.slot_size, self.slot_count, self.checkpoint_seq)
+
+    def slot_offset(self, session_id: int) -> int:
+        if session_id >= self.capacity:
+            self.capacity = max(2 * self.capacity, session_id + 1)
+            self.mm.close()
+            self.file.truncate(HEADER_SIZE + self.capacity * self.slot_size)
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+        return HEADER_SIZE + session_id * self.slot_size
+
+    def write_slot(self, session_id: int, record: bytes) -> None:
+        offset = self.slot_offset(session_id)
+        SEQ.pack_into(self.mm, offset, self.seq)
+        self.mm[offset + SLOT.size:offset + self.slot_size] = record
+
+    def read_slot(self, session_id: int) -> bytes:
+        offset = self.slot_offset(session_id) + SLOT.size
+        return self.mm[offset:offset + self.format.size]
+
+    # Journal
+
+    def segment_path(self, start: int) -> str:
+        return os.path.join(self.path, f"journal-{start:020d}.log")
+
+    def segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, "journal-*.log")))
+
+    def start_segment(self) -> None:
+        """Begin a new journal segment and drop the ones a checkpoint covers"""
+        previous = self.segment
+        current = self.segment_path(self.seq)
+        # Everything in an existing file of this name has been applied, and
+        # a torn record left there would misalign the records after it
+        self.segment = open(current, "wb")
+        # Queued behind any writes still going to the previous segment
+        self.write(self.drop_segments, previous, current)
+
+    def drop_segments(self, previous, current: str) -> None:
+        if previous is not None:
+            previous.close()
+        for path in self.segments():
+            if path != current:
+                os.remove(path)
+
+    def write(self, function: Callable[..., None], *args) -> None:
+        if self.writer is None:
+            function(*args)
+        else:
+            self.writer(function, *args)
+
+    def append(self, session_id: int, opcode: int, index: int, value: int) -> None:
+        """Journal one state transition; Player.journal calls this"""
+        self.buffer += RECORD.pack(session_id, opcode, index, value)
+        self.seq += 1
+        self.dirty.add(session_id)
+        if len(self.buffer) >= self.commit_bytes or time.monotonic() - self.last_commit >= self.commit_interval:
+            self.commit()
+        if self.seq - self.checkpoint_seq >= self.checkpoint_records:
+            self.checkpoint()
+
+    def commit(self) -> None:
+        """Write every buffered record with a single write and fsync"""
+        if self.buffer:
+            batch, self.buffer = self.buffer, bytearray()
+            self.write(self.write_batch, self.segment, batch)
+        self.last_commit = time.monotonic()
+
+    def write_batch(self, segment, batch: bytearray) -> None:
+        segment.write(batch)
+        segment.flush()
+        if self.fsync:
+            os.fsync(segment.fileno())
+
+    def checkpoint(self) -> None:
+        """Snapshot every changed session and start a fresh journal segment"""
+        self.commit()
+        for session_id, player in self.players.items():
+            if session_id in self.dirty:
+                self.write_slot(session_id, player.snapshot())
+        self.dirty.clear()
+        self.checkpoint_seq = self.seq
+        self.write_header()
+        # The slots must be on disk before the journal that rebuilds them goes
+        self.mm.flush()
+        self.start_segment()
+
+    def recover(self) -> None:
+        """Apply journal records newer than each slot, then checkpoint"""
+        skill_count = len(self.world.skills)
+        seqs, states, names = {}, {}, {}
+        for session_id in range(self.slot_count):
+            seq, in_use, raw_name = SLOT.unpack_from(self.mm, self.slot_offset(session_id))
+            if in_use:
+                seqs[session_id], names[session_id] = seq, decode_name(raw_name)
+
+        self.seq = self.checkpoint_seq
+        for path in self.segments():
+            start = int(os.path.basename(path)[len("journal-"):-len(".log")])
+            with open(path, "rb") as f:
+                data = f.read()
+            # A crash can leave a torn record at the end of the last segment
+            data = memoryview(data)[:len(data) - len(data) % RECORD.size]
+            seq = start
+            for session_id, opcode, index, value in RECORD.iter_unpack(data):
+                seq += 1
+                if session_id not in names or seq <= seqs[session_id]:
+                    continue
+                if opcode == END:
+                    del names[session_id]
+                    continue
+                state = states.get(session_id)
+                if state is None:
+                    state = states[session_id] = list(self.format.unpack(self.read_slot(session_id)))
+                if opcode == SCORE:
+                    state[1] += value
+                elif opcode == INVENTORY:
+                    state[3 + skill_count + index] += value
+                elif opcode == SKILL:
+                    state[3 + index] += value
+                elif opcode == DAMAGE:
+                    state[0] -= value
+                elif opcode == HEAL:
+                    state[0] = min(100, state[0] + value)
+                elif opcode == MOVE:
+                    state[2] = value
+            self.seq = max(self.seq, seq)
+
+        for session_id, state in states.items():
+            if session_id in names:
+                self.write_slot(session_id, self.format.pack(*state))
+        for session_id in reversed(range(self.slot_count)):
+            if session_id in names:
+                self.names[names[session_id]] = session_id
+            else:
+                self.mm[self.slot_offset(session_id) + IN_USE] = 0
+                self.free.append(session_id)
+        self.checkpoint()
+
+    # Sessions
+
+    def attach(self, player: Player) -> bool:
+        """Journal a player's changes from now on; True if a saved session was resumed
+
+        Sessions are keyed by player name. A saved session with this name is
+        restored into the player; otherwise a new slot is taken.
+        """
+        name = decode_name(encode_name(player.name))
+        session_id = self.names.get(name)
+        if session_id is not None:
+            if session_id in self.players:
+                raise SessionStoreError(f"{name} is already playing")
+            player.restore(self.read_slot(session_id))
+            resumed = True
+        else:
+            if self.free:
+                session_id = self.free.pop()
+            else:
+                session_id = self.slot_count
+                self.slot_count += 1
+            offset = self.slot_offset(session_id)
+            SLOT.pack_into(self.mm, offset, self.seq, 1, encode_name(name))
+            self.mm[offset + SLOT.size:offset + self.slot_size] = player.snapshot()
+            self.names[name] = session_id
+            self.write_header()
+            # New sessions are not journaled, so sync the header and the slot now
+            self.mm.flush(0, offset + self.slot_size)
+            resumed = False
+        self.players[session_id] = player
+        player.journal = partial(self.append, session_id)
+        return resumed
+
+    def release(self, player: Player) -> Optional[int]:
+        """Stop journaling a player and return its session id, if it was attached"""
+        session_id = self.names.get(decode_name(encode_name(player.name)))
+        if session_id is None or self.players.get(session_id) is not player:
+            return None
+        del self.players[session_id]
+        player.journal = None
+        return session_id
+
+    def detach(self, player: Player) -> None:
+        """Stop journaling a player whose session may be resumed later"""
+        session_id = self.release(player)
+        if session_id is None:
+            return
+        if session_id in self.dirty:
+            self.write_slot(session_id, player.snapshot())
+            self.dirty.discard(session_id)
+        self.commit()
+
+    def end(self, player: Player) -> None:
+        """Forget a finished session so the name starts afresh next time"""
+        session_id = self.release(player)
+        if session_id is None:
+            return
+        self.append(session_id, END, 0, 0)
+        self.dirty.discard(session_id)
+        self.mm[self.slot_offset(session_id) + IN_USE] = 0
+        self.names.pop(decode_name(encode_name(player.name)), None)
+        self.free.append(session_id)
+        self.commit()
+
+    def saved(self) -> Dict[str, bytes]:
+        """Snapshot records of every saved session by player name"""
+        return {name: self.read_slot(session_id) for name, session_id in self.names.items()}
+
+    def close(self) -> None:
+        """Save every attached session and close the files"""
+        for player in list(self.players.values()):
+            self.detach(player)
+        self.checkpoint()
+        self.segment.close()
+        self.mm.close()
+        self.file.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List the sessions saved in a session store")
+    parser.add_argument("path", help="session store directory")
+    args = parser.parse_args()
+
+    world = load_world()
+    store = SessionStore(args.path, world)
+    try:
+        for name, record in sorted(store.saved().items()):
+            health, score, location = store.format.unpack(record)[:3]
+            print(f"{name:32} health {health:4}  score {score:6}  at {world.keys[location]}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Route solver for AWS Adventure Game worlds
+
+Works on the state space of (location, skill levels). Skills only ever grow
+and a skill check only asks for a minimum level, so a player with at least
+the skills of another can follow any route the other can. The solver leans
+on that ordering in two passes:
+
+* A backward pass finds, for every location, the minimal skill vectors from
+  which the final exam can be reached in d choices, for increasing d. A
+  vector is dropped when one it dominates is already known with a distance
+  no longer than its own. The result is a hint table: for any location and
+  skills, the first entry the player meets names the option to pick and how
+  many choices remain. The shortest route from the start follows the hints.
+* A forward pass finds the highest-scoring route that finishes within a
+  number of choices. At each step it keeps, per location, only the
+  (skills, score) states no other state dominates, and drops states that
+  can no longer reach the exam in the steps left.
+
+Routes assume random events never fire and every exam answer is right.
+The hint table and the routes are cached in memory and on disk, next to
+the world's own compiled cache and keyed by its content hash. The game
+only needs the hint table, which hint_table() builds without the forward
+pass.
+
+    python solver.py --max-steps 40
+"""
+
+import argparse
+import marshal
+import os
+import time
+from heapq import nlargest
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from world import DEFAULT_WORLD, FINAL_EXAM, SCORE, SKILL, STATUS, World, load_world, save_cache
+
+# Bump when the cached solution layout changes
+SOLVER_VERSION = 2
+
+# States kept per step by the beam search that seeds the highest-scoring route
+BEAM_WIDTH = 256
+
+# Worlds up to this many locations offer hints unless a game turns them off;
+# the hint tables of larger worlds can take seconds to build
+AUTO_HINT_LOCATIONS = 2000
+
+Skills = Tuple[int, ...]
+
+
+class Transition(NamedTuple):
+    """What one option does, in solver terms"""
+    option: int
+    location: int
+    check: Skills
+    gain: Skills
+    score: int
+    destination: int  # -1 for the final exam
+
+
+class Hint(NamedTuple):
+    """Pick `option` when the player's skills are at least `skills`"""
+    skills: Skills
+    steps: int
+    option: int
+
+
+class Solution(NamedTuple):
+    content_hash: str
+    hints: List[List[Hint]]
+    shortest: List[int]
+    best: List[int]
+    best_score: int
+    max_steps: int
+
+
+def exam_points() -> int:
+    """Points for passing the final exam with every answer right, from the game's exam settings"""
+    # Imported here, since the game imports the solver for its hints
+    from aws_adventure_game import Game
+    return Game.exam_questions * Game.question_points + Game.pass_points
+
+
+def transitions(world: World) -> List[List[Transition]]:
+    """Transitions out of each location, leaving out options that cannot change anything"""
+    finish_points = exam_points()
+    n_skills = len(world.skills)
+    skill_ids = {skill: i for i, skill in enumerate(world.skills)}
+    by_location: List[List[Transition]] = []
+    for location_id in range(len(world.keys)):
+        out = []
+        for option_id in range(world.option_start[location_id], world.option_start[location_id + 1]):
+            option = world.option(option_id)
+            check, gain = [0] * n_skills, [0] * n_skills
+            for skill_id, level in option.skill_check:
+                check[skill_id] = max(check[skill_id], level)
+            for skill_id, amount in option.skill_gain:
+                gain[skill_id] += amount
+            score, destination = 0, option.destination
+            if destination < 0:
+                action = world.actions[option.action]
+                if action.kind == STATUS:
+                    continue
+                if action.kind == FINAL_EXAM:
+                    score, destination = finish_points, -1
+                else:
+                    for opcode, args in action.effects:
+                        if opcode == SCORE:
+                            score += args[0]
+                        elif opcode == SKILL:
+                            gain[skill_ids[args[0]]] += args[1]
+                    destination = action.destination if action.destination >= 0 else location_id
+            out.append(Transition(option_id, location_id, tuple(check), tuple(gain), score, destination))
+        by_location.append(out)
+    return by_location
+
+
+def covers(skills: Sequence[int], required: Sequence[int]) -> bool:
+    """True if every skill level meets the required level"""
+    for have, need in zip(skills, required):
+        if have < need:
+            return False
+    return True
+
+
+def skill_caps(world: World, moves: List[List[Transition]]) -> List[int]:
+    """Per skill, the highest level any check asks for, and at least 1"""
+    caps = [1] * len(world.skills)
+    for out in moves:
+        for move in out:
+            caps = [max(cap, check) for cap, check in zip(caps, move.check)]
+    return caps
+
+
+def solve_hints(world: World, moves: List[List[Transition]]) -> List[List[Hint]]:
+    """Backward pass: per location, the hints in order of remaining steps"""
+    hints: List[List[Hint]] = [[] for _ in moves]
+    # Skills stay packed throughout; no hint asks for more than the highest
+    # check, so gains can be capped there too
+    caps = skill_caps(world, moves)
+    packing = Packing(caps, 0)
+    pack, unpack, guard, width = packing.pack, packing.unpack, packing.guard, packing.width
+    # Multiplying the flags shifted down from the guard bits by this fills
+    # the flagged fields with ones
+    fill = (1 << width) - 1
+    # Exam moves start the frontier. Every other move is listed under the
+    # location it leads to, with its check raised to level 1 (players start
+    # every skill at 1, so asking for less is the same as asking for 1) and
+    # its gain capped
+    frontier = []
+    sources: List[List[Tuple[int, int, int, int]]] = [[] for _ in moves]
+    for out in moves:
+        for move in out:
+            floor = pack([max(level, 1) for level in move.check])
+            if move.destination < 0:
+                frontier.append((move.location, floor, move.option))
+            else:
+                gain = pack([min(amount, cap) for amount, cap in zip(move.gain, caps)])
+                sources[move.destination].append((move.location, floor, gain, move.option))
+    # Per location, the hints' packed skills grouped by which skills they ask
+    # more than level 1 of, as guard bits; only hints asking for a subset of
+    # a state's raised skills can dominate it
+    raised_at = pack([2] * len(caps))
+    by_raised: List[Dict[int, List[int]]] = [{} for _ in moves]
+    # Every state ever considered per location; once dropped, a state stays
+    # dominated, so seeing it again settles it at once
+    seen: List[set] = [set() for _ in moves]
+
+    steps = 1
+    while frontier:
+        # Those asking for the fewest levels first, so a state is only ever
+        # dropped for one it really dominates
+        frontier.sort(key=lambda state: packing.total(state[1]))
+        added = []
+        for location_id, skills, option_id in frontier:
+            location_seen = seen[location_id]
+            if skills in location_seen:
+                continue
+            location_seen.add(skills)
+            guarded = skills | guard
+            raised = (guarded - raised_at) & guard
+            groups = by_raised[location_id]
+            if not dominated(groups, guarded, raised, guard):
+                groups.setdefault(raised, []).append(skills)
+                hints[location_id].append(Hint(unpack(skills), steps, option_id))
+                added.append((location_id, skills))
+        # Anyone who can take a move into an added state, and arrives with
+        # at least its skills, is one step further from the exam: per skill
+        # they need max(check, need - gain), computed on all fields at once
+        frontier = []
+        for location_id, skills in added:
+            guarded = skills | guard
+            for source, floor, gain, option_id in sources[location_id]:
+                left = guarded - gain
+                # Fields where the gain covers the whole need drop to 0
+                left &= ((left & guard) >> width) * fill
+                higher = ((((floor | guard) - left) & guard) >> width) * fill
+                frontier.append((source, (floor & higher) | (left & ~higher), option_id))
+        steps += 1
+    return hints
+
+
+def dominated(groups: Dict[int, List[int]], guarded: int, raised: int, guard: int) -> bool:
+    """True if a packed vector in groups is covered by guarded, a packed vector with its guard bits set
+
+    Groups are keyed by the guard bits of the skills their vectors ask more
+    than level 1 of, so only the subsets of raised are searched.
+    """
+    subset = raised
+    while True:
+        for required in groups.get(subset, ()):
+            # Packing.covers, inlined
+            if (guarded - required) & guard == guard:
+                return True
+        if not subset:
+            return False
+        subset = (subset - 1) & raised
+
+
+def lookup(hints: List[List[Hint]], location_id: int, skills: Sequence[int]) -> Optional[Hint]:
+    """The hint with the fewest remaining steps that these skills qualify for"""
+    for hint in hints[location_id]:
+        if covers(skills, hint.skills):
+            return hint
+    return None
+
+
+def follow(world: World, moves: List[List[Transition]], hints: List[List[Hint]]) -> List[int]:
+    """The shortest route from the start, as option ids"""
+    by_option = {move.option: move for out in moves for move in out}
+    location_id, skills = world.start, (1,) * len(world.skills)
+    route = []
+    hint = lookup(hints, location_id, skills)
+    while hint is not None:
+        route.append(hint.option)
+        move = by_option[hint.option]
+        if move.destination < 0:
+            return route
+        location_id = move.destination
+        skills = tuple(level + gain for level, gain in zip(skills, move.gain))
+        hint = lookup(hints, location_id, skills)
+    return []
+
+
+class Packing:
+    """Skill vectors packed into one int, a field per skill with a guard bit on top
+
+    With the guard bits, comparing or adding two vectors takes a handful of
+    integer operations however many skills a world has.
+    """
+
+    def __init__(self, caps: Sequence[int], max_gain: int):
+        # Whole bytes per field, so small levels pack and unpack as bytes
+        self.field = (max(max(caps, default=1) + max_gain, 1).bit_length() + 8) // 8 * 8
+        self.width = self.field - 1
+        self.size = len(caps) * self.field // 8
+        self.guard = self.pack([1 << self.width] * len(caps))
+        self.caps = self.pack(caps)
+        self.over = self.pack([cap + 1 for cap in caps])
+
+    def pack(self, levels: Sequence[int]) -> int:
+        if self.field == 8:
+            return int.from_bytes(bytes(levels), "little")
+        packed = 0
+        for i, level in enumerate(levels):
+            packed |= level << (i * self.field)
+        return packed
+
+    def unpack(self, packed: int) -> Skills:
+        raw = packed.to_bytes(self.size, "little")
+        if self.field == 8:
+            return tuple(raw)
+        step = self.field // 8
+        return tuple(int.from_bytes(raw[i:i + step], "little") for i in range(0, self.size, step))
+
+    def total(self, packed: int) -> int:
+        """Sum of the fields"""
+        if self.field == 8:
+            return sum(packed.to_bytes(self.size, "little"))
+        return sum(self.unpack(packed))
+
+    def covers(self, skills: int, required: int) -> bool:
+        """True if every field of skills is at least the same field of required"""
+        return ((skills | self.guard) - required) & self.guard == self.guard
+
+    def add(self, skills: int, gain: int) -> int:
+        """Add a gain, capping each field at its cap"""
+        total = skills + gain
+        capped = (((total | self.guard) - self.over) & self.guard) >> self.width
+        mask = capped * ((1 << self.width) - 1)
+        return (total & ~mask) | (self.caps & mask)
+
+
+def score_bounds(moves: List[List[Transition]], max_steps: int) -> List[List[int]]:
+    """Per number of choices left and location, the most points a route can still add
+
+    Skill checks are ignored, so these are upper bounds; locations that
+    cannot reach the exam at all in time get a large negative bound.
+    """
+    unreachable = -(1 << 60)
+    bounds = [[unreachable] * len(moves)]
+    for _ in range(max_steps):
+        previous = bounds[-1]
+        bounds.append([max([move.score if move.destination < 0 else move.score + previous[move.destination]
+                            for move in out], default=unreachable) for out in moves])
+    return bounds
+
+
+def solve_best(world: World, moves: List[List[Transition]], hints: List[List[Hint]],
+               max_steps: int, beam_width: int = BEAM_WIDTH) -> Tuple[List[int], int]:
+    """Forward pass: the highest-scoring route that finishes within max_steps
+
+    A beam search that keeps only the most promising states runs first. The
+    score of the route it finds then prunes the exact search, which drops
+    every state that could not beat it even at full points.
+    """
+    # Skill levels above the highest check never matter
+    caps = skill_caps(world, moves)
+    max_gain = max((max(move.gain, default=0) for out in moves for move in out), default=0)
+    packing = Packing(caps, max_gain)
+    add, guard = packing.add, packing.guard
+    packed_moves = [[(move.option, packing.pack(move.check), packing.pack(move.gain), move.score,
+                      move.destination) for move in out] for out in moves]
+    packed_hints = [[(packing.pack(hint.skills), hint.steps) for hint in location_hints]
+                    for location_hints in hints]
+    bounds = score_bounds(moves, max_steps)
+
+    def search(best_score: int, best_path: Optional[tuple], beam: Optional[int]) -> Tuple[int, Optional[tuple]]:
+        # A state is (skills, score, path), path being a linked list of option ids
+        layer: Dict[int, List[tuple]] = {world.start: [(packing.pack([1] * len(caps)), 0, None)]}
+        for step in range(max_steps):
+            remaining = max_steps - step - 1
+            headroom = bounds[remaining]
+            # Per location, the best score and path reached with each skill vector,
+            # or None for skills that can no longer reach the exam in time
+            reached: Dict[int, Dict[int, Optional[tuple]]] = {}
+            for location_id, states in layer.items():
+                for skills, score, path in states:
+                    guarded = skills | guard
+                    for option_id, check, gain, points, destination in packed_moves[location_id]:
+                        # covers(skills, check), inlined as this is the hottest loop
+                        if (guarded - check) & guard != guard:
+                            continue
+                        total = score + points
+                        if destination < 0:
+                            if total > best_score:
+                                best_score, best_path = total, (option_id, path)
+                            continue
+                        # Drop states that cannot beat the best route even at full points
+                        if total + headroom[destination] <= best_score:
+                            continue
+                        new_skills = add(skills, gain)
+                        by_skills = reached.get(destination)
+                        if by_skills is None:
+                            by_skills = reached[destination] = {}
+                        elif new_skills in by_skills:
+                            known = by_skills[new_skills]
+                            if known is not None and known[0] < total:
+                                by_skills[new_skills] = (total, (option_id, path))
+                            continue
+                        # Drop states that can no longer finish in time
+                        for required, steps in packed_hints[destination]:
+                            if ((new_skills | guard) - required) & guard == guard:
+                                break
+                        else:
+                            steps = remaining + 1
+                        by_skills[new_skills] = (total, (option_id, path)) if steps <= remaining else None
+
+            # Keep the states no other state beats on both skills and score;
+            # visiting them by falling score means only kept states can dominate
+            layer = {}
+            for location_id, by_skills in reached.items():
+                kept: List[tuple] = []
+                live = [(skills, state) for skills, state in by_skills.items() if state is not None]
+                for skills, (score, path) in sorted(live, key=lambda item: -item[1][0]):
+                    for other, _, _ in kept:
+                        # covers(other, skills), inlined
+                        if ((other | guard) - skills) & guard == guard:
+                            break
+                    else:
+                        kept.append((skills, score, path))
+                if kept:
+                    layer[location_id] = kept
+            if beam is not None and sum(map(len, layer.values())) > beam:
+                # Keep the states with the most points in reach
+                best_states = nlargest(beam, ((state[1] + headroom[location_id], location_id, state)
+                                              for location_id, states in layer.items() for state in states),
+                                       key=itemgetter(0))
+                layer = {}
+                for _, location_id, state in best_states:
+                    layer.setdefault(location_id, []).append(state)
+        return best_score, best_path
+
+    best_score, best_path = search(-1, None, beam_width)
+    best_score, best_path = search(best_score, best_path, None)
+
+    route = []
+    while best_path is not None:
+        option_id, best_path = best_path
+        route.append(option_id)
+    route.reverse()
+    return route, max(best_score, 0)
+
+
+_hint_tables: Dict[str, List[List[Hint]]] = {}
+_solutions: Dict[tuple, Solution] = {}
+
+
+def cache_file(world: World, name: str, cache_dir: Optional[str], use_cache: bool) -> Optional[str]:
+    """Where to cache a result for this world: cache_dir, or wherever the world itself is cached"""
+    if not use_cache or not world.content_hash:
+        return None
+    if cache_dir is None:
+        cache_dir = world.cache_dir
+        if cache_dir is None:
+            return None
+    return os.path.join(cache_dir, f"{world.content_hash[:16]}{name}")
+
+
+def read_cache(path: Optional[str], content_hash: str) -> Optional[tuple]:
+    """The fields cached at path for these world contents, or None"""
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            version, cached_hash, *fields = marshal.load(f)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+    if version != SOLVER_VERSION or cached_hash != content_hash:
+        return None
+    return tuple(fields)
+
+
+def write_cache(path: Optional[str], content_hash: str, *fields) -> None:
+    """Write fields atomically; caching is best effort"""
+    if path is not None:
+        save_cache(path, marshal.dumps((SOLVER_VERSION, content_hash, *fields)))
+
+
+def hint_table(world: World, cache_dir: Optional[str] = None, use_cache: bool = True,
+               moves: Optional[List[List[Transition]]] = None) -> List[List[Hint]]:
+    """The world's hint table alone, reused from memory or disk for the same world contents
+
+    Only the backward pass runs. Large worlds can still take a while, so
+    build the table before play starts rather than on the first hint.
+    """
+    if world.content_hash in _hint_tables:
+        return _hint_tables[world.content_hash]
+    path = cache_file(world, ".hints", cache_dir, use_cache)
+    cached = read_cache(path, world.content_hash)
+    if cached is not None:
+        table = [[Hint(*hint) for hint in location_hints] for location_hints in cached[0]]
+    else:
+        table = solve_hints(world, moves if moves is not None else transitions(world))
+        write_cache(path, world.content_hash, [[tuple(hint) for hint in location_hints] for location_hints in table])
+    if world.content_hash:
+        _hint_tables[world.content_hash] = table
+    return table
+
+
+def hints_by_default(world: World) -> bool:
+    """Whether a game offers hints unless told otherwise
+
+    Small, fully loaded worlds do. Building a paged world's table would
+    load every region, so a paged world only does if its pages were saved
+    with one (paging.py --hints).
+    """
+    if isinstance(world, World):
+        return len(world.keys) <= AUTO_HINT_LOCATIONS
+    path = cache_file(world, ".hints", None, True)
+    return path is not None and os.path.exists(path)
+
+
+def solve(world: World, max_steps: int = 40, cache_dir: Optional[str] = None,
+          use_cache: bool = True) -> Solution:
+    """Solve a world, reusing a solution cached for the same world contents"""
+    key = (world.content_hash, max_steps)
+    if key in _solutions:
+        return _solutions[key]
+
+    path = cache_file(world, f"-{max_steps}.solution", cache_dir, use_cache)
+    cached = read_cache(path, world.content_hash)
+    if cached is not None:
+        table = hint_table(world, cache_dir, use_cache)
+        shortest, best, best_score = cached
+    else:
+        moves = transitions(world)
+        table = hint_table(world, cache_dir, use_cache, moves)
+        shortest = follow(world, moves, table)
+        best, best_score = solve_best(world, moves, table, max_steps)
+        write_cache(path, world.content_hash, shortest, best, best_score)
+    solution = Solution(world.content_hash, table, shortest, best, best_score, max_steps)
+    if world.content_hash:
+        _solutions[key] = solution
+    return solution
+
+
+def describe(world: World, route: List[int]) -> List[str]:
+    location_of = {}
+    for location_id in range(len(world.keys)):
+        for option_id in range(world.option_start[location_id], world.option_start[location_id + 1]):
+            location_of[option_id] = location_id
+    return [f"{world.names[location_of[option_id]]}: {world.option_text[option_id]}" for option_id in route]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find the shortest and highest-scoring routes through a world")
+    parser.add_argument("--world", default=DEFAULT_WORLD, help="world JSON file")
+    parser.add_argument("--max-steps", type=int, default=40, help="choices allowed for the highest-scoring route")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    world = load_world(args.world)
+    start = time.perf_counter()
+    solution = solve(world, args.max_steps, use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+
+    hint_count = sum(len(location_hints) for location_hints in solution.hints)
+    print(f"World: {len(world.keys):,} locations, {len(world.option_text):,} options; "
+          f"{hint_count:,} hints, solved in {elapsed:.2f} s")
+    if not solution.shortest:
+        print("The final exam cannot be reached from the start")
+        return
+    print(f"\nShortest route ({len(solution.shortest)} choices):")
+    for i, step in enumerate(describe(world, solution.shortest), 1):
+        print(f"  {i:3}. {step}")
+    print(f"\nHighest-scoring route within {args.max_steps} choices "
+          f"({len(solution.best)} choices, {solution.best_score} points):")
+    for i, step in enumerate(describe(world, solution.best), 1):
+        print(f"  {i:3}. {step}")
+
+
+if __name__ == "__main__":
+    main()
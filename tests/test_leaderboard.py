@@ -0,0 +1,60 @@
+import bisect
+import random
+
+import pytest
+
+from leaderboard import Leaderboard, RankIndex
+
+
+def check(index, expected):
+    assert len(index) == len(expected)
+    assert list(index.items()) == expected
+    for position, key in enumerate(expected, 1):
+        assert index.position(key) == position
+    for start in (0, 1, len(expected) // 2, len(expected) - 1, len(expected), len(expected) + 5):
+        assert list(index.items(start)) == expected[start:]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_index_matches_a_sorted_list(seed):
+    rng = random.Random(seed)
+    index, expected = RankIndex(seed), []
+    for step in range(3000):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            index.remove(key)
+        else:
+            key = (-rng.randrange(1000), rng.random(), f"player{step}")
+            bisect.insort(expected, key)
+            index.insert(key)
+        if step % 500 == 0:
+            check(index, expected)
+    check(index, expected)
+    while expected:
+        index.remove(expected.pop(rng.randrange(len(expected))))
+    check(index, [])
+
+
+def test_removing_a_missing_key_raises():
+    index = RankIndex()
+    index.insert((-10, 1.0, "a"))
+    with pytest.raises(KeyError):
+        index.remove((-10, 2.0, "a"))
+    assert list(index.items()) == [(-10, 1.0, "a")]
+
+
+def test_leaderboard_ranks_each_players_best(tmp_path):
+    path = str(tmp_path / "leaderboard.db")
+    board = Leaderboard(path)
+    assert board.record("alice", 50, False) == 1
+    assert board.record("bob", 80, True) == 1
+    assert board.record("alice", 30, False) == 2
+    assert board.record("alice", 90, True) == 1
+    assert [result.name for result in board.top()] == ["alice", "bob"]
+    board.close()
+
+    reloaded = Leaderboard(path)
+    assert [(result.name, result.score) for result in reloaded.top()] == [("alice", 90), ("bob", 80)]
+    assert reloaded.rank("bob") == 2
+    assert len(reloaded.top_runs(10)) == 4
+    reloaded.close()
@@ -0,0 +1,44 @@
+import pytest
+
+from question_bank import load_question_bank
+from replay import ReplayError, generate, read_recordings, replay, to_line, verify
+from world import load_world
+
+
+@pytest.fixture(scope="module")
+def data():
+    return load_world(), load_question_bank()
+
+
+def test_recordings_round_trip_through_a_file(tmp_path, data):
+    world, question_bank = data
+    recordings = [generate(seed, 120, world, question_bank) for seed in range(20)]
+    path = tmp_path / "sessions.jsonl"
+    path.write_text("".join(to_line(recording) for recording in recordings))
+
+    read_back = list(read_recordings(str(path)))
+    assert read_back == recordings
+    assert all(recording.world_hash == world.content_hash for recording in read_back)
+    assert all(recording.bank_hash == question_bank.content_hash for recording in read_back)
+    assert verify(read_back, world) == (20, sum(len(r.inputs) for r in recordings), [])
+
+
+def test_replay_reproduces_the_recording(data):
+    world, question_bank = data
+    recording = generate(7, 200, world, question_bank)
+    assert replay(recording, world, question_bank) == recording
+
+
+def test_a_changed_outcome_fails_verification(data):
+    world, question_bank = data
+    recording = generate(3, 200, world, question_bank)
+    assert verify([recording, recording._replace(score=recording.score + 1)], world)[2] == [1]
+
+
+def test_recordings_of_other_data_are_refused(data):
+    world, question_bank = data
+    recording = generate(1, 50, world, question_bank)
+    with pytest.raises(ReplayError):
+        verify([recording._replace(bank_hash="")], world)
+    with pytest.raises(ReplayError):
+        verify([recording._replace(world_hash="0" * 64)], world)
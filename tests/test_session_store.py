@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from aws_adventure_game import Player, Renderer
+from session_store import SessionStore, SessionStoreError
+from world import load_world
+
+
+@pytest.fixture(scope="module")
+def world():
+    return load_world(use_cache=False)
+
+
+def new_player(world, name):
+    return Player(name, Renderer(io.StringIO()), world)
+
+
+def test_reopen_without_close_replays_the_journal(tmp_path, world):
+    store = SessionStore(str(tmp_path), world, fsync=False)
+    player = new_player(world, "alice")
+    assert not store.attach(player)
+    player.add_score(25)
+    player.take_damage(30)
+    player.heal(10)
+    player.improve_skill(world.skills[0], 2)
+    player.add_to_inventory(world.items[0])
+    player.move_to(world.location_id(world.keys[-1]))
+    store.commit()
+    # The process dies here: no checkpoint, no close
+
+    reopened = SessionStore(str(tmp_path), world, fsync=False)
+    resumed = new_player(world, "alice")
+    assert reopened.attach(resumed)
+    assert resumed.snapshot() == player.snapshot()
+    assert (resumed.score, resumed.health) == (25, 80)
+    reopened.close()
+
+
+def test_records_after_a_checkpoint_are_replayed(tmp_path, world):
+    store = SessionStore(str(tmp_path), world, fsync=False)
+    player = new_player(world, "bob")
+    store.attach(player)
+    player.add_score(10)
+    store.checkpoint()
+    player.add_score(5)
+    store.commit()
+
+    reopened = SessionStore(str(tmp_path), world, fsync=False)
+    resumed = new_player(world, "bob")
+    assert reopened.attach(resumed)
+    assert resumed.score == 15
+    reopened.close()
+
+
+def test_long_names_sharing_a_prefix_get_separate_sessions(tmp_path, world):
+    store = SessionStore(str(tmp_path), world, fsync=False)
+    first = new_player(world, "x" * 40 + "first")
+    second = new_player(world, "x" * 40 + "second")
+    assert not store.attach(first)
+    assert not store.attach(second)
+    first.add_score(7)
+    store.close()
+
+    reopened = SessionStore(str(tmp_path), world, fsync=False)
+    resumed = new_player(world, "x" * 40 + "first")
+    assert reopened.attach(resumed)
+    assert resumed.score == 7
+    with pytest.raises(SessionStoreError):
+        reopened.attach(new_player(world, "x" * 40 + "first"))
+    reopened.close()
@@ -0,0 +1,22 @@
+import io
+
+from aws_adventure_game import BatchRenderer, Game, read_sessions
+from world import load_world
+
+
+def test_each_line_is_one_session():
+    stream = io.StringIO("ann 1\n\n  bob 2 1  \n")
+    assert list(read_sessions(stream)) == [["ann", "1"], ["bob", "2", "1"]]
+
+
+def test_a_session_that_runs_out_ends_at_its_line():
+    world = load_world()
+    output = io.StringIO()
+    renderer = BatchRenderer(output)
+    played = []
+    for answers in read_sessions(io.StringIO("ann 1\nbob\n")):
+        game = Game(renderer, world, seed=0)
+        assert not game.run_commands(game.session(), iter(answers))
+        played.append(game.player.name)
+    renderer.close()
+    assert played == ["ann", "bob"]
@@ -0,0 +1,468 @@
+"""
+World loading for the AWS Adventure Game
+
+Worlds are JSON files with a start location, a list of skills and a dict of
+locations, each with a name, a description and a list of options. Loading a
+world compiles it once into an integer-indexed form: locations and options
+are rows of flat tables, destinations are location ids and skill checks and
+gains are (skill id, amount) pairs. Validation happens during compilation,
+so the game never has to look up string keys while it runs.
+
+Actions are data too: each names the messages to show, a list of effects,
+optional random events with their own effects, and the location it leads
+to. Effects compile to (opcode, arguments) pairs so the game can apply them
+through a dispatch table instead of branching on action names.
+
+The compiled tables are cached next to the world file, keyed by a hash of
+its contents, so starting a large world only costs reading the cache.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_WORLD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worlds", "aws_academy.json")
+
+# Bump when the compiled layout changes so stale caches are ignored
+COMPILER_VERSION = 5
+
+CACHE_DIR_NAME = "__worldcache__"
+
+# Built Location rows kept per world, so hot locations are not rebuilt each visit
+LOCATION_CACHE_SIZE = 4096
+
+# Effect opcodes, in the order of their names in world files
+EFFECTS = ("score", "inventory", "skill", "damage", "heal")
+SCORE, INVENTORY, SKILL, DAMAGE, HEAL = range(len(EFFECTS))
+
+# Action kinds; built-in actions are handled by the game itself
+SCRIPTED, STATUS, FINAL_EXAM = range(3)
+BUILTIN_ACTIONS = {"status": STATUS, "final_exam": FINAL_EXAM}
+
+# Granted by passing the final exam; declared automatically by worlds that have one
+CERTIFICATE = "AWS Certification"
+
+# Flat integer tables of a compiled world and their array typecodes
+TABLES = {
+    "option_start": "i",  # per location, index of its first option (plus end)
+    "option_destination": "i",  # location id, or -1 for actions
+    "option_action": "i",  # action id, or -1 for moves
+    "check_start": "i",  # per option, index of its first skill check (plus end)
+    "check_skill": "b",
+    "check_level": "h",
+    "gain_start": "i",  # per option, index of its first skill gain (plus end)
+    "gain_skill": "b",
+    "gain_amount": "h",
+}
+
+
+class WorldError(ValueError):
+    """Raised when a world definition is invalid"""
+
+
+Effect = Tuple[int, tuple]  # (opcode, arguments)
+
+
+class Event(NamedTuple):
+    chance: float
+    message: str
+    effects: Tuple[Effect, ...]
+
+
+class Action(NamedTuple):
+    name: str
+    kind: int
+    success: str  # highlighted first line
+    details: str
+    effects: Tuple[Effect, ...]
+    events: Tuple[Event, ...]
+    destination: int  # location id, or -1 to stay
+
+
+class Option(NamedTuple):
+    text: str
+    destination: int  # location id, or -1 for actions
+    action: int  # action id, or -1 for moves
+    skill_check: Tuple[Tuple[int, int], ...]  # (skill id, required level)
+    skill_gain: Tuple[Tuple[int, int], ...]  # (skill id, amount)
+
+
+class Location(NamedTuple):
+    key: str
+    name: str
+    description: str
+    first_option: int  # index of the location's first entry in World.options
+    options: Tuple[Option, ...]
+
+
+class _Rows(Sequence):
+    """Read-only sequence that builds each row on access"""
+
+    def __init__(self, length: int, build):
+        self._length = length
+        self._build = build
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._build(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._build(index)
+
+    def __iter__(self) -> Iterator:
+        return map(self._build, range(self._length))
+
+
+class WorldIndex:
+    """What every world keeps in memory: its skills, actions and items
+
+    World adds the tables of every location; paging.PagedWorld reads them
+    from disk region by region.
+    """
+
+    def __init__(self, skills: Sequence[str], actions: List[tuple], items: Sequence[str],
+                 start: int, content_hash: str = ""):
+        self.skills = tuple(skills)
+        self.raw_actions = actions
+        self.actions = tuple(
+            Action(name, kind, success, details, effects,
+                   tuple(Event(*event) for event in events), destination)
+            for name, kind, success, details, effects, events, destination in actions
+        )
+        self.action_ids = {action.name: i for i, action in enumerate(self.actions)}
+        self.skill_ids = {skill: i for i, skill in enumerate(self.skills)}
+        # Every item the world can grant, declared or from effects, so players
+        # can count items by id
+        self.declared_items = tuple(items)
+        self.items = tuple(dict.fromkeys(self.declared_items + tuple(
+            args[0]
+            for action in self.actions
+            for effects in (action.effects, *(event.effects for event in action.events))
+            for opcode, args in effects if opcode == INVENTORY
+        )))
+        self.item_ids = {item: i for i, item in enumerate(self.items)}
+        self.start = start
+        self.content_hash = content_hash
+        # Set by load_world; derived results such as solver tables are cached there too
+        self.cache_dir: Optional[str] = None
+
+
+class RowTables:
+    """Location and option rows built on demand from flat tables
+
+    Subclasses set the text lists (keys, names, descriptions, option_text)
+    and an array per entry of TABLES. option_base is the world's id for the
+    first option in the tables, so a paged region holding a slice of a
+    world still builds rows with the world's ids.
+    """
+    option_base = 0
+
+    def build_location(self, index: int) -> Location:
+        """Build a location row with its options"""
+        first, end = self.option_start[index], self.option_start[index + 1]
+        return Location(
+            key=self.keys[index],
+            name=self.names[index],
+            description=self.descriptions[index],
+            first_option=self.option_base + first,
+            options=tuple(self.option(i) for i in range(first, end)),
+        )
+
+    def option(self, index: int) -> Option:
+        """Build an option row"""
+        check, check_end = self.check_start[index], self.check_start[index + 1]
+        gain, gain_end = self.gain_start[index], self.gain_start[index + 1]
+        return Option(
+            text=self.option_text[index],
+            destination=self.option_destination[index],
+            action=self.option_action[index],
+            skill_check=tuple(zip(self.check_skill[check:check_end], self.check_level[check:check_end])),
+            skill_gain=tuple(zip(self.gain_skill[gain:gain_end], self.gain_amount[gain:gain_end])),
+        )
+
+
+class World(WorldIndex, RowTables):
+    """A compiled world; location and skill ids index into its tables"""
+
+    def __init__(self, skills: Sequence[str], keys: List[str], names: List[str],
+                 descriptions: List[str], option_text: List[str], actions: List[tuple],
+                 tables: Dict[str, array], start: int, content_hash: str = "",
+                 items: Sequence[str] = ()):
+        super().__init__(skills, actions, items, start, content_hash)
+        self.keys = keys
+        self.names = names
+        self.descriptions = descriptions
+        self.option_text = option_text
+        for name in TABLES:
+            setattr(self, name, tables[name])
+        self.ids = {key: i for i, key in enumerate(keys)}
+        # Rows built by build_location, kept for hot locations
+        self.location = lru_cache(maxsize=LOCATION_CACHE_SIZE)(self.build_location)
+        self.locations: Sequence[Location] = _Rows(len(keys), self.location)
+        self.options: Sequence[Option] = _Rows(len(option_text), self.option)
+
+    def location_id(self, key: str) -> int:
+        """Look up a location id by key"""
+        try:
+            return self.ids[key]
+        except KeyError:
+            raise WorldError(f"Unknown location '{key}'") from None
+
+    def dumps(self) -> bytes:
+        """Serialize the compiled tables for the on-disk cache"""
+        return marshal.dumps((
+            COMPILER_VERSION, self.content_hash, self.skills, self.keys, self.names,
+            self.descriptions, self.option_text, self.raw_actions,
+            {name: getattr(self, name).tobytes() for name in TABLES}, self.start,
+            self.declared_items,
+        ))
+
+    @classmethod
+    def loads(cls, data: bytes) -> "World":
+        (version, content_hash, skills, keys, names, descriptions, option_text,
+         actions, raw_tables, start, items) = marshal.loads(data)
+        if version != COMPILER_VERSION:
+            raise ValueError("Compiled world has an old layout")
+        tables = {}
+        for name, typecode in TABLES.items():
+            tables[name] = array(typecode)
+            tables[name].frombytes(raw_tables[name])
+        return cls(skills, keys, names, descriptions, option_text, actions,
+                   tables, start, content_hash, items)
+
+
+def compile_world(data: Dict[str, Any], content_hash: str = "") -> World:
+    """Validate a world definition and compile it into its indexed form"""
+    if not isinstance(data, dict):
+        raise WorldError("World must be an object")
+    errors: List[str] = []
+    skills = tuple(data.get("skills", ()))
+    skill_ids = {skill: i for i, skill in enumerate(skills)}
+    if len(skills) > 127:
+        raise WorldError("Worlds support at most 127 skills")
+    raw_locations = data.get("locations")
+    if not isinstance(raw_locations, dict) or not raw_locations:
+        raise WorldError("World has no locations")
+    ids = {key: i for i, key in enumerate(raw_locations)}
+    tables = {name: array(typecode) for name, typecode in TABLES.items()}
+
+    def add_pairs(where: str, field: str, values: Any, skill_table: str, amount_table: str) -> None:
+        if not isinstance(values, dict):
+            errors.append(f"{where}: '{field}' must be an object")
+            return
+        for skill, amount in values.items():
+            if skill not in skill_ids:
+                errors.append(f"{where}: unknown skill '{skill}' in '{field}'")
+            elif not is_int(amount) or not 1 <= amount <= 32767:
+                errors.append(f"{where}: '{field}' for '{skill}' must be a positive integer")
+            else:
+                tables[skill_table].append(skill_ids[skill])
+                tables[amount_table].append(amount)
+
+    actions = compile_actions(data.get("actions", {}), skills, ids, errors)
+    action_ids = {action[0]: i for i, action in enumerate(actions)}
+
+    names, descriptions, option_text = [], [], []
+    has_exam = False
+    for key, raw in raw_locations.items():
+        tables["option_start"].append(len(option_text))
+        if not isinstance(raw, dict):
+            errors.append(f"{key}: location must be an object")
+            continue
+        names.append(raw.get("name", key))
+        descriptions.append(raw.get("description", ""))
+        raw_options = raw.get("options") or []
+        if not isinstance(raw_options, list) or not raw_options:
+            errors.append(f"{key}: location has no options")
+            continue
+        for i, raw_option in enumerate(raw_options, 1):
+            where = f"{key} option {i}"
+            if not isinstance(raw_option, dict):
+                errors.append(f"{where}: option must be an object")
+                continue
+            destination = action_id = -1
+            action = raw_option.get("action")
+            if action is not None:
+                if action not in action_ids:
+                    errors.append(f"{where}: unknown action '{action}'")
+                else:
+                    action_id = action_ids[action]
+                    has_exam = has_exam or actions[action_id][1] == FINAL_EXAM
+            if "destination" in raw_option:
+                if action is not None:
+                    errors.append(f"{where}: has both a destination and an action")
+                if raw_option["destination"] not in ids:
+                    errors.append(f"{where}: unknown destination '{raw_option['destination']}'")
+                else:
+                    destination = ids[raw_option["destination"]]
+            elif action is None:
+                errors.append(f"{where}: needs a destination or an action")
+            option_text.append(raw_option.get("text", ""))
+            tables["option_action"].append(action_id)
+            tables["option_destination"].append(destination)
+            tables["check_start"].append(len(tables["check_skill"]))
+            add_pairs(where, "skill_check", raw_option.get("skill_check", {}), "check_skill", "check_level")
+            tables["gain_start"].append(len(tables["gain_skill"]))
+            add_pairs(where, "skill_gain", raw_option.get("skill_gain", {}), "gain_skill", "gain_amount")
+
+    items = data.get("items", [])
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        errors.append("'items' must be a list of item names")
+    elif has_exam and CERTIFICATE not in items:
+        items = [*items, CERTIFICATE]
+
+    start = data.get("start", next(iter(raw_locations)))
+    if start not in ids:
+        errors.append(f"Unknown start location '{start}'")
+    if errors:
+        raise WorldError("Invalid world:\n  " + "\n  ".join(errors))
+
+    tables["option_start"].append(len(option_text))
+    tables["check_start"].append(len(tables["check_skill"]))
+    tables["gain_start"].append(len(tables["gain_skill"]))
+    return World(skills, list(raw_locations), names, descriptions, option_text,
+                 actions, tables, ids[start], content_hash, items)
+
+
+def is_int(value: Any) -> bool:
+    """Whether a JSON value is an integer; true and false are not"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def compile_actions(raw_actions: Dict[str, Any], skills: Tuple[str, ...],
+                    ids: Dict[str, int], errors: List[str]) -> List[tuple]:
+    """Compile action definitions into plain tuples, built-in actions first"""
+    actions = [(name, kind, "", "", (), (), -1) for name, kind in BUILTIN_ACTIONS.items()]
+    if not isinstance(raw_actions, dict):
+        errors.append("'actions' must be an object")
+        return actions
+
+    def compile_effects(where: str, raw_effects: Any) -> tuple:
+        effects = []
+        if not isinstance(raw_effects, (list, type(None))):
+            errors.append(f"{where}: effects must be a list")
+            return ()
+        for raw in raw_effects or ():
+            if not isinstance(raw, list) or not raw or raw[0] not in EFFECTS:
+                errors.append(f"{where}: unknown effect {raw!r}")
+                continue
+            opcode, args = EFFECTS.index(raw[0]), tuple(raw[1:])
+            if opcode == SKILL:
+                if not args or args[0] not in skills:
+                    errors.append(f"{where}: unknown skill in effect {raw!r}")
+                    continue
+                args = (args[0], args[1] if len(args) > 1 else 1)
+            if opcode == INVENTORY:
+                valid = len(args) == 1 and isinstance(args[0], str)
+            else:
+                valid = len(args) == (2 if opcode == SKILL else 1) and is_int(args[-1])
+                if valid and opcode in (DAMAGE, HEAL) and args[0] <= 0:
+                    errors.append(f"{where}: {raw[0]} must be positive in effect {raw!r}")
+                    continue
+            if not valid:
+                errors.append(f"{where}: bad arguments in effect {raw!r}")
+                continue
+            effects.append((opcode, args))
+        return tuple(effects)
+
+    for name, raw in raw_actions.items():
+        where = f"action '{name}'"
+        if name in BUILTIN_ACTIONS:
+            errors.append(f"{where}: redefines a built-in action")
+            continue
+        if not isinstance(raw, dict):
+            errors.append(f"{where}: action must be an object")
+            continue
+        destination = raw.get("destination")
+        if destination is not None and destination not in ids:
+            errors.append(f"{where}: unknown destination '{destination}'")
+            destination = None
+        events = []
+        raw_events = raw.get("events") or []
+        if not isinstance(raw_events, list):
+            errors.append(f"{where}: 'events' must be a list")
+            raw_events = ()
+        for i, raw_event in enumerate(raw_events, 1):
+            if not isinstance(raw_event, dict):
+                errors.append(f"{where} event {i}: event must be an object")
+                continue
+            chance = raw_event.get("chance", 0)
+            if isinstance(chance, bool) or not isinstance(chance, (int, float)) or not 0 <= chance <= 1:
+                errors.append(f"{where} event {i}: chance must be between 0 and 1")
+                chance = 0
+            events.append((float(chance), raw_event.get("message", ""),
+                           compile_effects(f"{where} event {i}", raw_event.get("effects"))))
+        actions.append((
+            name, SCRIPTED, raw.get("success", ""), raw.get("details", ""),
+            compile_effects(where, raw.get("effects")), tuple(events),
+            ids[destination] if destination is not None else -1,
+        ))
+    return actions
+
+
+def load_world(path: str = DEFAULT_WORLD, cache_dir: Optional[str] = None, use_cache: bool = True) -> World:
+    """Load a world file, using the compiled cache when its contents match
+
+    A directory written by paging.page_world loads as a PagedWorld, which
+    reads its regions from disk as they are visited.
+    """
+    if os.path.isdir(path):
+        from paging import load_paged_world
+        return load_paged_world(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    content_hash = hashlib.sha256(raw + b"%d" % COMPILER_VERSION).hexdigest()
+
+    cache_path = None
+    if use_cache:
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, f"{stem}-{content_hash[:16]}.world")
+        try:
+            with open(cache_path, "rb") as f:
+                world = World.loads(f.read())
+            if world.content_hash == content_hash:
+                world.cache_dir = cache_dir
+                return world
+        except (OSError, ValueError, EOFError, TypeError):
+            pass
+
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise WorldError(f"{path}: {e}") from None
+    world = compile_world(data, content_hash)
+
+    if cache_path is not None:
+        world.cache_dir = cache_dir
+        save_cache(cache_path, world.dumps())
+    return world
+
+
+def save_cache(cache_path: str, data: bytes) -> None:
+    """Write a cache file atomically; caching is best effort
+
+    Compiled worlds, question bank indexes and solver results all go
+    through here, so readers never see a half-written file.
+    """
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
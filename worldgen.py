@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Procedural AWS-themed worlds for the AWS Adventure Game
+
+Generates worlds of any size in the same JSON schema as
+worlds/aws_academy.json. Locations are AWS services grouped into regions
+(us-east-1, eu-west-2, ...). Options mostly lead to other services in the
+same region, so a player stays in one region for a while. A gateway in
+each region leads to other regions. Options train skills or perform
+actions gated by checks on up to three skills. Actions have several
+outcomes: random events that hurt, heal or reward the player, and a
+destination that may be in another region. Some regions hold a
+certification center with the final exam.
+
+Locations are listed region by region, so a world paged with the same
+region size (see paging.py) keeps each region's locations together.
+
+    python worldgen.py 100000 worlds/generated.json
+    python worldgen.py 100000 worlds/generated.json --paged worlds/generated
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+SKILLS = ["compute", "storage", "networking", "security", "serverless", "databases", "containers", "monitoring"]
+
+AREAS = ["us-east", "us-west", "eu-west", "eu-central", "ap-south", "ap-northeast", "sa-east", "ca-central"]
+
+# Service themes: (name, the skill it teaches, description)
+SERVICES = [
+    ("EC2 Fleet", "compute", "Racks of instances hum as auto scaling groups grow and shrink."),
+    ("S3 Bucket Hall", "storage", "Endless buckets line the walls, each tagged with a lifecycle policy."),
+    ("VPC Junction", "networking", "Subnets branch off in every direction, joined by route tables."),
+    ("IAM Vault", "security", "Policies and roles are etched into the vault door."),
+    ("Lambda Workshop", "serverless", "Functions spring to life on every event and vanish just as fast."),
+    ("DynamoDB Tables", "databases", "Partitions stretch into the distance, each keyed with care."),
+    ("EKS Harbor", "containers", "Pods dock and undock while the control plane keeps watch."),
+    ("CloudWatch Tower", "monitoring", "Dashboards glow with metrics, alarms waiting to fire."),
+    ("RDS Cluster", "databases", "A primary and its read replicas replicate in quiet lockstep."),
+    ("CloudFront Edge", "networking", "Cached content streams out to edge locations worldwide."),
+    ("KMS Keyring", "security", "Customer managed keys rotate on a careful schedule."),
+    ("SQS Queue Yard", "serverless", "Messages wait patiently in queues for their consumers."),
+    ("EBS Depot", "storage", "Volumes and snapshots are stacked in neat rows."),
+    ("ECS Dock", "containers", "Task definitions are pinned to a board beside the cluster."),
+    ("Route 53 Crossroads", "networking", "Hosted zones point travellers down the right road."),
+    ("X-Ray Observatory", "monitoring", "Traces map every request as it crosses the system."),
+]
+
+# Per skill: what a player does at a service that teaches it
+TASKS = {
+    "compute": ["Right-size an instance", "Launch a spot fleet", "Tune an auto scaling policy"],
+    "storage": ["Configure a lifecycle rule", "Enable versioning", "Restore from a snapshot"],
+    "networking": ["Peer two VPCs", "Add a NAT gateway", "Fix a route table"],
+    "security": ["Write a least-privilege policy", "Rotate access keys", "Audit a security group"],
+    "serverless": ["Deploy a function", "Wire up an event source", "Tune function memory"],
+    "databases": ["Add a read replica", "Design a partition key", "Run a point-in-time restore"],
+    "containers": ["Roll out a deployment", "Scale a service", "Patch a node group"],
+    "monitoring": ["Create an alarm", "Build a dashboard", "Trace a slow request"],
+}
+
+ITEMS = ["IAM Access Key", "KMS Data Key", "VPC Endpoint Pass", "Spot Instance Voucher", "Support Plan Token"]
+
+
+def region_names(count: int) -> List[str]:
+    return [f"{AREAS[i % len(AREAS)]}-{i // len(AREAS) + 1}" for i in range(count)]
+
+
+def generate_world(n_locations: int, seed: int = 0, region_size: int = 256,
+                   exam_share: float = 0.05) -> Dict[str, Any]:
+    """A world of n_locations in regions of region_size, as a JSON-ready dict
+
+    About exam_share of the regions hold a certification center with the
+    final exam; the last region always does, so the exam is always reachable.
+    """
+    rng = random.Random(seed)
+    regions = region_names((n_locations + region_size - 1) // region_size)
+    keys: List[List[str]] = []
+    themes: List[List[tuple]] = []
+    for r, region in enumerate(regions):
+        size = min(region_size, n_locations - r * region_size)
+        region_themes = [SERVICES[(r + i) % len(SERVICES)] for i in range(size)]
+        themes.append(region_themes)
+        keys.append([f"{region}/{name.lower().replace(' ', '-')}-{i}"
+                     for i, (name, _, _) in enumerate(region_themes)])
+    exams = {len(regions) - 1} | {r for r in range(len(regions)) if rng.random() < exam_share}
+
+    actions: Dict[str, Any] = {}
+    locations: Dict[str, Any] = {}
+    for r, region in enumerate(regions):
+        region_keys = keys[r]
+        # Each region has a few actions; their outcomes branch across the world
+        region_actions = []
+        for a in range(max(1, len(region_keys) // 16)):
+            skill = rng.choice(SKILLS)
+            name = f"{region}/{skill}-task-{a}"
+            effects = [["score", rng.randint(5, 25)], ["skill", skill, 1]]
+            if rng.random() < 0.1:
+                effects.append(["inventory", rng.choice(ITEMS)])
+            events = [
+                {"chance": round(rng.uniform(0.05, 0.3), 2), "message": "The change caused an outage!",
+                 "effects": [["damage", rng.randint(5, 25)]]},
+                {"chance": round(rng.uniform(0.05, 0.2), 2), "message": "A teammate shared a great tip.",
+                 "effects": [["heal", rng.randint(5, 15)], ["score", 5]]},
+            ]
+            # Most actions stay in the region; some send the player elsewhere
+            target = rng.randrange(len(regions)) if rng.random() < 0.2 else r
+            actions[name] = {
+                "success": rng.choice(TASKS[skill]) + ": done!",
+                "details": f"Your {skill} skills are getting sharper.",
+                "effects": effects,
+                "events": events,
+                "destination": rng.choice(keys[target]),
+            }
+            region_actions.append(name)
+
+        for i, key in enumerate(region_keys):
+            service, skill, description = themes[r][i]
+            options = []
+            for _ in range(rng.randint(1, 2)):
+                j = rng.randrange(len(region_keys))
+                options.append({"text": f"Head to the {themes[r][j][0]}",
+                                "destination": region_keys[j], "skill_gain": {skill: 1}})
+            for _ in range(rng.randint(1, 2)):
+                checked = rng.sample(SKILLS, rng.randint(1, 3))
+                options.append({"text": rng.choice(TASKS[skill]),
+                                "action": rng.choice(region_actions),
+                                "skill_check": {name: rng.randint(1, 4) for name in checked}})
+            if i == 0:
+                # The region's gateway
+                for _ in range(2):
+                    other = rng.randrange(len(regions))
+                    options.append({"text": f"Take the backbone link to {regions[other]}",
+                                    "destination": keys[other][0], "skill_check": {"networking": 2}})
+            elif rng.random() < 0.2:
+                options.append({"text": f"Return to the {region} gateway", "destination": region_keys[0]})
+            if i == len(region_keys) - 1 and r in exams:
+                options.append({"text": "Take the AWS Certification exam", "action": "final_exam",
+                                "skill_check": {rng.choice(SKILLS): 3}})
+            options.append({"text": "Check your status", "action": "status"})
+            locations[key] = {"name": f"{service} ({region})", "description": description, "options": options}
+
+    return {
+        "start": keys[0][0],
+        "skills": SKILLS,
+        "items": ["AWS Certification"],
+        "locations": locations,
+        "actions": actions,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a large AWS-themed world")
+    parser.add_argument("locations", type=int)
+    parser.add_argument("path", help="world JSON file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--region-size", type=int, default=256)
+    parser.add_argument("--paged", metavar="DIR", help="also write the world as pages for lazy loading")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    data = generate_world(args.locations, args.seed, args.region_size)
+    with open(args.path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    print(f"Wrote {len(data['locations']):,} locations and {len(data['actions']):,} actions to {args.path} "
+          f"({os.path.getsize(args.path) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f} s")
+    if args.paged:
+        # Imported here so generating plain worlds needs nothing else
+        from paging import page_world
+        from world import load_world
+        regions = page_world(load_world(args.path), args.paged, args.region_size)
+        print(f"Paged into {regions:,} regions in {args.paged}")
+
+
+if __name__ == "__main__":
+    main()